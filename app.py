@@ -8,6 +8,7 @@ import json
 import asyncio
 import threading
 from datetime import datetime
+from itertools import chain
 from flask import Flask, render_template, request, jsonify, send_file, send_from_directory
 from werkzeug.utils import secure_filename
 import logging
@@ -20,6 +21,9 @@ except ImportError:
     logging.warning("python-dotenv not installed, using system environment variables only")
 
 from pdf_extractor import PDFExtractor
+from worker_pool import BudgetExceeded
+from directory_manifest import DirectoryManifest
+from stage_timings import TimingAggregate
 from web_crawler import AcademicCrawler
 from pdf_extractor import PDFExtractor
 from ai_classifier import AIClassifier
@@ -51,16 +55,61 @@ job_counter = 0
 settings_file = 'settings.json'
 use_vision = True  # Default to enabled
 custom_categories = None
+cache_backend = 'sqlite'
+cache_max_mb = 512
+extraction_executor = 'process'  # 'process' uses every core; 'thread' shares one extractor
+extraction_workers = min(8, os.cpu_count() or 1)
+vision_batch_size = 4  # first pages packed into one vision request
+vision_sections = False  # also run vision on each paper of a multi-paper PDF
+vision_grayscale = False  # grayscale page images for smaller uploads
+vision_min_confidence = 0.5  # call vision only for fields text extraction is unsure of
+vision_required_fields = ['title', 'authors', 'year', 'journal']
+extraction_timings = True  # per-stage timings on results, summed per job
+memory_ceiling_mb = None  # RSS at which a worker drops a long PDF's parser state while reading it
+keep_crawled_pdfs = True  # False: crawled PDFs are extracted from memory, never written to pdfs/
+doc_timeout_s = 600  # wall seconds per document before its worker is killed and the file marked failed
+doc_memory_mb = 4096  # worker RSS at which the document being processed is killed the same way
+layout_templates = True  # learn each journal's layout and read repeat sources without vision
+text_backend = 'auto'  # page text library: pdfplumber, pypdf2, pymupdf, or auto (PyMuPDF, garbled pages re-read)
+parallel_page_threshold = 200  # pages at which a document's full-text pass is split over the workers
 if os.path.exists(settings_file):
     try:
         with open(settings_file, 'r') as f:
             settings = json.load(f)
             use_vision = settings.get('use_vision_extraction', True)
             custom_categories = settings.get('custom_categories', None)
+            cache_backend = settings.get('cache_backend', 'sqlite')
+            cache_max_mb = int(settings.get('cache_max_mb', 512))
+            extraction_executor = settings.get('extraction_executor', extraction_executor)
+            extraction_workers = int(settings.get('extraction_workers', extraction_workers))
+            vision_batch_size = int(settings.get('vision_batch_size', vision_batch_size))
+            vision_sections = bool(settings.get('vision_sections', vision_sections))
+            vision_grayscale = bool(settings.get('vision_grayscale', vision_grayscale))
+            vision_min_confidence = settings.get('vision_min_confidence', vision_min_confidence)
+            vision_required_fields = settings.get('vision_required_fields', vision_required_fields)
+            extraction_timings = bool(settings.get('extraction_timings', extraction_timings))
+            keep_crawled_pdfs = bool(settings.get('keep_crawled_pdfs', keep_crawled_pdfs))
+            memory_ceiling_mb = settings.get('memory_ceiling_mb', memory_ceiling_mb)
+            doc_timeout_s = settings.get('doc_timeout_s', doc_timeout_s)
+            doc_memory_mb = settings.get('doc_memory_mb', doc_memory_mb)
+            layout_templates = bool(settings.get('layout_templates', layout_templates))
+            text_backend = settings.get('text_backend', text_backend)
+            parallel_page_threshold = settings.get('parallel_page_threshold', parallel_page_threshold)
     except:
         pass
 
-pdf_extractor = PDFExtractor(use_vision=use_vision)
+pdf_extractor = PDFExtractor(use_vision=use_vision, cache_backend=cache_backend,
+                             cache_max_bytes=cache_max_mb * 1024 * 1024,
+                             vision_batch_size=vision_batch_size, vision_sections=vision_sections,
+                             vision_grayscale=vision_grayscale,
+                             vision_min_confidence=vision_min_confidence,
+                             vision_required_fields=vision_required_fields,
+                             collect_timings=extraction_timings,
+                             memory_ceiling_mb=memory_ceiling_mb,
+                             doc_timeout=doc_timeout_s, doc_memory_mb=doc_memory_mb,
+                             layout_templates=layout_templates, text_backend=text_backend,
+                             parallel_page_threshold=parallel_page_threshold,
+                             parallel_workers=extraction_workers)
 classifier = AIClassifier(custom_categories=custom_categories)
 catalog_generator = CatalogGenerator()
 
@@ -81,6 +130,8 @@ class ProcessingJob:
         self.end_time = None
         self.source_url = source_url  # Store original URL for re-fetching
         self.periodical_summary = None  # Summary/abstract of the periodical issue
+        self.timings = TimingAggregate()  # Per-stage extraction time, summed over files
+        self.failed_files = []  # [{file, reason, error}] for files stopped by the per-document budget or rejected by preflight
     
     def to_dict(self):
         """Convert job to dictionary for JSON serialization"""
@@ -97,7 +148,9 @@ class ProcessingJob:
             'start_time': self.start_time.isoformat(),
             'end_time': self.end_time.isoformat() if self.end_time else None,
             'source_url': self.source_url,
-            'periodical_summary': self.periodical_summary
+            'periodical_summary': self.periodical_summary,
+            'timings': self.timings.to_dict(),
+            'failed_files': self.failed_files
         }
     
     @staticmethod
@@ -114,6 +167,8 @@ class ProcessingJob:
         job.start_time = datetime.fromisoformat(data['start_time'])
         job.end_time = datetime.fromisoformat(data['end_time']) if data['end_time'] else None
         job.periodical_summary = data.get('periodical_summary')
+        job.timings = TimingAggregate.from_dict(data.get('timings'))
+        job.failed_files = data.get('failed_files', [])
         return job
 
 
@@ -167,8 +222,15 @@ def get_all_job_history():
     return jobs_list
 
 
-def process_pdfs_background(job_id, pdf_files, output_format='all', source_url=None, html_metadata=None, language='en'):
-    """Background task to process PDFs"""
+def process_pdfs_background(job_id, pdf_files, output_format='all', source_url=None, html_metadata=None, language='en',
+                            manifest=None, reused_papers=None, detected=None):
+    """Background task to process PDFs
+    
+    With a DirectoryManifest, pdf_files are only the new or changed files;
+    reused_papers are the stored results of the unchanged ones. detected maps
+    files already split (e.g. while crawling) to their papers; only the
+    other files are sent to the extractor.
+    """
     job = jobs[job_id]
     html_metadata = html_metadata or {}
     job.language = language  # Store language in job for summary generation
@@ -184,11 +246,19 @@ def process_pdfs_background(job_id, pdf_files, output_format='all', source_url=N
             if source_journal_info.get('journal'):
                 logger.info(f"Detected journal from source: {source_journal_info['journal']}")
         
-        papers = []
-        for i, pdf_path in enumerate(pdf_files):
+        papers = list(reused_papers or [])
+        detected = detected or {}
+        batch = pdf_extractor.iter_batch([pdf_path for pdf_path in pdf_files if pdf_path not in detected],
+                                         mode='detect', max_workers=extraction_workers,
+                                         executor=extraction_executor)
+        already_detected = ((pdf_path, detected[pdf_path]) for pdf_path in pdf_files if pdf_path in detected)
+        for i, (pdf_path, detected_papers) in enumerate(chain(already_detected, batch)):
             # Check if job was cancelled
             if job.status == 'cancelled':
                 logger.info(f"Job {job_id} was cancelled, stopping processing")
+                batch.close()  # Drop files still queued for the workers
+                if manifest is not None:
+                    manifest.save()
                 save_job_to_history(job)
                 return
             
@@ -196,9 +266,22 @@ def process_pdfs_background(job_id, pdf_files, output_format='all', source_url=N
             job.progress = i + 1
             
             try:
-                # Detect and split multiple papers in single PDF
-                detected_papers = pdf_extractor.detect_multiple_papers(pdf_path)
+                # Stopped by the per-document budget or rejected by preflight: record why and move on
+                failure = detected_papers[0].get('failure') if detected_papers else None
+                if failure:
+                    job.failed_files.append({'file': os.path.basename(pdf_path), 'reason': failure,
+                                             'error': detected_papers[0].get('error')})
+                    continue
                 
+                # Every paper of a file carries the same per-file timings;
+                # count them once and keep them out of the results/exports
+                file_timings = None
+                for paper in detected_papers:
+                    file_timings = paper.pop('_timings', None) or file_timings
+                if detected_papers:
+                    job.timings.add(file_timings, pdf_path, detected_papers[0].get('journal'))
+                
+                # Multiple papers in a single PDF were split by the workers
                 if len(detected_papers) > 1:
                     logger.info(f"{pdf_path}: Found {len(detected_papers)} papers in single PDF")
                 
@@ -220,10 +303,17 @@ def process_pdfs_background(job_id, pdf_files, output_format='all', source_url=N
                 
                 papers.extend(detected_papers)
                 
+                if manifest is not None:
+                    manifest.record(pdf_path, pdf_extractor.papers_result_id(pdf_path),
+                                    content_hash=pdf_extractor.content_hash(pdf_path), job_id=job_id)
+                
             except Exception as e:
                 logger.error(f"Error processing {pdf_path}: {e}")
                 continue
         
+        if manifest is not None:
+            manifest.save()
+        
         logger.info(f"Total papers extracted: {len(papers)} from {len(pdf_files)} PDF files")
         
         # Apply source journal info AFTER all extraction (including vision) is complete
@@ -299,7 +389,7 @@ async def crawl_website_background(job_id, url, max_depth=2, output_format='all'
         job.progress = 0
         
         # Crawl and download PDFs with progress updates
-        async with AcademicCrawler() as crawler:
+        async with AcademicCrawler(keep_pdfs=keep_crawled_pdfs) as crawler:
             # First, find all PDF links
             job.current_file = f'Scanning website (depth: {max_depth})...'
             if use_js:
@@ -330,6 +420,25 @@ async def crawl_website_background(job_id, url, max_depth=2, output_format='all'
             downloaded_files = []
             semaphore = asyncio.Semaphore(crawler.max_concurrent)
             
+            # Split each PDF from its downloaded bytes while the others are still
+            # downloading; processing below only runs the ones that failed here
+            extractor = pdf_extractor
+            prefetch = []
+            prefetched = {}
+            extract_semaphore = asyncio.Semaphore(extraction_workers)
+            
+            async def prefetch_papers(name, content):
+                async with extract_semaphore:
+                    if job.status != 'cancelled':
+                        try:
+                            prefetched[name] = await asyncio.wait_for(
+                                extractor.detect_multiple_papers_async(name, data=content), timeout=doc_timeout_s)
+                        except asyncio.TimeoutError:
+                            # A thread cannot be killed like a worker process, but the crawl moves on
+                            error = BudgetExceeded('timeout', f"Exceeded the time budget ({doc_timeout_s}s per document)")
+                            logger.error(f"{name}: {error}")
+                            prefetched[name] = extractor._error_result(name, error, 'detect')
+            
             async def download_with_progress(pdf_url, output_dir):
                 # Check if job was cancelled before starting download
                 if job.status == 'cancelled':
@@ -340,7 +449,10 @@ async def crawl_website_background(job_id, url, max_depth=2, output_format='all'
                     return None
                 if result:
                     job.progress += 1
-                    job.current_file = f'Downloaded: {os.path.basename(result["filepath"])}'
+                    job.current_file = f'Downloaded: {result["filename"]}'
+                    # Kept PDFs are named by their path, in-memory ones by their URL
+                    result['name'] = result['filepath'] or result['url']
+                    prefetch.append(asyncio.create_task(prefetch_papers(result['name'], result.pop('content'))))
                     downloaded_files.append(result)
                 return result
             
@@ -350,6 +462,8 @@ async def crawl_website_background(job_id, url, max_depth=2, output_format='all'
                 # Check if cancelled before each batch
                 if job.status == 'cancelled':
                     logger.info(f"Crawl job {job_id} was cancelled during download batch {i//batch_size + 1}")
+                    for task in prefetch:
+                        task.cancel()
                     save_job_to_history(job)
                     return
                 
@@ -360,10 +474,15 @@ async def crawl_website_background(job_id, url, max_depth=2, output_format='all'
             # Check if job was cancelled during download
             if job.status == 'cancelled':
                 logger.info(f"Crawl job {job_id} was cancelled during download")
+                for task in prefetch:
+                    task.cancel()
                 save_job_to_history(job)
                 return
             
             logger.info(f"Successfully downloaded {len(downloaded_files)} PDFs")
+            if prefetch:
+                job.current_file = f'Extracting {len(prefetch)} downloaded PDFs...'
+                await asyncio.gather(*prefetch, return_exceptions=True)
             
             # Enhance downloaded files with HTML metadata
             logger.info(f"Total HTML metadata entries: {len(crawler.html_metadata)}")
@@ -371,7 +490,7 @@ async def crawl_website_background(job_id, url, max_depth=2, output_format='all'
                 pdf_url = file_info.get('url')
                 if pdf_url and pdf_url in crawler.html_metadata:
                     file_info['html_metadata'] = crawler.html_metadata[pdf_url]
-                    logger.info(f"Associated HTML metadata with {file_info['filepath']}: {list(crawler.html_metadata[pdf_url].keys())}")
+                    logger.info(f"Associated HTML metadata with {file_info['name']}: {list(crawler.html_metadata[pdf_url].keys())}")
                 else:
                     logger.warning(f"No HTML metadata for URL: {pdf_url}")
         
@@ -383,9 +502,12 @@ async def crawl_website_background(job_id, url, max_depth=2, output_format='all'
             return
         
         # Process downloaded PDFs with source URL for journal detection
-        pdf_files = [f['filepath'] for f in downloaded_files]
-        html_metadata_map = {f['filepath']: f.get('html_metadata', {}) for f in downloaded_files}
-        process_pdfs_background(job_id, pdf_files, output_format, source_url=url, html_metadata=html_metadata_map, language=language)
+        pdf_files = [f['name'] for f in downloaded_files]
+        html_metadata_map = {f['name']: f.get('html_metadata', {}) for f in downloaded_files}
+        # Files whose extraction failed above are retried from disk (kept PDFs)
+        # or reported as errors (in-memory PDFs)
+        process_pdfs_background(job_id, pdf_files, output_format, source_url=url, html_metadata=html_metadata_map,
+                                language=language, detected=prefetched)
         
     except Exception as e:
         job.status = 'failed'
@@ -503,6 +625,21 @@ def process_directory():
     if not pdf_files:
         return jsonify({'error': 'No PDFs found in directory'}), 400
     
+    # Incremental mode: only new or changed files are processed again
+    manifest = None
+    reused_papers = []
+    total_files = len(pdf_files)
+    if data.get('incremental', True):
+        manifest = DirectoryManifest(directory)
+        pdf_files, unchanged = manifest.scan(pdf_files)
+        for pdf_path, entry in unchanged.items():
+            stored = pdf_extractor.load_papers(entry['result_id'], pdf_path)
+            if stored:
+                reused_papers.extend(stored)
+            else:
+                # Stored result evicted from the cache
+                pdf_files.append(pdf_path)
+    
     # Create job
     job_counter += 1
     job_id = f"job_{job_counter}"
@@ -513,14 +650,15 @@ def process_directory():
     thread = threading.Thread(
         target=process_pdfs_background,
         args=(job_id, pdf_files, output_format),
-        kwargs={'language': language}
+        kwargs={'language': language, 'manifest': manifest, 'reused_papers': reused_papers}
     )
     thread.daemon = True
     thread.start()
     
     return jsonify({
         'job_id': job_id,
-        'message': f'Processing {len(pdf_files)} files from directory'
+        'message': f'Processing {len(pdf_files)} of {total_files} files from directory '
+                   f'({total_files - len(pdf_files)} unchanged)'
     })
 
 
@@ -542,6 +680,12 @@ def job_status(job_id):
         'results_count': len(job.results),  # Include current count even during processing
     }
     
+    if job.timings.files:
+        response['timings'] = job.timings.to_dict()
+    
+    if job.failed_files:
+        response['failed_files'] = job.failed_files
+    
     if job.end_time:
         response['end_time'] = job.end_time.isoformat()
         response['duration'] = (job.end_time - job.start_time).total_seconds()
@@ -639,6 +783,12 @@ def get_config():
     })
 
 
+@app.route('/api/cache/stats')
+def cache_stats():
+    """Get extraction cache statistics"""
+    return jsonify(pdf_extractor.cache_stats())
+
+
 @app.route('/api/jobs')
 def list_jobs():
     """List all jobs (current session)"""
@@ -873,13 +1023,39 @@ def save_settings():
             os.environ['OPENAI_API_KEY'] = settings['openai_api_key']
         
         # Reinitialize classifier with new settings
-        global classifier, pdf_extractor
+        global classifier, pdf_extractor, extraction_executor, extraction_workers, keep_crawled_pdfs
+        global doc_timeout_s, doc_memory_mb
         custom_categories = settings.get('custom_categories', None)
         classifier = AIClassifier(custom_categories=custom_categories)
         
         # Reinitialize PDF extractor with vision setting
+        # (a job still running on the old extractor restarts its pool if needed)
         use_vision = settings.get('use_vision_extraction', True)
-        pdf_extractor = PDFExtractor(use_vision=use_vision, api_key=settings.get('openai_api_key'))
+        extraction_executor = settings.get('extraction_executor', extraction_executor)
+        extraction_workers = int(settings.get('extraction_workers', extraction_workers))
+        keep_crawled_pdfs = bool(settings.get('keep_crawled_pdfs', True))
+        doc_timeout_s = settings.get('doc_timeout_s', doc_timeout_s)
+        doc_memory_mb = settings.get('doc_memory_mb', doc_memory_mb)
+        pdf_extractor.shutdown(wait=False)
+        pdf_extractor = PDFExtractor(
+            use_vision=use_vision,
+            api_key=settings.get('openai_api_key'),
+            cache_backend=settings.get('cache_backend', 'sqlite'),
+            cache_max_bytes=int(settings.get('cache_max_mb', 512)) * 1024 * 1024,
+            vision_batch_size=int(settings.get('vision_batch_size', 4)),
+            vision_sections=bool(settings.get('vision_sections', False)),
+            vision_grayscale=bool(settings.get('vision_grayscale', False)),
+            vision_min_confidence=settings.get('vision_min_confidence', 0.5),
+            vision_required_fields=settings.get('vision_required_fields', ['title', 'authors', 'year', 'journal']),
+            collect_timings=bool(settings.get('extraction_timings', True)),
+            memory_ceiling_mb=settings.get('memory_ceiling_mb'),
+            doc_timeout=doc_timeout_s,
+            doc_memory_mb=doc_memory_mb,
+            layout_templates=bool(settings.get('layout_templates', True)),
+            text_backend=settings.get('text_backend', 'auto'),
+            parallel_page_threshold=settings.get('parallel_page_threshold', 200),
+            parallel_workers=extraction_workers
+        )
         
         return jsonify({'success': True, 'message': 'Settings saved successfully'})
     except Exception as e:
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark: vectorized paper-boundary detection vs. the original loops
+
+Runs both implementations of _find_paper_boundaries (per-page feature
+matrix scored with NumPy, and the original page / line / regex loops) over
+deterministic page texts of multi-paper documents: paper fronts every few
+pages, body pages with section headers, "References" and "Keywords" lines
+that must not start a paper, blank and CJK pages. Checks that they agree
+and reports per-document timings as JSON.
+
+Usage:
+    python benchmarks/bench_boundaries.py [--pages 1000] [--docs 5] [--repeat 3]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+logging.disable(logging.WARNING)
+
+from pdf_extractor import PDFExtractor, NEW_PAPER_RES  # noqa: E402
+
+
+class LegacyBoundaries:
+    """The pre-vectorization implementation, kept verbatim for comparison"""
+
+    def find_paper_boundaries(self, pages, total_pages: int) -> list:
+        boundaries = []
+        filtered_starts = [start for start in (self._page_start_candidate(page_num, page_text)
+                                               for page_num, page_text in enumerate(pages)) if start]
+        if not filtered_starts:
+            return [{'start_page': 0, 'end_page': total_pages - 1, 'title': 'Unknown'}]
+        for i, start in enumerate(filtered_starts):
+            end_page = filtered_starts[i + 1]['page'] - 1 if i + 1 < len(filtered_starts) else total_pages - 1
+            if end_page - start['page'] >= 1:
+                boundaries.append({'start_page': start['page'], 'end_page': end_page, 'title': start['line'][:100]})
+        if boundaries and boundaries[0]['start_page'] > 0:
+            boundaries.insert(0, {'start_page': 0, 'end_page': boundaries[0]['start_page'] - 1, 'title': 'Unknown'})
+        return boundaries if boundaries else [{'start_page': 0, 'end_page': total_pages - 1, 'title': 'Unknown'}]
+
+    def _page_start_candidate(self, page_num: int, page_text: str):
+        lines = page_text.strip().split('\n')
+        best = None
+        for line_num, line in enumerate(lines[:10]):
+            line = line.strip()
+            if len(line) < 10:
+                continue
+            for pattern in NEW_PAPER_RES:
+                if pattern.match(line):
+                    if self._is_likely_paper_start(lines, line_num, page_num):
+                        confidence = self._calculate_start_confidence(lines, line_num)
+                        if best is None or confidence > best['confidence']:
+                            best = {'page': page_num, 'line': line, 'confidence': confidence}
+                    break
+        return best
+
+    def _is_likely_paper_start(self, lines, line_num: int, page_num: int) -> bool:
+        if page_num == 0:
+            return True
+        next_lines = ' '.join(lines[line_num + 1:line_num + 5]).lower()
+        indicators = ['abstract', 'author', 'university', 'department', 'email', '@', 'keywords', 'introduction']
+        return any(indicator in next_lines for indicator in indicators)
+
+    def _calculate_start_confidence(self, lines, line_num: int) -> float:
+        confidence = 0.5
+        context = ' '.join(lines[max(0, line_num - 2):min(len(lines), line_num + 5)]).lower()
+        if 'abstract' in context:
+            confidence += 0.3
+        if 'author' in context or 'university' in context:
+            confidence += 0.2
+        if 'keywords' in context:
+            confidence += 0.1
+        if '@' in context or 'email' in context:
+            confidence += 0.1
+        if 'conclusion' in context or 'references' in context:
+            confidence -= 0.3
+        if 'section' in context or 'chapter' in context:
+            confidence -= 0.2
+        return max(0.0, min(1.0, confidence))
+
+
+TITLE_WORDS = ['Widget', 'Dynamics', 'Modern', 'Systems', 'Gadget', 'Theory', 'Practice', 'Sprocket',
+               'Alignment', 'Variable', 'Load', 'Survey', 'Flange', 'Methods', 'Chapter', 'Section']
+FRONT_LINES = ['Department of Physics, University of Somewhere', 'email: author@example.edu',
+               'Abstract', 'ABSTRACT: widgets in depth', 'Keywords: widgets, gadgets',
+               'KEYWORDSsection overlap', '1. Introduction', 'I. INTRODUCTION', 'Conclusion',
+               'References', 'See Section 3 and Chapter 2']
+
+
+def make_document(pages: int, rng: random.Random) -> list:
+    """Page texts of a multi-paper document (paper fronts every 2-12 pages)"""
+    texts = []
+    next_front = 0
+    for page_num in range(pages):
+        lines = [f'Journal of Applied Widgets, Vol. {rng.randint(1, 40)}, {rng.randint(1990, 2024)}']
+        if page_num == next_front:
+            lines.append(' '.join(rng.choice(TITLE_WORDS) for _ in range(rng.randint(2, 8))))
+            lines += rng.sample(FRONT_LINES, rng.randint(0, 4))
+            next_front += rng.randint(1, 12)
+        elif rng.random() < 0.05:
+            lines = ['']  # blank page
+        elif rng.random() < 0.05:
+            lines = ['正文內容第一行。', '透視農村電影放映員──以二十世紀五十年代江蘇省為例']
+        else:
+            for _ in range(rng.randint(0, 3)):
+                lines.insert(rng.randint(0, len(lines)), rng.choice(FRONT_LINES + ['Results and Discussion']))
+        lines += [f'   Body text line {i} about widgets and their behaviour.' for i in range(rng.randint(5, 45))]
+        texts.append('\n'.join(lines))
+    return texts
+
+
+def time_it(func, documents, repeat: int) -> float:
+    """Best of repeat passes over every document, in seconds per document"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for pages in documents:
+            func(pages, len(pages))
+        elapsed = (time.perf_counter() - start) / len(documents)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=1000, help='Pages per generated document')
+    parser.add_argument('--docs', type=int, default=5, help='Number of generated documents')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions (best is reported)')
+    args = parser.parse_args()
+
+    rng = random.Random(1234)
+    documents = [make_document(args.pages, rng) for _ in range(args.docs)]
+    extractor = PDFExtractor(use_vision=False, use_cache=False)
+    legacy = LegacyBoundaries()
+
+    mismatches = sum(extractor._find_paper_boundaries(pages, len(pages))
+                     != legacy.find_paper_boundaries(pages, len(pages)) for pages in documents)
+    papers = [len(extractor._find_paper_boundaries(pages, len(pages))) for pages in documents]
+    legacy_s = time_it(legacy.find_paper_boundaries, documents, args.repeat)
+    vectorized_s = time_it(extractor._find_paper_boundaries, documents, args.repeat)
+
+    report = {
+        'generated': datetime.datetime.now().isoformat(timespec='seconds'),
+        'documents': args.docs,
+        'pages_per_document': args.pages,
+        'papers_found': papers,
+        'mismatches': mismatches,
+        'legacy_ms_per_doc': round(legacy_s * 1000, 2),
+        'vectorized_ms_per_doc': round(vectorized_s * 1000, 2),
+        'speedup': round(legacy_s / vectorized_s, 2) if vectorized_s else None,
+    }
+    print(json.dumps(report, indent=2))
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,391 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Stage-level benchmark of pdf_extractor over a generated PDF corpus
+
+Generates a deterministic local corpus with PyMuPDF (single articles,
+multi-paper anthologies, CJK articles and text-less "scanned" PDFs, each at
+several page counts) and times every extraction stage per document:
+
+    parse                     open a PDFDocument session
+    _extract_metadata         PDF info dictionary
+    _extract_text             first pages of text
+    _extract_headers_footers  header/footer lines
+    _enhance_metadata         pattern stage (header/footer lookup included)
+    render                    first page to a vision JPEG (_pdf_page_to_image)
+    extract_from_pdf          end to end, text only
+    detect_multiple_papers    end to end, multi-paper split
+
+Stage timings are "cold" on a fresh document session and "warm" on a session
+whose page text / images are already memoized. The two end-to-end stages are
+cold with an empty result cache and warm once it holds the document. Reports
+p50/p95/mean latency per stage and corpus kind, plus docs/s and pages/s, as
+JSON. Vision API calls are never made.
+
+Each text backend (see text_backends) then runs extract_from_pdf and
+detect_multiple_papers over the corpus, without a cache, and is scored on
+speed and on field accuracy: title / authors / year / journal / issue of
+every paper against what the corpus generator wrote (scanned documents
+have no text fields and are timed only).
+
+The run happens in a temporary working directory, so the project's
+.cache/pdf_metadata is never touched.
+
+Usage:
+    python benchmarks/bench_extraction.py [--pages 1,8,32] [--repeat 3]
+                                          [--kinds single,anthology,cjk,scanned]
+                                          [--backends pdfplumber,pypdf2,pymupdf,auto]
+                                          [--corpus DIR] [--output FILE]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import datetime
+import logging
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+logging.disable(logging.WARNING)
+
+from pdf_extractor import PDFExtractor, PDFDocument, PYMUPDF_AVAILABLE  # noqa: E402
+from text_backends import available_backends  # noqa: E402
+
+if PYMUPDF_AVAILABLE:
+    try:
+        import pymupdf as fitz
+    except ImportError:
+        import fitz
+
+KINDS = ('single', 'anthology', 'cjk', 'scanned')
+STAGES = ('parse', '_extract_metadata', '_extract_text', '_extract_headers_footers',
+          '_enhance_metadata', 'render', 'extract_from_pdf', 'detect_multiple_papers')
+
+HEADER = 'Journal of Applied Widgets, Vol. {volume}, No. {issue}, {year}, pp. {first}-{last}'
+CJK_HEADER = '《二十一世紀》網絡版 二○○九年三月號 總第 {issue} 期 {year}年3月31日'
+TITLES = [
+    'Widget Dynamics in Modern Systems: A Study',
+    'Gadget Theory and Practice Revisited',
+    'On the Nature of Sprockets Today',
+    'Cog Alignment Under Variable Load',
+    'A Survey of Flange Manufacturing Methods',
+]
+AUTHORS = ['John Smith, Jane Doe', 'Alice Brown, Bob White', 'J. Smith, A. B. Johnson']
+CJK_TITLES = ['透視農村電影放映員──以二十世紀五十年代江蘇省為例', '南京國民政府時期的地方財政研究']
+ACCURACY_FIELDS = ('title', 'authors', 'year', 'journal', 'issue')
+
+
+# ---------------------------------------------------------------- corpus
+
+def _page(doc, lines, font='helv', size=11):
+    page = doc.new_page(width=595, height=842)
+    y = 60
+    for line in lines:
+        page.insert_text((50, y), line, fontname=font, fontsize=size)
+        y += 16
+
+
+def _article(doc, number: int, pages: int, first_page: int):
+    """An English article of `pages` pages with a journal header"""
+    header = HEADER.format(volume=12, issue=3, year=2015 + number % 8,
+                           first=first_page, last=first_page + pages - 1)
+    _page(doc, [header, '', TITLES[number % len(TITLES)], AUTHORS[number % len(AUTHORS)],
+                'Department of Physics, University of Somewhere', 'email: a.smith@example.edu', '',
+                'Abstract', 'This paper studies widgets and gadgets in depth.',
+                'Keywords: widgets, gadgets', '1. Introduction']
+          + [f'Body text line {i} about widgets and their behaviour.' for i in range(30)]
+          + [str(first_page)])
+    for k in range(1, pages):
+        _page(doc, ['Journal of Applied Widgets']
+              + [f'More body text for section {k} line {i} of the paper.' for i in range(40)]
+              + [str(first_page + k)])
+
+
+def _cjk_article(doc, pages: int):
+    _page(doc, [CJK_HEADER.format(issue=84, year=2009), CJK_TITLES[0], '⊙ 張三',
+                '目前對於南京國民政府已有大量的研究成果。']
+          + [f'正文內容第{i}行。' for i in range(30)], font='china-t')
+    for k in range(1, pages):
+        _page(doc, ['《二十一世紀》網絡版 總第 84 期'] + [f'正文第{k}頁第{i}行。' for i in range(40)],
+              font='china-t')
+
+
+def _scanned(doc, pages: int):
+    """Image-only pages: no text layer at all"""
+    for k in range(pages):
+        page = doc.new_page(width=595, height=842)
+        pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 300, 424), False)
+        pix.clear_with(180 + k % 60)
+        page.insert_image(page.rect, pixmap=pix)
+
+
+def build_corpus(out_dir: str, page_counts, kinds=KINDS) -> list:
+    """Write the corpus (deterministic) and return [{path, kind, pages}]"""
+    os.makedirs(out_dir, exist_ok=True)
+    corpus = []
+    for kind in kinds:
+        for pages in page_counts:
+            path = os.path.join(out_dir, f'{kind}_{pages:04d}.pdf')
+            if not os.path.exists(path):
+                doc = fitz.open()
+                if kind == 'single':
+                    _article(doc, 0, pages, 1)
+                elif kind == 'anthology':
+                    # Five-page papers (shorter for small page counts)
+                    per_paper = min(5, max(1, pages // 2))
+                    number, first_page = 0, 1
+                    while first_page <= pages:
+                        length = min(per_paper, pages - first_page + 1)
+                        _article(doc, number, length, first_page)
+                        number += 1
+                        first_page += length
+                elif kind == 'cjk':
+                    _cjk_article(doc, pages)
+                else:
+                    _scanned(doc, pages)
+                doc.set_metadata({'creationDate': 'D:20200101000000'})
+                doc.save(path, garbage=3, deflate=True)
+                doc.close()
+            corpus.append({'path': path, 'kind': kind, 'pages': pages})
+    return corpus
+
+
+def expected_papers(kind: str, pages: int) -> list:
+    """Fields of each paper the generator wrote into a document"""
+    def article(number):
+        return {'title': TITLES[number % len(TITLES)], 'authors': AUTHORS[number % len(AUTHORS)],
+                'year': str(2015 + number % 8), 'journal': 'Journal of Applied Widgets', 'issue': '3'}
+    if kind == 'single':
+        return [article(0)]
+    if kind == 'anthology':
+        per_paper = min(5, max(1, pages // 2))
+        return [article(number) for number in range((pages + per_paper - 1) // per_paper)]
+    if kind == 'cjk':
+        return [{'title': CJK_TITLES[0], 'authors': '張三', 'year': '2009', 'journal': '二十一世紀',
+                 'issue': '84'}]
+    return []
+
+
+# ---------------------------------------------------------------- timing
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples) -> dict:
+    return {
+        'n': len(samples),
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p95_ms': round(percentile(samples, 95) * 1000, 3),
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 3),
+    }
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def stage_calls(extractor: PDFExtractor, content: str):
+    """stage name -> callable(doc) for the per-session stages"""
+    return {
+        '_extract_metadata': extractor._extract_metadata,
+        '_extract_text': extractor._extract_text,
+        '_extract_headers_footers': extractor._extract_headers_footers,
+        '_enhance_metadata': lambda doc: extractor._enhance_metadata({}, content, doc),
+        'render': lambda doc: extractor._pdf_page_to_image(doc, 0),
+    }
+
+
+def bench_stages(extractor: PDFExtractor, item: dict, repeat: int, samples: dict):
+    path, kind = item['path'], item['kind']
+    with PDFDocument(path) as doc:
+        content = extractor._extract_text(doc)
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        doc = PDFDocument(path)
+        samples[kind]['parse']['cold'].append(time.perf_counter() - start)
+        doc.close()
+
+    for stage, call in stage_calls(extractor, content).items():
+        for _ in range(repeat):
+            with PDFDocument(path) as doc:
+                samples[kind][stage]['cold'].append(timed(call, doc))
+                samples[kind][stage]['warm'].append(timed(call, doc))
+
+
+def bench_end_to_end(item: dict, repeat: int, samples: dict, totals: dict):
+    """Cold: fresh extractor and empty cache per run; warm: cache populated"""
+    path, kind = item['path'], item['kind']
+    for stage, method in (('extract_from_pdf', 'extract_from_pdf'),
+                          ('detect_multiple_papers', 'detect_multiple_papers')):
+        for _ in range(repeat):
+            workdir = tempfile.mkdtemp(prefix='bench_cache_')
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            try:
+                extractor = PDFExtractor(use_vision=False, use_cache=True)
+                for state in ('cold', 'warm'):
+                    elapsed = timed(getattr(extractor, method), path)
+                    samples[kind][stage][state].append(elapsed)
+                    totals[stage][state]['seconds'] += elapsed
+                    totals[stage][state]['docs'] += 1
+                    totals[stage][state]['pages'] += item['pages']
+                extractor.shutdown()
+                if extractor.cache:
+                    extractor.cache.close()
+            finally:
+                os.chdir(cwd)
+                shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _same(found, expected: str) -> bool:
+    compact = lambda text: ''.join(str(text or '').split()).lower()
+    return compact(found) == compact(expected)
+
+
+def bench_backends(corpus: list, backends: list, repeat: int) -> dict:
+    """Speed and field accuracy of each text backend, end to end without a cache
+
+    extract_from_pdf is scored on the document's first paper and
+    detect_multiple_papers on every paper (matched in order; a missed or
+    extra paper scores its fields as wrong).
+    """
+    report = {}
+    for backend in backends:
+        extractor = PDFExtractor(use_vision=False, use_cache=False, text_backend=backend)
+        seconds = defaultdict(float)
+        pages = 0
+        correct = defaultdict(lambda: defaultdict(int))
+        total = defaultdict(lambda: defaultdict(int))
+        for item in corpus:
+            expected = expected_papers(item['kind'], item['pages'])
+            for _ in range(repeat):
+                start = time.perf_counter()
+                single = extractor.extract_from_pdf(item['path'])
+                seconds['extract_from_pdf'] += time.perf_counter() - start
+                start = time.perf_counter()
+                papers = extractor.detect_multiple_papers(item['path'])
+                seconds['detect_multiple_papers'] += time.perf_counter() - start
+                pages += item['pages']
+            for stage, found in (('extract_from_pdf', [single]), ('detect_multiple_papers', papers)):
+                wanted = expected[:1] if stage == 'extract_from_pdf' else expected
+                for index, paper in enumerate(wanted):
+                    result = found[index] if index < len(found) else {}
+                    for field in ACCURACY_FIELDS:
+                        total[stage][field] += 1
+                        correct[stage][field] += _same(result.get(field), paper[field])
+                # Papers split off that the generator never wrote
+                total[stage]['extra_papers'] += max(0, len(found) - len(wanted)) if wanted else 0
+        extractor.shutdown()
+
+        report[backend] = {}
+        for stage in ('extract_from_pdf', 'detect_multiple_papers'):
+            fields = {field: round(correct[stage][field] / total[stage][field], 3)
+                      for field in ACCURACY_FIELDS if total[stage][field]}
+            checked = sum(total[stage][field] for field in ACCURACY_FIELDS)
+            report[backend][stage] = {
+                'seconds': round(seconds[stage], 3),
+                'pages_per_s': round(pages / seconds[stage], 2) if seconds[stage] else None,
+                'field_accuracy': round(sum(correct[stage][field] for field in ACCURACY_FIELDS) / checked, 3)
+                if checked else None,
+                'fields': fields,
+                'extra_papers': total[stage]['extra_papers'],
+            }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', default='1,8,32', help='Comma-separated page counts per corpus kind')
+    parser.add_argument('--kinds', default=','.join(KINDS), help='Comma-separated corpus kinds')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per document and stage')
+    parser.add_argument('--backends', default=','.join(available_backends()),
+                        help='Comma-separated text backends to compare (empty: skip)')
+    parser.add_argument('--corpus', default=None,
+                        help='Directory for the generated corpus (kept; default: temporary)')
+    parser.add_argument('--output', default=None, help='Also write the JSON report to this file')
+    args = parser.parse_args()
+
+    if not PYMUPDF_AVAILABLE:
+        print('PyMuPDF is required to generate the corpus (pip install pymupdf)', file=sys.stderr)
+        return 2
+
+    page_counts = [int(p) for p in args.pages.split(',') if p.strip()]
+    kinds = [k.strip() for k in args.kinds.split(',') if k.strip()]
+    unknown = [k for k in kinds if k not in KINDS]
+    if unknown:
+        parser.error(f'unknown kinds: {", ".join(unknown)}')
+    backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+    unknown = [b for b in backends if b not in available_backends()]
+    if unknown:
+        parser.error(f'unknown or unavailable backends: {", ".join(unknown)}')
+
+    corpus_dir = args.corpus or tempfile.mkdtemp(prefix='bench_corpus_')
+    output = os.path.abspath(args.output) if args.output else None
+    corpus = build_corpus(corpus_dir, page_counts, kinds)
+    for item in corpus:
+        item['path'] = os.path.abspath(item['path'])
+
+    samples = defaultdict(lambda: defaultdict(lambda: {'cold': [], 'warm': []}))
+    totals = defaultdict(lambda: defaultdict(lambda: {'seconds': 0.0, 'docs': 0, 'pages': 0}))
+
+    workdir = tempfile.mkdtemp(prefix='bench_work_')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        extractor = PDFExtractor(use_vision=False, use_cache=False)
+        for item in corpus:
+            bench_stages(extractor, item, args.repeat, samples)
+            bench_end_to_end(item, args.repeat, samples, totals)
+        backend_report = bench_backends(corpus, backends, args.repeat)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+        if not args.corpus:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    stages = {}
+    for kind in kinds:
+        stages[kind] = {}
+        for stage in STAGES:
+            runs = samples[kind][stage]
+            stages[kind][stage] = {state: summarize(values) for state, values in runs.items() if values}
+
+    throughput = {}
+    for stage, states in totals.items():
+        throughput[stage] = {
+            state: {
+                'docs_per_s': round(t['docs'] / t['seconds'], 2) if t['seconds'] else None,
+                'pages_per_s': round(t['pages'] / t['seconds'], 2) if t['seconds'] else None,
+            }
+            for state, t in states.items()
+        }
+
+    report = {
+        'generated': datetime.datetime.now().isoformat(timespec='seconds'),
+        'corpus': {'kinds': kinds, 'page_counts': page_counts, 'documents': len(corpus)},
+        'repeat': args.repeat,
+        'stages': stages,
+        'throughput': throughput,
+        'backends': backend_report,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
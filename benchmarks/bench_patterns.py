@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark: compiled pattern engine vs. the original per-pattern loops
+
+Runs both implementations of the regex stages of _enhance_metadata (journal,
+title, authors, year, volume/issue/pages) over a deterministic set of text
+windows, checks that they agree, and reports per-call timings as JSON.
+
+Usage:
+    python benchmarks/bench_patterns.py [--docs 200] [--repeat 5]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+logging.disable(logging.WARNING)
+
+from pdf_extractor import PDFExtractor  # noqa: E402
+
+
+class LegacyPatterns:
+    """The pre-engine implementation, kept verbatim for comparison"""
+
+    def __init__(self, extractor: PDFExtractor):
+        self.metadata_patterns = extractor.metadata_patterns
+        self._chinese_year_to_arabic = extractor._chinese_year_to_arabic
+
+    def enhance(self, content: str, header_footer_text: str) -> dict:
+        content_lines = content.split('\n')
+        metadata = {
+            'journal': self._extract_journal(header_footer_text, content),
+            'title': self._extract_title(content, content_lines),
+            'authors': self._extract_authors(content, content_lines),
+            'year': self._extract_year(content),
+        }
+        for field in ('volume', 'issue'):
+            metadata[field] = None
+            for pattern in self.metadata_patterns[field]:
+                match = re.search(pattern, header_footer_text, re.IGNORECASE)
+                if match:
+                    metadata[field] = match.group(1)
+                    break
+            if not metadata[field]:
+                for pattern in self.metadata_patterns[field]:
+                    match = re.search(pattern, content[:2000], re.IGNORECASE)
+                    if match:
+                        metadata[field] = match.group(1)
+                        break
+        metadata['pages'] = None
+        for pattern in self.metadata_patterns['pages']:
+            match = re.search(pattern, content[:2000], re.IGNORECASE)
+            if match:
+                if len(match.groups()) >= 2:
+                    metadata['pages'] = f"{match.group(1)}-{match.group(2)}"
+                break
+        return metadata
+
+    def _extract_title(self, content, lines):
+        for pattern in self.metadata_patterns['title']:
+            match = re.search(pattern, content[:1500], re.MULTILINE)
+            if match:
+                title = match.group(1).strip()
+                if 10 <= len(title) <= 300:
+                    title = re.sub(r'\s+', ' ', title)
+                    title = title.strip('.,;:')
+                    return title
+        for i, line in enumerate(lines[:10]):
+            line = line.strip()
+            if len(line) < 10 or len(line) > 300:
+                continue
+            if re.match(r'^\d+$', line):
+                continue
+            if line.lower() in ['abstract', 'introduction', 'keywords']:
+                continue
+            if re.match(r'^[A-Z]', line) and not line.endswith(':'):
+                return line
+        return None
+
+    def _extract_authors(self, content, lines):
+        for pattern in self.metadata_patterns['author'][:3]:
+            match = re.search(pattern, content[:2000], re.MULTILINE | re.IGNORECASE)
+            if match:
+                authors = match.group(1).strip()
+                authors = re.sub(r'\s+', ' ', authors)
+                if len(authors) > 3 and len(authors) < 500:
+                    return authors
+        potential_authors = []
+        for i, line in enumerate(lines[:20]):
+            line = line.strip()
+            if i == 0 or 'abstract' in line.lower():
+                continue
+            if re.search(r'[A-Z][a-z]+\s+[A-Z][a-z]+', line):
+                next_lines = ' '.join(lines[i:i+3]).lower()
+                if any(indicator in next_lines for indicator in ['@', 'university', 'department', 'institute', 'college']):
+                    potential_authors.append(line)
+                    break
+        if potential_authors:
+            return potential_authors[0][:200]
+        return None
+
+    def _extract_year(self, content):
+        current_year = datetime.datetime.now().year
+        for window in (content[:500], content[:3000]):
+            years = []
+            for pattern in self.metadata_patterns['year']:
+                for match in re.findall(pattern, window, re.IGNORECASE):
+                    year_str = match if isinstance(match, str) else match[0]
+                    if re.match(r'[二三四五六七八九○〇零一]{4}', year_str):
+                        arabic_year = self._chinese_year_to_arabic(year_str)
+                        if arabic_year:
+                            year_str = arabic_year
+                    try:
+                        year = int(year_str)
+                        if 1900 <= year <= current_year + 1:
+                            years.append(year_str)
+                    except ValueError:
+                        continue
+            if years:
+                valid_years = [y for y in years if int(y) <= current_year]
+                if valid_years:
+                    return max(valid_years)
+                return max(years)
+        return None
+
+    def _extract_journal(self, header_footer_text, content):
+        if header_footer_text:
+            for pattern in self.metadata_patterns['journal']:
+                match = re.search(pattern, header_footer_text, re.MULTILINE)
+                if match:
+                    journal = re.sub(r'\s+', ' ', match.group(1).strip())
+                    if 3 <= len(journal) <= 100:
+                        return journal
+        for pattern in self.metadata_patterns['journal']:
+            match = re.search(pattern, content[:500], re.MULTILINE)
+            if match:
+                journal = re.sub(r'\s+', ' ', match.group(1).strip())
+                if 3 <= len(journal) <= 100:
+                    return journal
+        return None
+
+
+def engine_enhance(extractor: PDFExtractor, content: str, header_footer_text: str) -> dict:
+    """Same fields as LegacyPatterns.enhance, through the compiled engine"""
+    engine = extractor.pattern_engine
+    content_lines = content.split('\n')
+    metadata = {
+        'journal': extractor._extract_journal(header_footer_text, content),
+        'title': extractor._extract_title(content, content_lines),
+        'authors': extractor._extract_authors(content, content_lines),
+        'year': extractor._extract_year(content),
+    }
+    for field in ('volume', 'issue'):
+        candidate = (engine.first(field, header_footer_text, re.IGNORECASE)
+                     or engine.first(field, content[:2000], re.IGNORECASE))
+        metadata[field] = candidate.value if candidate else None
+    candidate = engine.first('pages', content[:2000], re.IGNORECASE)
+    metadata['pages'] = (f"{candidate.groups[0]}-{candidate.groups[1]}"
+                         if candidate and len(candidate.groups) >= 2 else None)
+    return metadata
+
+
+LINE_POOL = [
+    '《二十一世紀》網絡版 二○○九年三月號 總第 84 期 2009年3月31日',
+    '透視農村電影放映員──以二十世紀五十年代江蘇省為例',
+    '⊙ 趙利棟',
+    '目前對於南京國民政府已有大量的研究成果，這些成果主要集中於上層的政治活動層面。',
+    '中國神學研究院期刊 第 45 期 頁 12-34',
+    'Journal of Applied Widgets, Vol. 12, No. 3, 2021, pp. 45-67',
+    'Proceedings of the International Conference on Sprockets',
+    'Widget Dynamics in Modern Systems: A Study',
+    'GADGET THEORY AND PRACTICE REVISITED',
+    'John Smith, Jane Doe',
+    'J. Smith, A. B. Johnson',
+    'Department of Physics, University of Somewhere',
+    'email: a.smith@example.edu',
+    'Abstract',
+    'This paper studies widgets and gadgets published in March 2019 and revised 2020.',
+    'Keywords: widgets, gadgets, sprockets',
+    '1. Introduction',
+    'Copyright © 2018 Example Press. Published: 2018',
+    'Volume 7 Issue 2 (2015) Pages: 101-119',
+    'Body text with citations (Smith 2004; Doe 1999) and numbers (3).',
+    '12',
+]
+
+
+def make_windows(count: int, seed: int = 1234):
+    """Deterministic (content, header_footer_text) pairs"""
+    rng = random.Random(seed)
+    windows = []
+    for _ in range(count):
+        lines = [rng.choice(LINE_POOL) for _ in range(rng.randint(20, 120))]
+        headers = [rng.choice(LINE_POOL) for _ in range(rng.randint(0, 6))]
+        windows.append(('\n'.join(lines), '\n'.join(headers)))
+    return windows
+
+
+def time_it(func, windows, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content, hf_text in windows:
+            func(content, hf_text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=200, help='Number of generated text windows')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions (best is reported)')
+    args = parser.parse_args()
+
+    extractor = PDFExtractor(use_vision=False, use_cache=False)
+    legacy = LegacyPatterns(extractor)
+    windows = make_windows(args.docs)
+
+    mismatches = []
+    for i, (content, hf_text) in enumerate(windows):
+        old = legacy.enhance(content, hf_text)
+        new = engine_enhance(extractor, content, hf_text)
+        if old != new:
+            mismatches.append({'window': i, 'legacy': old, 'engine': new})
+
+    legacy_s = time_it(legacy.enhance, windows, args.repeat)
+    engine_s = time_it(lambda c, h: engine_enhance(extractor, c, h), windows, args.repeat)
+
+    print(json.dumps({
+        'windows': len(windows),
+        'legacy_ms_per_window': round(legacy_s / len(windows) * 1000, 4),
+        'engine_ms_per_window': round(engine_s / len(windows) * 1000, 4),
+        'speedup': round(legacy_s / engine_s, 2) if engine_s else None,
+        'mismatches': len(mismatches),
+        'first_mismatches': mismatches[:3]
+    }, indent=2, ensure_ascii=False))
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -19,15 +19,17 @@ matches = re.findall(pattern, content[:500])
 print(f"\nYears found in first 500 chars: {matches}")
 
 # Check what the extractor is doing
-from pdf_extractor import PDFExtractor
+from pdf_extractor import PDFExtractor, PDFDocument
 extractor = PDFExtractor(use_vision=False, use_cache=False)
 
+doc = PDFDocument('pdfs/0812018.pdf')
+
 # Get metadata
-metadata = extractor._extract_metadata('pdfs/0812018.pdf')
+metadata = extractor._extract_metadata(doc)
 print(f"\nMetadata year: {metadata.get('year')}")
 
 # Get enhanced metadata
-enhanced = extractor._enhance_metadata(metadata, content, 'pdfs/0812018.pdf')
+enhanced = extractor._enhance_metadata(metadata, content, doc)
 print(f"Enhanced year: {enhanced.get('year')}")
 
 # Test _extract_year directly
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Persistent manifest for incremental directory ingestion
+
+Records, for every PDF of a directory, its size, mtime, content hash and the
+ID of the stored detection result (the extractor's 'papers' cache entry).
+A re-run only hands new or changed files to extraction and reuses the stored
+results, multi-paper splits included, for everything else.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from pdf_cache import hash_file
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MANIFEST_DIR = '.cache/manifests'
+
+
+class DirectoryManifest:
+    """path -> {size, mtime, hash, result_id, job_id, updated} for one directory"""
+
+    def __init__(self, directory: str, manifest_dir: str = MANIFEST_DIR):
+        self.directory = os.path.abspath(directory)
+        digest = hashlib.sha1(self.directory.encode('utf-8')).hexdigest()[:16]
+        self.manifest_file = os.path.join(manifest_dir, f"{digest}.json")
+        self._lock = threading.Lock()
+        self.entries = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        if os.path.exists(self.manifest_file):
+            try:
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('directory') == self.directory:
+                    return data.get('files', {})
+            except Exception as e:
+                logger.warning(f"Failed to load manifest {self.manifest_file}: {e}")
+        return {}
+
+    def save(self):
+        """Persist the manifest (atomic replace)"""
+        os.makedirs(os.path.dirname(self.manifest_file), exist_ok=True)
+        tmp_file = f"{self.manifest_file}.{os.getpid()}.tmp"
+        with self._lock:
+            data = {'directory': self.directory, 'files': dict(self.entries)}
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_file, self.manifest_file)
+        except Exception as e:
+            logger.warning(f"Failed to save manifest {self.manifest_file}: {e}")
+
+    def scan(self, pdf_files: List[str]) -> Tuple[List[str], Dict[str, Dict]]:
+        """Split a directory listing into (files to process, unchanged entries)
+
+        A file is unchanged if its size and mtime match the manifest and it
+        has a stored result. Files no longer listed are dropped.
+        """
+        changed = []
+        unchanged = {}
+        listed = set()
+        with self._lock:
+            for pdf_path in pdf_files:
+                key = os.path.abspath(pdf_path)
+                listed.add(key)
+                entry = self.entries.get(key)
+                try:
+                    stat = os.stat(pdf_path)
+                except OSError:
+                    continue
+                if (entry and entry.get('result_id') and entry['size'] == stat.st_size
+                        and entry['mtime'] == stat.st_mtime_ns):
+                    unchanged[pdf_path] = entry
+                else:
+                    changed.append(pdf_path)
+            for key in [key for key in self.entries if key not in listed]:
+                del self.entries[key]
+
+        logger.info(f"Manifest for {self.directory}: {len(changed)} new or changed, "
+                    f"{len(unchanged)} unchanged")
+        return changed, unchanged
+
+    def record(self, pdf_path: str, result_id: Optional[str], content_hash: str = None,
+               job_id: str = None):
+        """Remember the stored result for a processed file"""
+        stat = os.stat(pdf_path)
+        if content_hash is None:
+            content_hash = result_id or hash_file(pdf_path)
+        with self._lock:
+            self.entries[os.path.abspath(pdf_path)] = {
+                'size': stat.st_size,
+                'mtime': stat.st_mtime_ns,
+                'hash': content_hash,
+                'result_id': result_id,
+                'job_id': job_id,
+                'updated': time.time()
+            }
+
+    def forget(self, pdf_path: str):
+        """Force a file to be processed again on the next run"""
+        with self._lock:
+            self.entries.pop(os.path.abspath(pdf_path), None)
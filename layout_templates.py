@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Per-journal layout templates learned from confident extractions
+
+A crawl of one journal yields hundreds of PDFs laid out the same way. Such
+PDFs share running header/footer lines (the journal name, "Vol. 12, No. 3"
+with the numbers changing), so each running line, digits masked, keys a
+template. Every document whose fields were settled confidently (by vision,
+or by strong pattern matches) adds an observation to the templates of its
+running lines:
+
+- title / authors: the first-page line where the field starts, and how many
+  lines it spans
+- journal: the journal string
+- volume / issue / year: a regex for the header/footer context the value
+  was found in (e.g. "Vol. (\\d+), No. \\d+")
+
+Once min_observations documents agree on a field (and at least two thirds
+of those recording it do), the template has a rule for it and reads the
+field straight from the text of later documents. Vision then only checks
+every validate_every-th document of the template; a field whose value
+disagrees with vision loses its observations, and is learned again from
+the documents vision reads next.
+"""
+
+import re
+import hashlib
+import logging
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LAYOUT_FIELDS = ('title', 'authors', 'journal', 'volume', 'issue', 'year')
+LINE_FIELDS = ('title', 'authors')  # found by their line on the first page
+HEADER_FIELDS = ('volume', 'issue', 'year')  # found by a header/footer regex
+
+MAX_SPAN = 4  # lines a title or author list may wrap over
+MAX_KEYS = 4  # running lines a document is filed under
+CONTEXT_BEFORE = 12  # header characters kept around a number for its regex
+CONTEXT_AFTER = 6
+
+DIGITS_RE = re.compile(r'\d+')
+WHITESPACE_RE = re.compile(r'\s+')
+WORD_CHAR_RE = re.compile(r'[A-Za-z0-9]')
+
+
+def mask_line(line: str) -> str:
+    """A header/footer line with digits masked and whitespace collapsed"""
+    return WHITESPACE_RE.sub(' ', DIGITS_RE.sub('#', line)).strip()
+
+
+def running_line_keys(headers: List[str], footers: List[str]) -> List[str]:
+    """Template keys for the lines repeated across sampled headers/footers
+
+    A line counts when it appears (masked) on at least two sampled pages and
+    has some text besides numbers; the most frequent MAX_KEYS are used.
+    """
+    counts = Counter()
+    for band in headers + footers:
+        counts.update({mask_line(line) for line in band.split('\n') if line.strip()})
+    running = [line for line, count in counts.most_common()
+               if count >= 2 and len(line.replace('#', '').replace(' ', '')) >= 4]
+    return [hashlib.sha1(line.encode('utf-8')).hexdigest()[:16] for line in running[:MAX_KEYS]]
+
+
+def _compact(text: str) -> str:
+    return WHITESPACE_RE.sub('', text).lower()
+
+
+def _page_lines(page_text: str) -> List[str]:
+    return [WHITESPACE_RE.sub(' ', line).strip() for line in page_text.split('\n') if line.strip()]
+
+
+def _join_lines(lines: List[str]) -> str:
+    """Join wrapped lines, with a space only between Latin words (not CJK)"""
+    text = ''
+    for line in lines:
+        if text and WORD_CHAR_RE.match(text[-1]) and WORD_CHAR_RE.match(line[0]):
+            text += ' '
+        text += line
+    return text
+
+
+def locate_lines(page_text: str, value: str) -> Optional[Tuple[int, int]]:
+    """(first line, line count) of value on a page, ignoring whitespace"""
+    target = _compact(value)
+    if len(target) < 4:
+        return None
+    lines = _page_lines(page_text)
+    for start, line in enumerate(lines):
+        joined = ''
+        for end in range(start, min(start + MAX_SPAN, len(lines))):
+            joined += _compact(lines[end])
+            if joined == target:
+                return start, end - start + 1
+            if not joined or not target.startswith(joined):
+                break
+    return None
+
+
+def header_pattern(header_text: str, value: str) -> Optional[str]:
+    """Regex reading value (a number) from the header line it appears in
+
+    The number becomes the capture group; its surroundings are kept
+    literally, with other numbers masked as \\d+.
+    """
+    if not value.isdigit():
+        return None
+    for line in header_text.split('\n'):
+        match = re.search(rf'(?<!\d){re.escape(value)}(?!\d)', line)
+        if match:
+            before = line[max(0, match.start() - CONTEXT_BEFORE):match.start()]
+            after = line[match.end():match.end() + CONTEXT_AFTER]
+            if not (before + after).strip():
+                continue
+            return _literal(before) + r'(\d+)' + _literal(after)
+    return None
+
+
+def _literal(text: str) -> str:
+    """Regex for text with numbers masked and whitespace loosened"""
+    parts = []
+    for piece in re.split(r'(\d+|\s+)', text):
+        if not piece:
+            continue
+        if piece.isdigit():
+            parts.append(r'\d+')
+        elif piece.isspace():
+            parts.append(r'\s*')
+        else:
+            parts.append(re.escape(piece))
+    return ''.join(parts)
+
+
+class LayoutTemplates:
+    """Learns per-journal layout templates and applies them to new documents
+
+    Args:
+        cache: CacheBackend shared with the extractor (templates are stored in
+            its 'layout_templates' namespace, so worker processes share them:
+            templates are read from it on every lookup and changed with one
+            cache.update each); None keeps them in this process only
+        min_observations: Agreeing confident documents needed for a rule
+        validate_every: A template's documents sent to vision as a check
+            (the first, then every validate_every-th)
+        learn_confidence: Confidence (0-1) a text-tier field needs to count
+            as an observation (vision answers always count)
+        max_observations: Observations kept per template (the most recent)
+    """
+
+    NAMESPACE = 'layout_templates'
+
+    def __init__(self, cache=None, min_observations: int = 3, validate_every: int = 10,
+                 learn_confidence: float = 0.8, max_observations: int = 20):
+        self.cache = cache
+        self.min_observations = min_observations
+        self.validate_every = validate_every
+        self.learn_confidence = learn_confidence
+        self.max_observations = max_observations
+        self._templates = {}  # key -> {observations, checks, misses}
+        self._uses = Counter()  # key -> documents this process applied it to
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _new() -> Dict:
+        return {'observations': [], 'checks': 0, 'misses': 0}
+
+    def _load(self, key: str) -> Dict:
+        """A template as currently stored (other workers may have changed it)"""
+        stored = None
+        if self.cache is not None:
+            try:
+                stored = self.cache.get(self.NAMESPACE, key)
+            except Exception as e:
+                logger.warning(f"Could not load layout template {key}: {e}")
+        template = stored or self._templates.get(key) or self._new()
+        self._templates[key] = template
+        return template
+
+    def _update(self, key: str, change: Callable[[Dict], None]):
+        """Apply change to a template in one read-modify-write of the stored
+        copy, so workers keep each other's observations and a field another
+        worker dropped is not written back"""
+        def changed(stored: Optional[Dict]) -> Dict:
+            template = stored or self._new()
+            change(template)
+            return template
+
+        if self.cache is not None:
+            try:
+                self._templates[key] = self.cache.update(self.NAMESPACE, key, changed)
+                return
+            except Exception as e:
+                logger.warning(f"Could not store layout template {key}: {e}")
+        self._templates[key] = changed(self._templates.get(key))
+
+    def rules(self, template: Dict) -> Dict:
+        """Fields the template can read: {field: value the observations agree on}"""
+        rules = {}
+        observations = template['observations']
+        for field in LAYOUT_FIELDS:
+            values = Counter(repr(observation[field]) for observation in observations if field in observation)
+            if not values:
+                continue
+            value, count = values.most_common(1)[0]
+            if count >= self.min_observations and count * 3 >= sum(values.values()) * 2:
+                rules[field] = next(observation[field] for observation in observations
+                                    if repr(observation.get(field)) == value)
+        return rules
+
+    def match(self, headers: List[str], footers: List[str], first_page: str,
+              required: Tuple[str, ...] = ()) -> Dict:
+        """Layout context of a document: its template keys and, if one of
+        them has rules, the values those rules read from it
+
+        Returns {'keys', 'template', 'values', 'validate'}; template is None
+        (and values empty) when no key has a learned template that reads
+        every required field from this document.
+        """
+        keys = running_line_keys(headers, footers)
+        context = {'keys': keys, 'template': None, 'values': {}, 'validate': False}
+        if not keys:
+            return context
+        with self._lock:
+            learned = [(key, self.rules(self._load(key))) for key in keys]
+        learned = [(key, rules) for key, rules in learned if rules]
+        if not learned:
+            return context
+        key, rules = max(learned, key=lambda item: len(item[1]))
+        values = self.apply(rules, first_page, '\n'.join(headers + footers))
+        if not values or any(field not in values for field in required):
+            return context
+        with self._lock:
+            uses = self._uses[key]
+            self._uses[key] += 1
+        context.update(template=key, values=values,
+                       validate=bool(self.validate_every) and uses % self.validate_every == 0)
+        return context
+
+    @staticmethod
+    def apply(rules: Dict, first_page: str, header_text: str) -> Dict[str, str]:
+        """Field values a template's rules read from a document"""
+        values = {}
+        lines = _page_lines(first_page)
+        for field in LINE_FIELDS:
+            if field in rules:
+                start, span = rules[field]
+                if start + span <= len(lines):
+                    values[field] = _join_lines(lines[start:start + span])
+        if rules.get('journal'):
+            values['journal'] = rules['journal']
+        for field in HEADER_FIELDS:
+            if field in rules:
+                match = re.search(rules[field], header_text)
+                if match:
+                    values[field] = match.group(1)
+        return values
+
+    def observe(self, context: Dict, metadata: Dict, sources: Dict, confidence: Dict,
+                first_page: str, headers: List[str], footers: List[str]) -> Optional[Dict]:
+        """Learn from a finished document's fields
+
+        Only fields from vision, or from text at learn_confidence or more,
+        are recorded. Fields the template read are only learned from vision
+        (a template value, or a text value kept over it, would only confirm
+        the template); when vision checked them, a mismatch counts against
+        the template. Returns the observation recorded, if any.
+        """
+        if not context or not context.get('keys'):
+            return None
+        checked = context.get('template') and any(sources.get(field) == 'vision' for field in context['values'])
+        if checked:
+            self._check(context, metadata, sources)
+
+        header_text = '\n'.join(headers + footers)
+        observation = {}
+        for field in LAYOUT_FIELDS:
+            value = metadata.get(field)
+            if not value or not isinstance(value, str):
+                continue
+            if field in context['values'] and sources.get(field) != 'vision':
+                continue
+            if sources.get(field) != 'vision' and confidence.get(field, 0.0) < self.learn_confidence:
+                continue
+            if field in LINE_FIELDS:
+                found = locate_lines(first_page, value)
+                if found:
+                    observation[field] = list(found)
+            elif field in HEADER_FIELDS:
+                pattern = header_pattern(header_text, value)
+                if pattern:
+                    observation[field] = pattern
+            else:
+                observation[field] = value
+        if not observation:
+            return None
+
+        def add(template: Dict):
+            template['observations'] = (template['observations'] + [observation])[-self.max_observations:]
+
+        with self._lock:
+            for key in context['keys']:
+                self._update(key, add)
+        return observation
+
+    def _check(self, context: Dict, metadata: Dict, sources: Dict):
+        """Score a template's values against the vision answer for the same
+        document; a field that disagrees is forgotten by every template the
+        document is filed under"""
+        misses = [field for field, value in context['values'].items()
+                  if sources.get(field) == 'vision' and not self._agrees(value, metadata.get(field, ''))]
+        def count(template: Dict):
+            template['checks'] += 1
+            template['misses'] += bool(misses)
+
+        def forget(template: Dict):
+            for observation in template['observations']:
+                for field in misses:
+                    observation.pop(field, None)
+            template['observations'] = [observation for observation in template['observations'] if observation]
+
+        with self._lock:
+            self._update(context['template'], count)
+            if not misses:
+                return
+            logger.warning(f"Layout template {context['template']} disagreed with vision on "
+                           f"{', '.join(misses)}; relearning those fields")
+            for key in context['keys']:
+                self._update(key, forget)
+                # The next document read with what is left gets checked too
+                self._uses[key] = 0
+
+    @staticmethod
+    def _agrees(template_value: str, vision_value: str) -> bool:
+        template_value, vision_value = _compact(template_value), _compact(vision_value)
+        if not vision_value:
+            return True
+        return template_value == vision_value or (
+            min(len(template_value), len(vision_value)) >= 8
+            and (template_value in vision_value or vision_value in template_value))
+
+    def stats(self) -> Dict:
+        """Templates known to this process and the fields each can read"""
+        with self._lock:
+            return {key: {'observations': len(template['observations']), 'checks': template['checks'],
+                          'misses': template['misses'], 'rules': sorted(self.rules(template))}
+                    for key, template in self._templates.items() if template['observations']}
@@ -7,6 +7,7 @@ from typing import List, Dict
 from tqdm import tqdm
 
 from pdf_extractor import PDFExtractor
+from directory_manifest import DirectoryManifest
 from web_crawler import AcademicCrawler
 from ai_classifier import AIClassifier
 from catalog_generator import CatalogGenerator
@@ -22,8 +23,10 @@ logger = logging.getLogger(__name__)
 class CataBot:
     """Main application for academic paper cataloging"""
     
-    def __init__(self):
+    def __init__(self, workers: int = 1, executor: str = 'process'):
         self.pdf_extractor = PDFExtractor()
+        self.workers = workers
+        self.executor = executor
         self.classifier = AIClassifier()
         self.catalog_generator = CatalogGenerator()
     
@@ -40,10 +43,7 @@ class CataBot:
             return []
         
         # Process downloaded PDFs
-        papers = []
-        for file_info in tqdm(downloaded_files, desc="Extracting metadata"):
-            paper_data = self.pdf_extractor.extract_from_pdf(file_info['filepath'])
-            papers.append(paper_data)
+        papers = self._extract_all([file_info['filepath'] for file_info in downloaded_files])
         
         # Classify papers
         logger.info("Classifying papers...")
@@ -51,8 +51,12 @@ class CataBot:
         
         return papers
     
-    def process_from_directory(self, directory: str) -> List[Dict]:
-        """Process papers from a local directory"""
+    def process_from_directory(self, directory: str, incremental: bool = False) -> List[Dict]:
+        """Process papers from a local directory
+        
+        incremental: only process files that are new or changed since the
+        last incremental run (multi-paper PDFs are split, as in the web app)
+        """
         logger.info(f"Processing PDFs from: {directory}")
         
         # Find all PDFs
@@ -64,10 +68,10 @@ class CataBot:
             return []
         
         # Extract metadata
-        papers = []
-        for pdf_path in tqdm(pdf_files, desc="Extracting metadata"):
-            paper_data = self.pdf_extractor.extract_from_pdf(pdf_path)
-            papers.append(paper_data)
+        if incremental:
+            papers = self._extract_incremental(directory, pdf_files)
+        else:
+            papers = self._extract_all(pdf_files)
         
         # Classify papers
         logger.info("Classifying papers...")
@@ -75,6 +79,43 @@ class CataBot:
         
         return papers
     
+    def _extract_incremental(self, directory: str, pdf_files: List[str]) -> List[Dict]:
+        """Split PDFs into papers, reusing stored results for unchanged files"""
+        manifest = DirectoryManifest(directory)
+        pdf_files, unchanged = manifest.scan(pdf_files)
+        
+        papers = []
+        for pdf_path, entry in unchanged.items():
+            stored = self.pdf_extractor.load_papers(entry['result_id'], pdf_path)
+            if stored:
+                papers.extend(stored)
+            else:
+                pdf_files.append(pdf_path)
+        
+        batch = self.pdf_extractor.iter_batch(pdf_files, mode='detect', max_workers=max(1, self.workers),
+                                              executor=self.executor if self.workers > 1 else 'thread')
+        try:
+            for pdf_path, detected in tqdm(batch, total=len(pdf_files), desc="Extracting metadata"):
+                papers.extend(detected)
+                manifest.record(pdf_path, self.pdf_extractor.papers_result_id(pdf_path),
+                                content_hash=self.pdf_extractor.content_hash(pdf_path))
+        finally:
+            manifest.save()
+            self.pdf_extractor.shutdown()
+        return papers
+    
+    def _extract_all(self, pdf_paths: List[str]) -> List[Dict]:
+        """Extract metadata from PDFs, in parallel when workers > 1"""
+        if self.workers <= 1:
+            return [self.pdf_extractor.extract_from_pdf(pdf_path)
+                    for pdf_path in tqdm(pdf_paths, desc="Extracting metadata")]
+        
+        batch = self.pdf_extractor.iter_batch(pdf_paths, max_workers=self.workers, executor=self.executor)
+        try:
+            return [paper_data for _, paper_data in tqdm(batch, total=len(pdf_paths), desc="Extracting metadata")]
+        finally:
+            self.pdf_extractor.shutdown()
+    
     def process_single_pdf(self, pdf_path: str) -> Dict:
         """Process a single PDF file"""
         logger.info(f"Processing: {pdf_path}")
@@ -133,6 +174,12 @@ Examples:
   
   # Specify output format
   python main.py --directory ./papers --format excel
+  
+  # Extract on 8 CPU cores
+  python main.py --directory ./papers --workers 8
+  
+  # Nightly re-run: only new or changed files are extracted
+  python main.py --directory ./papers --incremental
         """
     )
     
@@ -149,11 +196,17 @@ Examples:
                        default='all', help='Output format (default: all)')
     parser.add_argument('--output-dir', default='output',
                        help='Output directory (default: output)')
+    parser.add_argument('--incremental', action='store_true',
+                       help='With --directory: skip files unchanged since the last incremental run')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Parallel extraction workers (default: 1)')
+    parser.add_argument('--executor', choices=['process', 'thread'], default='process',
+                       help='Worker type for --workers > 1 (default: process)')
     
     args = parser.parse_args()
     
     # Initialize CataBot
-    bot = CataBot()
+    bot = CataBot(workers=args.workers, executor=args.executor)
     bot.catalog_generator.output_dir = args.output_dir
     
     # Process based on input type
@@ -163,7 +216,7 @@ Examples:
         if args.url:
             papers = await bot.process_from_url(args.url, max_depth=args.depth)
         elif args.directory:
-            papers = bot.process_from_directory(args.directory)
+            papers = bot.process_from_directory(args.directory, incremental=args.incremental)
         elif args.pdf:
             paper = bot.process_single_pdf(args.pdf)
             papers = [paper]
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compiled metadata pattern engine
+
+Compiles the extractor's regex lists once per process, grouped per field,
+and runs them over each text window in priority order (the index of the
+pattern in its list; lower is preferred), stopping as soon as the caller
+has an answer.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+
+class Candidate(NamedTuple):
+    """A pattern match for one metadata field"""
+    field: str
+    priority: int  # index of the pattern that produced it
+    groups: Tuple[Optional[str], ...]
+    start: int
+    end: int
+
+    @property
+    def value(self) -> Optional[str]:
+        return self.groups[0] if self.groups else None
+
+
+@lru_cache(maxsize=None)
+def _compile_group(patterns: Tuple[str, ...], flags: int) -> Tuple[re.Pattern, ...]:
+    return tuple(re.compile(pattern, flags) for pattern in patterns)
+
+
+class MetadataPatternEngine:
+    """Field-grouped, precompiled view of a metadata_patterns dict
+
+    calibration maps a field to {pattern index: confidence} for patterns
+    whose matches deserve a fixed score instead of the priority-based one
+    (e.g. loose name-shape fallbacks).
+    """
+
+    def __init__(self, patterns: Dict[str, List[str]], calibration: Optional[Dict[str, Dict[int, float]]] = None):
+        self.patterns = {field: tuple(items) for field, items in patterns.items()}
+        self.calibration = calibration or {}
+        self._compiled = {}
+
+    def compiled(self, field: str, flags: int = 0, limit: Optional[int] = None) -> Tuple[re.Pattern, ...]:
+        """Compiled patterns for a field (shared by every engine in the process)"""
+        key = (field, flags, limit)
+        regexes = self._compiled.get(key)
+        if regexes is None:
+            regexes = self._compiled[key] = _compile_group(self.patterns[field][:limit], flags)
+        return regexes
+
+    def candidates(self, field: str, text: str, flags: int = 0,
+                   limit: Optional[int] = None) -> Iterator[Candidate]:
+        """First match of each pattern, lazily, in priority order
+
+        Callers that stop at the first acceptable candidate never run the
+        lower-priority patterns.
+        """
+        if not text:
+            return
+        for priority, regex in enumerate(self.compiled(field, flags, limit)):
+            match = regex.search(text)
+            if match:
+                yield Candidate(field, priority, match.groups(), match.start(), match.end())
+
+    def confidence(self, candidate: Candidate) -> float:
+        """1.0 for the field's first pattern, falling linearly with priority,
+        unless the pattern is calibrated"""
+        calibrated = self.calibration.get(candidate.field, {}).get(candidate.priority)
+        if calibrated is not None:
+            return calibrated
+        return 1.0 - candidate.priority / len(self.patterns[candidate.field])
+
+    def first(self, field: str, text: str, flags: int = 0) -> Optional[Candidate]:
+        """Highest-priority match for a field, if any"""
+        return next(self.candidates(field, text, flags), None)
+
+    def scan_widening(self, field: str, text: str, flags: int = 0,
+                      windows: Tuple[int, ...] = (500, 3000)) -> Iterator[Tuple[int, List[str]]]:
+        """First-group values of every match (re.findall) in widening prefixes
+
+        Yields (window, values) for text[:window] of each window in turn,
+        scanning with pos/endpos instead of slicing a copy per pattern.
+        Callers stop iterating as soon as a window gives them an answer, so
+        the wider windows are only scanned when the narrow ones come up empty.
+        """
+        regexes = self.compiled(field, flags)
+        for window in windows:
+            values = []
+            for regex in regexes:
+                for match in regex.findall(text, 0, window):
+                    values.append(match if isinstance(match, str) else match[0])
+            yield window, values
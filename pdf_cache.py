@@ -0,0 +1,543 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Cache backends for PDF extraction results
+
+Entries are JSON-serializable dicts grouped by namespace ('metadata',
+'vision', ...) and keyed by the content hash of the PDF.
+"""
+
+import os
+import re
+import gzip
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Try to import zstandard for text blob compression (gzip otherwise)
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512MB
+ACCESS_FLUSH_ENTRIES = 256  # buffered last-access times written back at once
+ACCESS_FLUSH_SECONDS = 30.0
+
+
+class CacheBackend:
+    """Interface for extraction cache storage"""
+
+    kind = None  # create_cache_backend() name, used to rebuild it in worker processes
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, namespace: str, key: str) -> Optional[Dict]:
+        return self.get_many(namespace, [key]).get(key)
+
+    def put(self, namespace: str, key: str, value: Dict):
+        self.put_many(namespace, {key: value})
+
+    def get_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, Dict]:
+        found = {}
+        for key, data in self.get_raw_many(namespace, keys).items():
+            try:
+                found[key] = json.loads(data)
+            except Exception as e:
+                logger.warning(f"Failed to load cache: {e}")
+        return found
+
+    def put_many(self, namespace: str, items: Dict[str, Dict]):
+        self.put_raw_many(namespace, {
+            key: json.dumps(value, ensure_ascii=False).encode('utf-8')
+            for key, value in items.items()
+        })
+
+    def update(self, namespace: str, key: str, change: Callable[[Optional[Dict]], Dict]) -> Dict:
+        """Replace an entry with change(current entry or None) and return it
+
+        Backends run the read and the write as one step for every process
+        sharing the cache, so concurrent updates of an entry are not lost.
+        """
+        value = change(self.get(namespace, key))
+        self.put(namespace, key, value)
+        return value
+
+    def get_blob(self, namespace: str, key: str) -> Optional[bytes]:
+        """Raw bytes stored with put_blob (e.g. compressed text)"""
+        return self.get_raw_many(namespace, [key]).get(key)
+
+    def put_blob(self, namespace: str, key: str, data: bytes):
+        self.put_raw_many(namespace, {key: data})
+
+    def get_raw_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, bytes]:
+        raise NotImplementedError
+
+    def put_raw_many(self, namespace: str, items: Dict[str, bytes]):
+        raise NotImplementedError
+
+    def keys(self, namespace: str) -> List[str]:
+        """Keys of every entry stored in a namespace"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.__class__.__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions
+        }
+
+    def close(self):
+        pass
+
+
+class JSONDirCache(CacheBackend):
+    """One pretty-printed JSON file per entry (the original cache layout)
+
+    'metadata' entries live directly in cache_dir, other namespaces in a
+    subdirectory of the same name. No size cap or eviction.
+    """
+
+    kind = 'json'
+
+    def __init__(self, cache_dir: str):
+        super().__init__()
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, namespace: str, key: str, ext: str = 'json') -> str:
+        if namespace == 'metadata':
+            return os.path.join(self.cache_dir, f"{key}.{ext}")
+        return os.path.join(self.cache_dir, namespace, f"{key}.{ext}")
+
+    def get_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, Dict]:
+        found = {}
+        for key in keys:
+            cache_file = self._path(namespace, key)
+            if os.path.exists(cache_file):
+                try:
+                    with open(cache_file, 'r', encoding='utf-8') as f:
+                        found[key] = json.load(f)
+                    self.hits += 1
+                    continue
+                except Exception as e:
+                    logger.warning(f"Failed to load cache: {e}")
+            self.misses += 1
+        return found
+
+    def put_many(self, namespace: str, items: Dict[str, Dict]):
+        for key, value in items.items():
+            cache_file = self._path(namespace, key)
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            try:
+                with open(cache_file, 'w', encoding='utf-8') as f:
+                    json.dump(value, f, ensure_ascii=False, indent=2)
+            except Exception as e:
+                logger.warning(f"Failed to save cache: {e}")
+
+    def update(self, namespace: str, key: str, change: Callable[[Optional[Dict]], Dict]) -> Dict:
+        cache_file = self._path(namespace, key)
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with file_lock(cache_file):
+            return super().update(namespace, key, change)
+
+    def keys(self, namespace: str) -> List[str]:
+        directory = os.path.dirname(self._path(namespace, 'x'))
+        if not os.path.isdir(directory):
+            return []
+        keys = set()
+        for filename in os.listdir(directory):
+            key, ext = os.path.splitext(filename)
+            if ext in ('.json', '.bin') and filename != 'path_index.json':
+                keys.add(key)
+        return sorted(keys)
+
+    def get_raw_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, bytes]:
+        found = {}
+        for key in keys:
+            cache_file = self._path(namespace, key, ext='bin')
+            if os.path.exists(cache_file):
+                with open(cache_file, 'rb') as f:
+                    found[key] = f.read()
+                self.hits += 1
+            else:
+                self.misses += 1
+        return found
+
+    def put_raw_many(self, namespace: str, items: Dict[str, bytes]):
+        for key, data in items.items():
+            cache_file = self._path(namespace, key, ext='bin')
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            try:
+                with open(cache_file, 'wb') as f:
+                    f.write(data)
+            except Exception as e:
+                logger.warning(f"Failed to save cache: {e}")
+
+
+class SQLiteCache(CacheBackend):
+    """Single-file SQLite cache with a byte-size cap and LRU eviction
+
+    Safe to share between threads; WAL mode lets several worker processes
+    (or nodes on a shared volume) read while one writes. Reads stay
+    read-only: last-access times are buffered and written back in batches
+    (every ACCESS_FLUSH_ENTRIES reads or ACCESS_FLUSH_SECONDS, and with the
+    next put), and the total size is kept in a one-row table by triggers,
+    so a put does not sum the whole table.
+    """
+
+    kind = 'sqlite'
+
+    def __init__(self, db_path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        super().__init__()
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._touched = {}  # (namespace, key) -> last read, not yet written back
+        self._touched_at = time.monotonic()
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        # INSERT OR REPLACE fires the delete trigger for the row it replaces
+        self._conn.execute('PRAGMA recursive_triggers=ON')
+        self._conn.execute('BEGIN IMMEDIATE')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            ' namespace TEXT NOT NULL,'
+            ' key TEXT NOT NULL,'
+            ' value BLOB NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' accessed REAL NOT NULL,'
+            ' PRIMARY KEY (namespace, key))'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0),'
+                           ' bytes INTEGER NOT NULL)')
+        # Caches created before the totals table are summed once
+        self._conn.execute('INSERT OR IGNORE INTO totals (id, bytes) SELECT 0, COALESCE(SUM(size), 0) FROM entries')
+        self._conn.execute('CREATE TRIGGER IF NOT EXISTS entries_added AFTER INSERT ON entries'
+                           ' BEGIN UPDATE totals SET bytes = bytes + NEW.size WHERE id = 0; END')
+        self._conn.execute('CREATE TRIGGER IF NOT EXISTS entries_removed AFTER DELETE ON entries'
+                           ' BEGIN UPDATE totals SET bytes = bytes - OLD.size WHERE id = 0; END')
+        self._conn.commit()
+
+    def get_raw_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, bytes]:
+        keys = list(keys)
+        found = {}
+        if not keys:
+            return found
+
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f'SELECT key, value FROM entries WHERE namespace = ? AND key IN ({placeholders})',
+                    [namespace] + chunk
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._touched.update(((namespace, key), now) for key in found)
+                if (len(self._touched) >= ACCESS_FLUSH_ENTRIES
+                        or time.monotonic() - self._touched_at >= ACCESS_FLUSH_SECONDS):
+                    try:
+                        self._write_access()
+                        self._conn.commit()
+                    except sqlite3.Error as e:
+                        logger.warning(f"Failed to record cache access: {e}")
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_raw_many(self, namespace: str, items: Dict[str, bytes]):
+        if not items:
+            return
+
+        now = time.time()
+        rows = [(namespace, key, data, len(data), now) for key, data in items.items()]
+
+        with self._lock:
+            try:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO entries (namespace, key, value, size, accessed) VALUES (?, ?, ?, ?, ?)',
+                    rows
+                )
+                self._write_access()  # eviction needs current access times
+                self._conn.commit()
+                self._evict()
+            except Exception as e:
+                logger.warning(f"Failed to save cache: {e}")
+
+    def update(self, namespace: str, key: str, change: Callable[[Optional[Dict]], Dict]) -> Dict:
+        with self._lock:
+            try:
+                # Takes the write lock before the read
+                self._conn.execute('BEGIN IMMEDIATE')
+                row = self._conn.execute('SELECT value FROM entries WHERE namespace = ? AND key = ?',
+                                         (namespace, key)).fetchone()
+                value = change(json.loads(row[0]) if row else None)
+                data = json.dumps(value, ensure_ascii=False).encode('utf-8')
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO entries (namespace, key, value, size, accessed) VALUES (?, ?, ?, ?, ?)',
+                    (namespace, key, data, len(data), time.time())
+                )
+                self._write_access()
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            self._evict()
+        return value
+
+    def keys(self, namespace: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute('SELECT key FROM entries WHERE namespace = ?', (namespace,)).fetchall()
+        return [key for key, in rows]
+
+    def _write_access(self):
+        """Write buffered last-access times (lock held; the caller commits)"""
+        if self._touched:
+            self._conn.executemany(
+                'UPDATE entries SET accessed = ? WHERE namespace = ? AND key = ?',
+                [(accessed, namespace, key) for (namespace, key), accessed in self._touched.items()]
+            )
+            self._touched.clear()
+        self._touched_at = time.monotonic()
+
+    def _evict(self):
+        """Drop least recently used entries until under max_bytes (lock held)"""
+        if not self.max_bytes:
+            return
+
+        total = self._conn.execute('SELECT bytes FROM totals WHERE id = 0').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Free a little extra so we don't evict on every put
+        target = int(self.max_bytes * 0.9)
+        victims = []
+        for namespace, key, size in self._conn.execute(
+                'SELECT namespace, key, size FROM entries ORDER BY accessed ASC'):
+            if total <= target:
+                break
+            victims.append((namespace, key))
+            total -= size
+
+        self._conn.executemany('DELETE FROM entries WHERE namespace = ? AND key = ?', victims)
+        self._conn.commit()
+        self.evictions += len(victims)
+        logger.info(f"Cache evicted {len(victims)} entries (LRU)")
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT namespace, COUNT(*), COALESCE(SUM(size), 0) FROM entries GROUP BY namespace'
+            ).fetchall()
+        stats['namespaces'] = {ns: {'entries': count, 'bytes': size} for ns, count, size in rows}
+        stats['entries'] = sum(count for _, count, _ in rows)
+        stats['bytes'] = sum(size for _, _, size in rows)
+        stats['max_bytes'] = self.max_bytes
+        stats['db_path'] = self.db_path
+        return stats
+
+    def close(self):
+        with self._lock:
+            try:
+                self._write_access()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to record cache access: {e}")
+            self._conn.close()
+
+
+def compress_text(text: str) -> bytes:
+    """Compress text for blob storage (zstd if installed, else gzip)"""
+    data = text.encode('utf-8')
+    if ZSTD_AVAILABLE:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress_text(data: bytes) -> str:
+    """Inverse of compress_text; the codec is detected from the frame magic"""
+    if data[:4] == ZSTD_MAGIC:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("Text blob is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+    return gzip.decompress(data).decode('utf-8')
+
+
+def create_cache_backend(kind: str, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES) -> CacheBackend:
+    """Build a cache backend by name ('sqlite' or 'json')"""
+    if kind == 'json':
+        return JSONDirCache(cache_dir)
+    if kind == 'sqlite':
+        return SQLiteCache(os.path.join(cache_dir, 'cache.db'), max_bytes=max_bytes)
+    raise ValueError(f"Unknown cache backend: {kind}")
+
+
+def hash_file(pdf_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Streaming SHA-256 of the file bytes"""
+    sha = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+@contextmanager
+def file_lock(path: str, timeout: float = 30.0, stale: float = 120.0):
+    """Hold a cross-process lock on path (a path + '.lock' file)
+
+    An exclusively created lock file works on every platform and on shared
+    volumes. A lock file older than stale seconds was left by a killed
+    process and is taken over. Raises TimeoutError after timeout seconds.
+    """
+    lock_file = f"{path}.lock"
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            os.close(os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_file) > stale:
+                    os.remove(lock_file)
+                    continue
+            except OSError:
+                continue  # released meanwhile
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out waiting for {lock_file}")
+            time.sleep(0.02)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(lock_file)
+        except OSError:
+            pass
+
+
+def import_json_cache(json_dir: str, backend: CacheBackend, batch_size: int = 200) -> Dict[str, int]:
+    """One-time import of a JSONDirCache directory into another backend
+
+    Entries already keyed by content hash are copied as-is. Legacy entries
+    (md5 of path + size + mtime) are re-keyed by hashing the PDF named in
+    their 'file_path'; their vision results follow them. Entries whose PDF
+    no longer exists cannot be re-keyed and are skipped.
+
+    Returns:
+        Counts of imported metadata/vision entries and skipped entries
+    """
+    counts = {'metadata': 0, 'vision': 0, 'skipped': 0}
+    vision_dir = os.path.join(json_dir, 'vision')
+    metadata_batch, vision_batch = {}, {}
+
+    def flush():
+        backend.put_many('metadata', metadata_batch)
+        backend.put_many('vision', vision_batch)
+        metadata_batch.clear()
+        vision_batch.clear()
+
+    for filename in sorted(os.listdir(json_dir)):
+        if not filename.endswith('.json') or filename == 'path_index.json':
+            continue
+        old_key = filename[:-5]
+        try:
+            with open(os.path.join(json_dir, filename), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except Exception as e:
+            logger.warning(f"Skipping unreadable cache entry {filename}: {e}")
+            counts['skipped'] += 1
+            continue
+
+        if re.fullmatch(r'[0-9a-f]{64}', old_key):
+            new_key = old_key
+        else:
+            # Entries may come from a Windows node
+            pdf_path = (entry.get('file_path') or '').replace('\\', os.sep)
+            if not pdf_path or not os.path.exists(pdf_path):
+                counts['skipped'] += 1
+                continue
+            new_key = hash_file(pdf_path)
+
+        metadata_batch[new_key] = entry
+        counts['metadata'] += 1
+
+        vision_file = os.path.join(vision_dir, filename)
+        if os.path.exists(vision_file):
+            try:
+                with open(vision_file, 'r', encoding='utf-8') as f:
+                    vision_batch[new_key] = json.load(f)
+                counts['vision'] += 1
+            except Exception as e:
+                logger.warning(f"Skipping unreadable vision entry {filename}: {e}")
+
+        if len(metadata_batch) >= batch_size:
+            flush()
+
+    flush()
+    logger.info(f"Imported {counts['metadata']} metadata and {counts['vision']} vision entries "
+                f"({counts['skipped']} skipped)")
+    return counts
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='CataBot extraction cache tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='Import a JSON cache directory into SQLite')
+    import_parser.add_argument('json_dir', nargs='?', default='.cache/pdf_metadata')
+    import_parser.add_argument('--max-bytes', type=int, default=DEFAULT_MAX_BYTES)
+
+    stats_parser = subparsers.add_parser('stats', help='Show SQLite cache statistics')
+    stats_parser.add_argument('cache_dir', nargs='?', default='.cache/pdf_metadata')
+
+    rederive_parser = subparsers.add_parser(
+        'rederive', help='Re-derive cached results made under older extraction rules from stored page text')
+    rederive_parser.add_argument('--backend', choices=['sqlite', 'json'], default='sqlite')
+    rederive_parser.add_argument('--fast', action='store_true', help='Re-derive in fast mode')
+
+    args = parser.parse_args()
+
+    if args.command == 'rederive':
+        # Runs against the extractor's own cache (.cache/pdf_metadata)
+        from pdf_extractor import PDFExtractor
+        extractor = PDFExtractor(cache_backend=args.backend)
+        print(json.dumps(extractor.rederive_cached(fast_mode=args.fast), indent=2))
+        extractor.cache.close()
+        raise SystemExit(0)
+
+    if args.command == 'import':
+        backend = create_cache_backend('sqlite', args.json_dir, max_bytes=args.max_bytes)
+        print(json.dumps(import_json_cache(args.json_dir, backend), indent=2))
+    else:
+        backend = create_cache_backend('sqlite', args.cache_dir)
+        print(json.dumps(backend.stats(), indent=2, ensure_ascii=False))
+    backend.close()
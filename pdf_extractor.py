@@ -1,7 +1,7 @@
 import re
-import PyPDF2
-import pdfplumber
-from typing import Dict, Optional, List
+import atexit
+import asyncio
+from typing import Dict, Iterable, Iterator, Optional, List, Tuple
 import logging
 import base64
 import io
@@ -9,8 +9,27 @@ from PIL import Image
 import os
 import hashlib
 import json
-from functools import lru_cache
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+import gc
+import weakref
+import numpy as np
+from functools import lru_cache, partial
+import multiprocessing
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from layout_templates import LayoutTemplates
+from metadata_engine import MetadataPatternEngine
+from preflight import REJECTED_ROUTES, ROUTE_NORMAL, ROUTE_VISION, PreflightRejected, preflight_pdf
+from pdf_cache import (CacheBackend, DEFAULT_MAX_BYTES, compress_text, create_cache_backend,
+                       decompress_text, file_lock, hash_file)
+from stage_timings import NULL_TIMINGS, StageTimings
+from text_backends import (AUTO_BACKEND, GARBLED_RATIO, TextBackend, backend_chain, garbled_ratio,
+                           open_backend)
+from worker_pool import BudgetedProcessPool, BudgetExceeded, process_rss_mb
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,31 +38,656 @@ logger = logging.getLogger(__name__)
 try:
     import openai
     from openai import OpenAI
+    try:
+        from openai import AsyncOpenAI
+    except ImportError:  # openai < 1.0
+        AsyncOpenAI = None
     VISION_AVAILABLE = True
 except ImportError:
     VISION_AVAILABLE = False
     logger.info("OpenAI not available. Vision-based extraction disabled. Install with: pip install openai")
 
+# Try to import PyMuPDF for in-process page rendering
+try:
+    import pymupdf as fitz
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    try:
+        import fitz  # PyMuPDF < 1.24
+        PYMUPDF_AVAILABLE = True
+    except ImportError:
+        PYMUPDF_AVAILABLE = False
+        logger.info("PyMuPDF not available. Page rendering falls back to pdf2image. Install with: pip install PyMuPDF")
+
 # Try to import pdf2image for PDF to image conversion
 try:
-    from pdf2image import convert_from_path
+    from pdf2image import convert_from_bytes, convert_from_path
     PDF2IMAGE_AVAILABLE = True
 except ImportError:
     PDF2IMAGE_AVAILABLE = False
     logger.info("pdf2image not available. Vision extraction will be limited. Install with: pip install pdf2image")
 
 
+WHITESPACE_RE = re.compile(r'\s+')
+PAGE_NUMBER_RE = re.compile(r'^\d+$')
+CAPITALIZED_RE = re.compile(r'^[A-Z]')
+NAME_RE = re.compile(r'[A-Z][a-z]+\s+[A-Z][a-z]+')
+NAME_TOKEN_RE = re.compile(r"(?:[A-Z][a-z]*(?:['’-]?[A-Z]?[a-z]+)*|[A-Z]\.(?:-?[A-Z]\.)*)$")  # Smith, O'Neil, McKay, J.-P.
+AUTHOR_SEPARATOR_RE = re.compile(r'\s*(?:[,;&]|\band\b)\s*')
+CJK_RE = re.compile(r'[\u4e00-\u9fff]')
+NAME_PARTICLES = frozenset(('van', 'von', 'de', 'der', 'den', 'del', 'della', 'di', 'da', 'dos', 'du', 'la', 'le', 'bin'))
+NOT_NAME_WORDS = frozenset(('Abstract', 'Introduction', 'Keywords', 'Journal', 'Proceedings', 'Volume', 'Vol',
+                            'University', 'Department', 'Institute', 'College', 'School', 'Press', 'Review',
+                            'Chapter', 'Section', 'Copyright', 'Received', 'Accepted', 'Published'))
+CHINESE_YEAR_RE = re.compile(r'[二三四五六七八九○〇零一]{4}')
+
+# Vision prompt: the fields to read off a paper's first page
+VISION_FIELDS = """1. Title: The main title of the paper (Chinese or English)
+2. Authors: All author names (comma-separated, Chinese or English)
+3. Year: Publication year (look for formats like 2009, 2009年, or 二○○九年)
+4. Journal: Journal or periodical name
+   - For Chinese journals, look for 《journal name》 format (e.g., 《二十一世紀》)
+   - Extract ONLY the text between 《 and 》, do NOT include 網絡版, 網路版, or other suffixes
+   - Also check headers/footers for consistent journal names
+5. Volume: Journal volume number (look for 卷, Vol, Volume)
+6. Issue: Journal issue number (look for 期, 總第X期, 第X期, No., Issue)
+7. Pages: Page range (e.g., "123-145" or "71-79")
+
+IMPORTANT for Chinese journals:
+- If you see 《二十一世紀》網絡版, extract journal as "二十一世紀" (NOT "二十一世紀網絡版")
+- If you see 總第84期, extract issue as "84"
+- If you see 第12期, extract issue as "12"
+
+"""
+
+VISION_PROMPT = """Analyze this academic paper's first page and extract the following metadata:
+
+""" + VISION_FIELDS + """Return ONLY a JSON object with these exact keys: title, authors, year, journal, volume, issue, pages
+If any field is not found, use "Unknown" for text fields or "N/A" for numeric fields.
+
+Example format:
+{
+  "title": "Machine Learning in Healthcare",
+  "authors": "John Doe, Jane Smith",
+  "year": "2024",
+  "journal": "Journal of AI Research",
+  "volume": "15",
+  "issue": "3",
+  "pages": "123-145"
+}"""
+
+# Several first pages in one request; each image is preceded by an "Image N:" label
+VISION_BATCH_PROMPT = """You are given {count} images, each labelled "Image N:". Each image is the first page of a
+different academic paper. For EACH image, extract the following metadata:
+
+""" + VISION_FIELDS + """Return ONLY a JSON array with one object per image, in image order. Each object has the keys:
+index (the image number N), title, authors, year, journal, volume, issue, pages
+If any field is not found, use "Unknown" for text fields or "N/A" for numeric fields."""
+
+VISION_MODEL = "gpt-4o-mini"  # Faster and cheaper than gpt-4-vision-preview
+VISION_TOKENS_PER_IMAGE = 300
+VISION_MAX_SIZE = 1536  # px, longest side of rendered page images
+
+# Field confidence (0-1) by how a value was found; pattern matches score by
+# priority (MetadataPatternEngine.confidence), scaled by CONTENT_MATCH_WEIGHT
+# when found in body text rather than headers/footers
+PDF_PROPERTY_CONFIDENCE = 0.5  # document info title/author
+PDF_DATE_CONFIDENCE = 0.3  # creation date is not the publication year
+HEURISTIC_CONFIDENCE = 0.3  # line-shape fallbacks
+HEADER_YEAR_CONFIDENCE = 0.9
+BODY_YEAR_CONFIDENCE = 0.6
+CONTENT_MATCH_WEIGHT = 0.8
+VISION_CONFIDENCE = 0.9
+TEMPLATE_CONFIDENCE = 0.8  # read by a learned layout template (see layout_templates)
+UNKNOWN_VALUES = ('Unknown', 'N/A', '', '未知')
+SECTION_FIELDS = ('title', 'authors', 'year')  # what a multi-paper section result carries
+PARALLEL_MIN_RANGE = 16  # pages per range of a parallel full-text pass
+HASH_INDEX_FLUSH = 64  # newly hashed files buffered before path_index.json is written
+
+# Version of the derivation rules (_enhance_metadata, scoring, boundary
+# detection). Bump it when that code changes; edits to metadata_patterns are
+# picked up automatically (see PDFExtractor.rules_version). Cached results
+# from other versions are re-derived from the stored page text.
+RULES_VERSION = 3
+
+# Lines that indicate a new paper starting (multi-paper detection)
+NEW_PAPER_RES = tuple(re.compile(pattern, re.MULTILINE) for pattern in (
+    r'^[A-Z][A-Za-z\s:]{10,100}$',  # Title-like line (all caps or title case)
+    r'^\s*Abstract[\s:]*',  # Abstract section
+    r'^\s*ABSTRACT[\s:]*',
+    r'^\s*Introduction[\s:]*',  # Introduction section
+    r'^\s*INTRODUCTION[\s:]*',
+    r'^\s*1\.?\s+Introduction',  # Numbered introduction
+    r'^\s*I\.?\s+INTRODUCTION',
+    r'^\s*Keywords?[\s:]*',  # Keywords
+    r'^\s*KEYWORDS?[\s:]*',
+))
+# Any of them, in one match call
+NEW_PAPER_RE = re.compile('|'.join(f'(?:{regex.pattern})' for regex in NEW_PAPER_RES), re.MULTILINE)
+
+# Paper-start features (see PDFExtractor._page_features): the first
+# START_LINES lines of a page may start a paper; the four lines after one
+# must hint at a paper front (LIKELY_TERMS), and the terms from two lines
+# above to four below weigh its confidence (START_WEIGHTS, added in order)
+START_LINES = 10
+FEATURE_LINES = START_LINES + 4
+MIN_START_LENGTH = 10
+START_TERMS = ('abstract', 'author', 'university', 'department', 'email', '@', 'keywords',
+               'introduction', 'conclusion', 'references', 'section', 'chapter')
+LIKELY_TERMS = ('abstract', 'author', 'university', 'department', 'email', '@', 'keywords', 'introduction')
+START_WEIGHTS = (
+    (('abstract',), 0.3),
+    (('author', 'university'), 0.2),
+    (('keywords',), 0.1),
+    (('@', 'email'), 0.1),
+    (('conclusion', 'references'), -0.3),  # likely just a section header
+    (('section', 'chapter'), -0.2),
+)
+START_TERM_RES = tuple(re.compile(re.escape(term)) for term in START_TERMS)
+
+
+def plausible_authors(value: str) -> bool:
+    """Whether an author pattern match reads like a list of names
+    
+    Each name (split on commas, semicolons, "&" and "and") must be 2-5
+    capitalized words or initials, lowercase particles ("van", "de")
+    allowed, with no digits and no words such as "Journal" or "University".
+    Values with CJK characters are accepted as they are.
+    """
+    if CJK_RE.search(value):
+        return True
+    if any(char.isdigit() for char in value):
+        return False
+    names = [name for name in AUTHOR_SEPARATOR_RE.split(value) if name]
+    for name in names:
+        words = name.split()
+        if not 2 <= len(words) <= 5 or words[0] in NAME_PARTICLES:
+            return False
+        if any(word in NOT_NAME_WORDS or not (NAME_TOKEN_RE.match(word) or word in NAME_PARTICLES)
+               for word in words):
+            return False
+    return bool(names)
+
+
+def pdf_buffer(data) -> bytes:
+    """bytes for an in-memory PDF (bytes, bytearray or memoryview)
+
+    bytes are used as-is, and a memoryview spanning a whole bytes object
+    resolves to that object; anything else is copied once. BytesIO and
+    PyMuPDF then share the buffer instead of copying it again.
+    """
+    if isinstance(data, bytes):
+        return data
+    if (isinstance(data, memoryview) and isinstance(data.obj, bytes)
+            and data.contiguous and data.nbytes == len(data.obj)):
+        return data.obj
+    return bytes(data)
+
+
+def current_rss_mb() -> Optional[float]:
+    """Resident memory of this process in MB (None where it cannot be read)"""
+    return process_rss_mb(os.getpid())
+
+
+class PDFDocument:
+    """A PDF parsed once and shared by every extraction stage
+
+    Reads the file through a text backend (see text_backends: pdfplumber by
+    default, then the other backends for files or pages it cannot read) and
+    memoizes per-page text and rendered images, so metadata, text,
+    header/footer, vision and multi-paper stages never re-parse the same file.
+
+    timings (a StageTimings) collects per-stage times for the document; the
+    default records nothing. stored (see to_stored) seeds the session with
+    page text kept from an earlier session: the file is then only opened if
+    a page, or the page count/info, is missing from it.
+
+    data, if given, is the PDF itself (see pdf_buffer); every parser reads it
+    from memory and pdf_path only names the document.
+
+    A new document is preflighted (see preflight.preflight_pdf) before a
+    text backend opens it; only the 'normal' route opens the text parsers
+    up front (a 'vision' one opens them when its text is first read). The
+    verdict is stored with the page text.
+
+    Pages are parsed one at a time and their layout released once the text
+    is read. With memory_ceiling_mb, the parsers' remaining state (object
+    caches, open handles) is also dropped whenever process RSS goes over the
+    ceiling while parsing; the extracted text is kept and parsers reopen on
+    the next page.
+    """
+
+    def __init__(self, pdf_path: str, timings=NULL_TIMINGS, stored: Optional[Dict] = None,
+                 data: Optional[bytes] = None, memory_ceiling_mb: Optional[float] = None,
+                 text_backend: str = 'pdfplumber'):
+        self.pdf_path = pdf_path
+        self.timings = timings
+        self.data = data
+        self.memory_ceiling_mb = memory_ceiling_mb
+        self.text_backend = text_backend
+        self.backend_chain = backend_chain(text_backend)
+        # Region reads: PyMuPDF clips first whatever reads the page text
+        self.band_chain = ['pymupdf'] * PYMUPDF_AVAILABLE + [name for name in self.backend_chain if name != 'pymupdf']
+        self._over_ceiling_logged = False
+        self._release_floor_mb = 0.0  # RSS right after the last release
+        self._backends = {}  # name -> open TextBackend (None: it cannot read the file)
+        self._page_count = None
+        self._info = None
+        self._page_texts = {}
+        self._bands = {}  # "page:top:bottom" -> (header, footer)
+        self._images = {}
+        self._preflight = None
+        self._preflight_new = False  # verdict computed in this session (not from stored)
+        self.parsed_pages = 0  # pages extracted in this session (not from stored)
+        self.parsed_bands = 0
+
+        if stored:
+            self._page_count = stored.get('page_count')
+            self._info = stored.get('info')
+            self._page_texts = {int(page_num): text for page_num, text in stored.get('pages', {}).items()}
+            self._bands = {key: tuple(bands) for key, bands in stored.get('bands', {}).items()}
+            self._preflight = stored.get('preflight')
+            if not self._info and self.route != ROUTE_NORMAL:
+                # Earlier entries stored no info for these; the verdict has it
+                # (or, for a verdict without it, it is read on first use)
+                self._info = self.preflight.get('info')
+        elif self.route == ROUTE_NORMAL:
+            self._open()
+        else:
+            # Parsers open only if the text is read after all; the info
+            # dictionary was read by preflight
+            self._page_count = self.preflight['pages'] or 0
+            self._info = self.preflight.get('info')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _open(self) -> Optional[TextBackend]:
+        """The first backend of the chain that can read the file"""
+        for name in self.backend_chain:
+            backend = self._backend(name)
+            if backend is not None:
+                return backend
+        logger.error(f"Text extraction failed: no backend could open {self.pdf_path}")
+        return None
+
+    def _backend(self, name: str) -> Optional[TextBackend]:
+        """The named backend, opened on first use (None if it cannot read the file)"""
+        if name not in self._backends:
+            with self.timings.stage('open'):
+                if self.timings.enabled and not self._backends:
+                    self.timings.count('bytes_read', len(self.data) if self.data is not None
+                                       else os.path.getsize(self.pdf_path))
+                try:
+                    self._backends[name] = open_backend(name, self.pdf_path, self.data)
+                except Exception as e:
+                    logger.warning(f"{name} could not open {os.path.basename(self.pdf_path)}: {e}")
+                    self._backends[name] = None
+        return self._backends[name]
+
+    @property
+    def preflight(self) -> Dict:
+        """Preflight verdict: route, reason, pages, encrypted, damaged, text_layer, info"""
+        if self._preflight is None:
+            with self.timings.stage('preflight'):
+                self._preflight = preflight_pdf(self.pdf_path, self.data)
+            self._preflight_new = True
+            self.timings.count(f"preflight_{self._preflight['route']}")
+            if self._preflight['route'] != ROUTE_NORMAL:
+                logger.info(f"Preflight routed {self.pdf_path} to {self._preflight['route']}: "
+                            f"{self._preflight['reason']}")
+        return self._preflight
+
+    @property
+    def route(self) -> str:
+        return self.preflight['route']
+
+    @property
+    def page_count(self) -> int:
+        if self._page_count is None:
+            backend = self._open()
+            if backend is None:
+                return 0
+            self._page_count = backend.page_count
+        return self._page_count
+
+    @property
+    def metadata(self) -> Dict[str, str]:
+        """Document info dictionary, keys without the leading slash"""
+        if self._info is not None:
+            return dict(self._info)
+        backend = self._open()
+        try:
+            info = backend.metadata() if backend is not None else {}
+            self._info = {str(k).lstrip('/'): str(v) for k, v in info.items() if v is not None}
+            return dict(self._info)
+        except Exception as e:
+            logger.warning(f"Could not extract PDF metadata: {e}")
+            return {}
+
+    @property
+    def modified(self) -> bool:
+        """Whether this session extracted anything that to_stored() would add"""
+        return bool(self.parsed_pages or self.parsed_bands or self._preflight_new)
+
+    def to_stored(self) -> Dict:
+        """Page count, info, preflight verdict and every page text / band
+        extracted so far (JSON-serializable)"""
+        return {
+            'page_count': self.page_count,
+            'info': self.metadata,
+            'pages': {str(page_num): text for page_num, text in sorted(self._page_texts.items())},
+            'bands': {key: list(bands) for key, bands in self._bands.items()},
+            'preflight': self._preflight
+        }
+
+    def page_text(self, page_num: int) -> str:
+        """Text of a single page (0-indexed), extracted once"""
+        if page_num in self._page_texts:
+            return self._page_texts[page_num]
+
+        with self.timings.stage('parse'):
+            text = self._parse_page(page_num)
+        self.timings.count('pages_parsed')
+        self.parsed_pages += 1
+        self._page_texts[page_num] = text
+        if self.memory_ceiling_mb:
+            self._enforce_ceiling()
+        return text
+
+    def _enforce_ceiling(self):
+        """Release parser state if process RSS is over memory_ceiling_mb
+        
+        If RSS stays over the ceiling after a release (memory held by other
+        documents or the application), the next release waits until it has
+        grown another 10%, so parsers are not reopened on every page.
+        """
+        rss = current_rss_mb()
+        if rss is None or rss <= max(self.memory_ceiling_mb, self._release_floor_mb * 1.1):
+            return
+        self.release()
+        gc.collect()
+        self.timings.count('memory_releases')
+        rss = current_rss_mb() or 0.0
+        self._release_floor_mb = rss
+        if rss > self.memory_ceiling_mb and not self._over_ceiling_logged:
+            # Whatever is left is not this document's parser state
+            logger.warning(f"{os.path.basename(self.pdf_path)}: RSS {rss:.0f} MB still above "
+                           f"the {self.memory_ceiling_mb} MB ceiling after releasing parser state")
+            self._over_ceiling_logged = True
+
+    def release(self):
+        """Drop parser state but keep extracted text; parsers reopen on next use"""
+        self.close()
+
+    def _parse_page(self, page_num: int) -> str:
+        """Page text from the first backend of the chain that reads it
+
+        With the 'auto' backend, a page whose text is mostly unreadable
+        glyphs (see text_backends.garbled_ratio) is also read by the next
+        backends and the cleanest text kept.
+        """
+        best, best_ratio = None, None
+        for name in self.backend_chain:
+            backend = self._backend(name)
+            if backend is None:
+                continue
+            try:
+                text = backend.page_text(page_num)
+            except Exception as e:
+                logger.warning(f"{name} failed on page {page_num + 1}, trying the next backend: {e}")
+                continue
+            if self.text_backend != AUTO_BACKEND:
+                return text
+            ratio = garbled_ratio(text)
+            if ratio <= GARBLED_RATIO:
+                return text
+            self.timings.count('garbled_pages')
+            if best is None or ratio < best_ratio:
+                best, best_ratio = text, ratio
+        if best is None:
+            logger.error(f"Text extraction failed on page {page_num + 1}")
+        return best or ""
+
+    def page_bands(self, page_num: int, top: float, bottom: float) -> Tuple[str, str]:
+        """(header, footer) text of a page, extracted once
+        
+        top and bottom are the heights of the header and footer bands as
+        fractions of the page height. Only those regions are read: clip
+        rectangles with PyMuPDF (no full-page text pass), else a pdfplumber
+        crop. Without either (PyPDF2 has no geometry) they are the page's
+        first and last line.
+        """
+        key = f"{page_num}:{top}:{bottom}"
+        if key not in self._bands:
+            with self.timings.stage('parse_bands'):
+                self._bands[key] = self._parse_bands(page_num, top, bottom)
+            self.parsed_bands += 1
+        return self._bands[key]
+
+    def _parse_bands(self, page_num: int, top: float, bottom: float) -> Tuple[str, str]:
+        for name in self.band_chain:
+            backend = self._backend(name)
+            if backend is None:
+                continue
+            try:
+                bands = backend.page_bands(page_num, top, bottom)
+            except Exception as e:
+                logger.warning(f"{name} band extraction failed on page {page_num + 1}: {e}")
+                continue
+            if bands is not None:
+                return bands
+        lines = self.page_text(page_num).strip().split('\n')
+        return lines[0], lines[-1] if len(lines) > 1 else ""
+
+    def missing_pages(self) -> List[int]:
+        """Pages whose text has not been extracted yet"""
+        return [page_num for page_num in range(self.page_count) if page_num not in self._page_texts]
+
+    def add_page_texts(self, texts: Dict[int, str]):
+        """Add page texts extracted elsewhere (see PDFExtractor._parse_page_ranges);
+        pages already held are kept. They are stored like pages parsed here."""
+        for page_num, text in texts.items():
+            if page_num not in self._page_texts:
+                self._page_texts[page_num] = text
+                self.parsed_pages += 1
+
+    def page_texts(self, start: int = 0, end: Optional[int] = None) -> List[str]:
+        """Texts of pages in [start, end), clipped to the document"""
+        return list(self.iter_page_texts(start, end))
+
+    def iter_page_texts(self, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        """Lazily extract pages in [start, end); stop iterating to skip the rest"""
+        end = self.page_count if end is None else min(end, self.page_count)
+        for page_num in range(start, end):
+            yield self.page_text(page_num)
+
+    @property
+    def fitz_doc(self):
+        """PyMuPDF handle for rendering, opened on first use (shared with
+        the pymupdf text backend)"""
+        if not PYMUPDF_AVAILABLE:
+            return None
+        backend = self._backend('pymupdf')
+        if backend is None:
+            raise RuntimeError(f"PyMuPDF could not open {self.pdf_path}")
+        return backend.doc
+
+    def close(self):
+        for backend in self._backends.values():
+            if backend is not None:
+                backend.close()
+        self._backends = {}
+
+
+class SplitRequest(Exception):
+    """A long document a batch worker hands back to the batch instead of
+    reading its pages serially (see PDFExtractor.iter_batch): preflight is
+    the worker's verdict, pages the page numbers still to extract"""
+
+    def __init__(self, pdf_path: str, preflight: Dict, pages: List[int]):
+        super().__init__(f"{pdf_path}: {len(pages)} pages to split")
+        self.pdf_path = pdf_path
+        self.preflight = preflight
+        self.pages = pages
+
+    def __reduce__(self):
+        return self.__class__, (self.pdf_path, self.preflight, self.pages)
+
+
 class PDFExtractor:
     """Extract metadata and content from PDF files"""
     
-    def __init__(self, use_vision: bool = True, api_key: str = None, use_cache: bool = True):
+    # Content-based metadata never looks past the first METADATA_WINDOW chars
+    # (year scan) or METADATA_LINES lines (author heuristics), so reading
+    # pages beyond that cannot change the result
+    METADATA_WINDOW = 3000
+    METADATA_LINES = 23
+    # Fields that must be scored confidently within these first characters
+    # (journal, volume and issue may also come from the header/footer bands)
+    # to stop reading early: the windows _enhance_metadata searches
+    EARLY_STOP_FIELDS = (
+        ('title', 1500),
+        ('authors', 2000),
+        ('year', 500),
+        ('journal', 500),
+        ('volume', 2000),
+        ('issue', 2000),
+        ('pages', 2000),
+    )
+    
+    def __init__(self, use_vision: bool = True, api_key: str = None, use_cache: bool = True,
+                 cache_backend='sqlite', cache_max_bytes: int = DEFAULT_MAX_BYTES,
+                 vision_batch_size: int = 4, vision_sections: bool = False,
+                 vision_grayscale: bool = False, vision_min_confidence: Optional[float] = 0.5,
+                 vision_required_fields: Tuple[str, ...] = ('title', 'authors', 'year', 'journal'),
+                 collect_timings: bool = False, header_bands: Tuple[float, float] = (0.08, 0.08),
+                 header_sample_pages: int = 6, memory_ceiling_mb: Optional[float] = None,
+                 doc_timeout: Optional[float] = None, doc_memory_mb: Optional[float] = None,
+                 layout_templates: bool = False, template_validate_every: int = 10,
+                 text_backend: str = 'pdfplumber', parallel_page_threshold: Optional[int] = None,
+                 parallel_workers: Optional[int] = None):
+        """
+        Args:
+            use_vision: Enable GPT-4 Vision metadata extraction
+            api_key: OpenAI API key (defaults to OPENAI_API_KEY)
+            use_cache: Cache results by PDF content hash
+            cache_backend: 'sqlite' (single file, LRU-capped), 'json' (one file
+                per entry) or a CacheBackend instance
+            cache_max_bytes: Size cap for the SQLite backend
+            vision_batch_size: Page images packed into one vision request when
+                a batch processes several documents (1 = one request each)
+            vision_sections: Also run vision on the start page of each paper
+                found in a multi-paper PDF
+            vision_grayscale: Send grayscale page images (smaller uploads)
+            vision_min_confidence: Call vision only when a required field is
+                missing or scored below this (0-1); None always calls it
+            vision_required_fields: Fields the text tier must settle to skip vision
+            collect_timings: Attach per-stage wall/CPU times and counters to
+                every result as '_timings' (see stage_timings.StageTimings)
+            header_bands: Heights of the header and footer bands, as fractions
+                of the page height
+            header_sample_pages: Pages whose bands are read (the first pages,
+                then spread over the rest of the document)
+            memory_ceiling_mb: Process RSS above which a document being parsed
+                drops its parser state (see PDFDocument); None never checks
+            doc_timeout: Wall seconds a document may take in a process-mode
+                batch before its worker is killed and it is recorded as
+                failed (see worker_pool.BudgetedProcessPool); None: no limit
+            doc_memory_mb: Worker RSS in MB above which the document being
+                processed is killed the same way; None: no limit
+            layout_templates: Learn per-journal layout templates from confident
+                extractions and read later documents of the same layout with
+                them instead of vision (see layout_templates.LayoutTemplates)
+            template_validate_every: Documents read by a template that still
+                go to vision as a check (one in template_validate_every)
+            text_backend: Library that reads page text and header/footer
+                bands: 'pdfplumber', 'pypdf2', 'pymupdf' (fastest) or 'auto'
+                (PyMuPDF, re-reading garbled pages with pdfplumber); the
+                others are fallbacks for files it cannot read (see text_backends)
+            parallel_page_threshold: Documents with at least this many pages
+                have their full-text pass (multi-paper detection) split into
+                page ranges that worker processes extract in parallel; None
+                reads every document's pages serially
+            parallel_workers: Worker processes started for those ranges when
+                no batch has started any (None: one per core); set it to the
+                batches' max_workers so their pool is reused
+        """
         self.use_vision = use_vision and VISION_AVAILABLE
+        self.vision_batch_size = vision_batch_size
+        self.vision_sections = vision_sections
+        self.vision_grayscale = vision_grayscale
+        self.vision_min_confidence = vision_min_confidence
+        self.vision_required_fields = tuple(vision_required_fields)
+        self.collect_timings = collect_timings
+        self.header_bands = tuple(header_bands)
+        self.header_sample_pages = header_sample_pages
+        self.memory_ceiling_mb = memory_ceiling_mb
+        self.doc_timeout = doc_timeout
+        self.doc_memory_mb = doc_memory_mb
+        backend_chain(text_backend)  # rejects unknown names here rather than per document
+        self.text_backend = text_backend
+        self.parallel_page_threshold = parallel_page_threshold
+        self.parallel_workers = parallel_workers
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
         self.use_cache = use_cache
         self.cache_dir = '.cache/pdf_metadata'
+        self.hash_index_file = os.path.join(self.cache_dir, 'path_index.json')
+        self._hash_lock = threading.Lock()
+        self._hash_index = {}
+        self._hash_pending = {}  # entries hashed since the last flush_hash_index
+        self._buffers = {}  # pdf_path -> [data, sha256, users] for in-memory PDFs
+        self.cache = None
+        # Minimum pattern confidence (see MetadataPatternEngine.confidence) for
+        # the first pages to settle a field; None reads max_pages every time
+        self.early_stop_confidence = 0.6
+        self._process_pool = None
+        self._process_pool_workers = 0
+        self._pool_lock = threading.Lock()
+        self._hand_back_pages = False  # set in batch workers (see _parallel_pages)
+        self._page_seeds = {}  # pdf_path -> {page: text} parsed by a batch for this task
+        # Executor for the blocking stages of the asyncio API (None: the loop's default)
+        self.async_executor = None
+        self._async_client = None
+        self._async_client_loop = None
+        # Recreates an equivalent extractor in each worker process
+        self._worker_config = {
+            'use_vision': use_vision,
+            'api_key': api_key,
+            'use_cache': use_cache,
+            'cache_backend': cache_backend if isinstance(cache_backend, str) else (cache_backend.kind or 'sqlite'),
+            'cache_max_bytes': cache_max_bytes,
+            'vision_batch_size': vision_batch_size,
+            'vision_sections': vision_sections,
+            'vision_grayscale': vision_grayscale,
+            'vision_min_confidence': vision_min_confidence,
+            'vision_required_fields': tuple(vision_required_fields),
+            'collect_timings': collect_timings,
+            'header_bands': tuple(header_bands),
+            'header_sample_pages': header_sample_pages,
+            'memory_ceiling_mb': memory_ceiling_mb,
+            'layout_templates': layout_templates,
+            'template_validate_every': template_validate_every,
+            'text_backend': text_backend,
+            'parallel_page_threshold': parallel_page_threshold,
+            'parallel_workers': parallel_workers,
+        }
         
         if self.use_cache:
             os.makedirs(self.cache_dir, exist_ok=True)
+            self._hash_index = self._load_hash_index()
+            # Batches flush per chunk; this catches single-file use
+            atexit.register(_flush_at_exit, weakref.ref(self))
+            if isinstance(cache_backend, CacheBackend):
+                self.cache = cache_backend
+            else:
+                self.cache = create_cache_backend(cache_backend, self.cache_dir, max_bytes=cache_max_bytes)
+        
+        # Stored in the cache backend, so worker processes learn from each other
+        self.layouts = LayoutTemplates(self.cache, validate_every=template_validate_every) if layout_templates else None
         
         if self.use_vision and self.api_key:
             self.client = OpenAI(api_key=self.api_key)
@@ -150,17 +794,131 @@ class PDFExtractor:
                 r'(?:頁|页)[：:]?\s*(\d+)\s*[-–—]\s*(\d+)',
             ]
         }
+        # The name-shape author patterns (First Last, initials, before an
+        # affiliation, Asian names) run case-insensitively and match almost
+        # any two words: they score as line-shape fallbacks, not by priority
+        self.pattern_calibration = {'author': {2: HEURISTIC_CONFIDENCE, 3: HEURISTIC_CONFIDENCE,
+                                               4: HEURISTIC_CONFIDENCE, 5: HEURISTIC_CONFIDENCE}}
+        self.pattern_engine = MetadataPatternEngine(self.metadata_patterns, self.pattern_calibration)
+        rules = json.dumps([self.metadata_patterns, self.pattern_calibration,
+                            [regex.pattern for regex in NEW_PAPER_RES]], sort_keys=True, ensure_ascii=False)
+        self.rules_version = f"{RULES_VERSION}.{hashlib.sha1(rules.encode('utf-8')).hexdigest()[:10]}"
+    
+    def _load_hash_index(self) -> Dict[str, Dict]:
+        """Load the path -> content hash index from disk"""
+        if os.path.exists(self.hash_index_file):
+            try:
+                with open(self.hash_index_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning(f"Failed to load hash index: {e}")
+        return {}
+    
+    def flush_hash_index(self):
+        """Write the hashes found since the last flush to path_index.json
+        
+        They are merged into the index as it is on disk, under a lock file,
+        so worker processes sharing it add their entries instead of replacing
+        each other's; entries other processes added are picked up here too.
+        Batches flush once per chunk, and every HASH_INDEX_FLUSH new hashes.
+        """
+        with self._hash_lock:
+            pending, self._hash_pending = self._hash_pending, {}
+        if not pending:
+            return
+        tmp_file = f"{self.hash_index_file}.{os.getpid()}.tmp"
+        try:
+            with file_lock(self.hash_index_file):
+                index = self._load_hash_index()
+                index.update(pending)
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(index, f, ensure_ascii=False)
+                os.replace(tmp_file, self.hash_index_file)
+        except Exception as e:
+            logger.warning(f"Failed to save hash index: {e}")
+            with self._hash_lock:
+                # Kept for the next flush
+                self._hash_pending = {**pending, **self._hash_pending}
+            return
+        with self._hash_lock:
+            for index_key, entry in index.items():
+                self._hash_index.setdefault(index_key, entry)
     
     def _get_cache_key(self, pdf_path: str) -> str:
-        """Generate cache key based on file path and modification time"""
+        """Generate cache key from the file content (SHA-256)
+        
+        The same PDF hits the cache whether it sits in uploads/, pdfs/ or on
+        another node. A path -> hash index keyed by size and mtime avoids
+        re-hashing files that have not changed. PDFs being extracted from
+        memory (see _in_memory) use the hash of their buffer.
+        """
+        with self._hash_lock:
+            buffer = self._buffers.get(pdf_path)
+        if buffer is not None:
+            return buffer[1]
         try:
             stat = os.stat(pdf_path)
-            # Use file path, size, and mtime for cache key
-            key_str = f"{pdf_path}_{stat.st_size}_{stat.st_mtime}"
-            return hashlib.md5(key_str.encode()).hexdigest()
+            index_key = os.path.abspath(pdf_path)
+            with self._hash_lock:
+                entry = self._hash_index.get(index_key)
+                if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+                    return entry['sha256']
+            
+            content_hash = hash_file(pdf_path)
+            
+            if self.use_cache:
+                with self._hash_lock:
+                    self._hash_index[index_key] = self._hash_pending[index_key] = {
+                        'size': stat.st_size,
+                        'mtime': stat.st_mtime_ns,
+                        'sha256': content_hash
+                    }
+                    flush = len(self._hash_pending) >= HASH_INDEX_FLUSH
+                if flush:
+                    self.flush_hash_index()
+            return content_hash
         except:
             return None
     
+    def content_hash(self, pdf_path: str) -> Optional[str]:
+        """SHA-256 of a file's content (from the path index if unchanged)"""
+        return self._get_cache_key(pdf_path)
+    
+    def _hash_entries(self, pdf_paths: List[str]) -> Dict[str, Dict]:
+        """Path index entries of some files, to hand to another process"""
+        with self._hash_lock:
+            return {index_key: self._hash_index[index_key]
+                    for index_key in map(os.path.abspath, pdf_paths) if index_key in self._hash_index}
+    
+    def _learn_hashes(self, entries: Dict[str, Dict]):
+        """Take path index entries from a worker process (see _hash_entries)"""
+        with self._hash_lock:
+            self._hash_index.update(entries)
+    
+    @contextmanager
+    def _in_memory(self, pdf_path: str, data, content_hash: str = None):
+        """While active, pdf_path names the in-memory PDF data (no-op for None)
+        
+        Cache keys come from hashing the buffer and documents are parsed from
+        it, so the PDF never has to exist on disk.
+        """
+        if data is None:
+            yield
+            return
+        data = pdf_buffer(data)
+        content_hash = content_hash or hashlib.sha256(data).hexdigest()
+        with self._hash_lock:
+            buffer = self._buffers.setdefault(pdf_path, [data, content_hash, 0])
+            buffer[:2] = data, content_hash
+            buffer[2] += 1
+        try:
+            yield
+        finally:
+            with self._hash_lock:
+                buffer[2] -= 1
+                if not buffer[2]:
+                    del self._buffers[pdf_path]
+    
     def _get_cached_metadata(self, pdf_path: str) -> Optional[Dict]:
         """Retrieve cached metadata if available"""
         if not self.use_cache:
@@ -170,17 +928,16 @@ class PDFExtractor:
         if not cache_key:
             return None
         
-        cache_file = os.path.join(self.cache_dir, f"{cache_key}.json")
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cached = json.load(f)
-                    logger.info(f"Using cached metadata for {os.path.basename(pdf_path)}")
-                    return cached
-            except Exception as e:
-                logger.warning(f"Failed to load cache: {e}")
-        
-        return None
+        cached = self.cache.get('metadata', cache_key)
+        if cached and cached.pop('rules_version', None) != self.rules_version:
+            # Derived under other rules (or before versioning): re-derive,
+            # from the stored page text when there is some
+            return None
+        if cached:
+            logger.info(f"Using cached metadata for {os.path.basename(pdf_path)}")
+            # Same content may have been cached under another path
+            cached['file_path'] = pdf_path
+        return cached
     
     def _save_to_cache(self, pdf_path: str, metadata: Dict):
         """Save metadata to cache"""
@@ -191,14 +948,9 @@ class PDFExtractor:
         if not cache_key:
             return
         
-        cache_file = os.path.join(self.cache_dir, f"{cache_key}.json")
-        try:
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.warning(f"Failed to save cache: {e}")
+        self.cache.put('metadata', cache_key, dict(metadata, rules_version=self.rules_version))
     
-    def _get_vision_cache(self, pdf_path: str) -> Optional[Dict]:
+    def _get_vision_cache(self, pdf_path: str, suffix: str = '') -> Optional[Dict]:
         """Retrieve cached vision results"""
         if not self.use_cache:
             return None
@@ -207,20 +959,9 @@ class PDFExtractor:
         if not cache_key:
             return None
         
-        vision_cache_dir = os.path.join(self.cache_dir, 'vision')
-        os.makedirs(vision_cache_dir, exist_ok=True)
-        
-        cache_file = os.path.join(vision_cache_dir, f"{cache_key}.json")
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.warning(f"Failed to load vision cache: {e}")
-        
-        return None
+        return self.cache.get('vision', cache_key + suffix)
     
-    def _save_vision_cache(self, pdf_path: str, metadata: Dict):
+    def _save_vision_cache(self, pdf_path: str, metadata: Dict, suffix: str = ''):
         """Save vision results to cache"""
         if not self.use_cache:
             return
@@ -229,59 +970,284 @@ class PDFExtractor:
         if not cache_key:
             return
         
-        vision_cache_dir = os.path.join(self.cache_dir, 'vision')
-        os.makedirs(vision_cache_dir, exist_ok=True)
+        self.cache.put('vision', cache_key + suffix, metadata)
+    
+    def _get_cached_papers(self, pdf_path: str) -> Optional[List[Dict]]:
+        """Cached detect_multiple_papers result for this file's content"""
+        if not self.use_cache:
+            return None
+        
+        cache_key = self._get_cache_key(pdf_path)
+        if not cache_key:
+            return None
+        return self.load_papers(cache_key, pdf_path)
+    
+    def _save_papers(self, pdf_path: str, papers: List[Dict]):
+        """Cache a detect_multiple_papers result (not if any part failed)"""
+        if not self.use_cache or any('error' in paper for paper in papers):
+            return
         
-        cache_file = os.path.join(vision_cache_dir, f"{cache_key}.json")
+        cache_key = self._get_cache_key(pdf_path)
+        if cache_key:
+            self.cache.put('papers', cache_key, {'papers': papers, 'rules_version': self.rules_version})
+    
+    def load_papers(self, result_id: str, pdf_path: str = None) -> Optional[List[Dict]]:
+        """Stored detect_multiple_papers result by ID (see papers_result_id)
+        
+        file_path is set to pdf_path, as the same content may live elsewhere.
+        """
+        if not self.use_cache or not result_id:
+            return None
+        
+        cached = self.cache.get('papers', result_id)
+        if not cached or cached.get('rules_version') != self.rules_version:
+            return None
+        papers = cached['papers']
+        if pdf_path:
+            for paper in papers:
+                paper['file_path'] = pdf_path
+        return papers
+    
+    def papers_result_id(self, pdf_path: str) -> Optional[str]:
+        """ID under which detect_multiple_papers stored this file's result"""
+        if not self.use_cache:
+            return None
+        cache_key = self._get_cache_key(pdf_path)
+        cached = self.cache.get('papers', cache_key) if cache_key else None
+        if cached and cached.get('rules_version') == self.rules_version:
+            return cache_key
+        return None
+    
+    @contextmanager
+    def _open_document(self, pdf_path: str, timings=NULL_TIMINGS):
+        """PDFDocument seeded with this content's stored page text, if any
+        
+        Pages parsed during the session are added to the store on exit, so
+        re-deriving metadata later (new rules_version) needs no PDF parsing.
+        """
+        cache_key = self._get_cache_key(pdf_path) if self.use_cache else None
+        stored = None
+        if cache_key:
+            with timings.stage('cache'):
+                stored = self._get_stored_pages(cache_key)
+            if stored:
+                timings.count('pages_reused', len(stored.get('pages', {})))
+        with self._hash_lock:
+            buffer = self._buffers.get(pdf_path)
+        doc = PDFDocument(pdf_path, timings, stored, data=buffer[0] if buffer else None,
+                          memory_ceiling_mb=self.memory_ceiling_mb, text_backend=self.text_backend)
+        seed = self._page_seeds.pop(pdf_path, None)
+        if seed:
+            doc.add_page_texts(seed)
+            timings.count('pages_parsed_parallel', len(seed))
+        try:
+            yield doc
+        finally:
+            try:
+                if cache_key and doc.modified:
+                    with timings.stage('cache'):
+                        self._save_stored_pages(cache_key, doc)
+            finally:
+                doc.close()
+    
+    def _get_stored_pages(self, cache_key: str) -> Optional[Dict]:
+        """Raw per-page text, page count and info stored for a content hash"""
+        data = self.cache.get_blob('pages', cache_key)
+        if data is None:
+            return None
+        try:
+            return json.loads(decompress_text(data))
+        except Exception as e:
+            logger.warning(f"Failed to load stored pages: {e}")
+            return None
+    
+    def _save_stored_pages(self, cache_key: str, doc: PDFDocument):
         try:
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=2)
+            self.cache.put_blob('pages', cache_key, compress_text(json.dumps(doc.to_stored(), ensure_ascii=False)))
         except Exception as e:
-            logger.warning(f"Failed to save vision cache: {e}")
+            logger.warning(f"Failed to store pages: {e}")
+    
+    def _save_text(self, text_key: Optional[str], text: str):
+        """Store extracted text as a compressed blob, apart from the metadata"""
+        if not self.use_cache or not text_key:
+            return
+        self.cache.put_blob('text', text_key, compress_text(text))
     
-    def extract_from_pdf(self, pdf_path: str, fast_mode: bool = False) -> Dict[str, any]:
+    def get_text(self, paper: Dict, min_pages: int = None) -> str:
+        """Full extracted text of a result, loaded on demand
+        
+        Results only carry a 500-character content_preview; the text itself
+        lives in the cache under paper['text_key']. If the blob was evicted
+        (or caching is off) the text is re-extracted from file_path.
+        
+        Extraction stops reading once the metadata is settled, so the stored
+        text may cover only paper['text_pages'] pages; pass min_pages to read
+        further (up to that many pages) when more content is needed.
+        """
+        if paper.get('full_content'):
+            # Results saved before text blobs
+            return paper['full_content']
+        
+        text_pages = paper.get('text_pages')
+        needs_more = (min_pages is not None and text_pages is not None
+                      and text_pages < min(min_pages, paper.get('page_count') or min_pages))
+        
+        text_key = paper.get('text_key')
+        if self.use_cache and text_key and not needs_more:
+            data = self.cache.get_blob('text', text_key)
+            if data is not None:
+                return decompress_text(data)
+        
+        pdf_path = paper.get('file_path')
+        if not pdf_path or not os.path.exists(pdf_path):
+            return ''
+        
+        with self._open_document(pdf_path) as doc:
+            if paper.get('is_multi_paper') and paper.get('pages'):
+                start_page, end_page = (int(p) - 1 for p in paper['pages'].split('-'))
+                text = self._section_text(doc.page_texts(start_page, end_page + 1))
+            else:
+                max_pages = max(min_pages or 10, text_pages or 0)
+                text = self._extract_text(doc, max_pages=max_pages)
+                paper['text_pages'] = min(max_pages, doc.page_count)
+        self._save_text(text_key, text)
+        return text
+    
+    def rederive_cached(self, fast_mode: bool = False) -> Dict[str, int]:
+        """Bring every cached result up to the current rules_version
+        
+        Outdated 'metadata' and 'papers' entries go through the normal entry
+        points again, which read the stored page text instead of parsing the
+        PDF; entries cached before page text was stored parse their file once.
+        Vision answers come from the vision cache (the API is only called,
+        given a client, for documents that newly need vision). Entries whose
+        file_path is gone or has changed are skipped.
+        
+        Returns:
+            Counts of current, rederived, parsed (no stored pages) and missing entries
+        """
+        counts = {'current': 0, 'rederived': 0, 'parsed': 0, 'missing': 0}
+        if not self.use_cache:
+            return counts
+        
+        for namespace in ('metadata', 'papers'):
+            for cache_key in self.cache.keys(namespace):
+                entry = self.cache.get(namespace, cache_key)
+                if not entry:
+                    continue
+                if entry.get('rules_version') == self.rules_version:
+                    counts['current'] += 1
+                    continue
+                papers = (entry.get('papers') or [{}]) if namespace == 'papers' else [entry]
+                pdf_path = papers[0].get('file_path')
+                if not pdf_path or not os.path.exists(pdf_path) or self._get_cache_key(pdf_path) != cache_key:
+                    counts['missing'] += 1
+                    continue
+                
+                has_pages = self.cache.get_blob('pages', cache_key) is not None
+                if namespace == 'papers':
+                    self.detect_multiple_papers(pdf_path)
+                else:
+                    self.extract_from_pdf(pdf_path, fast_mode)
+                counts['rederived' if has_pages else 'parsed'] += 1
+        
+        logger.info(f"Re-derived cache to rules {self.rules_version}: {counts}")
+        return counts
+    
+    def cache_stats(self) -> Dict:
+        """Hit/miss counters and size of the extraction cache"""
+        if not self.use_cache:
+            return {'enabled': False}
+        return {'enabled': True, **self.cache.stats()}
+    
+    def extract_from_pdf(self, pdf_path: str, fast_mode: bool = False, data=None) -> Dict[str, any]:
         """Extract metadata and content from a PDF file
         
         Args:
             pdf_path: Path to PDF file
             fast_mode: If True, skip vision extraction and use faster text-only extraction
+            data: The PDF's bytes (bytes, bytearray or memoryview) if already in
+                memory, e.g. from a download; it is hashed and parsed from the
+                buffer, and pdf_path only names the document
         """
-        # Check cache first
-        cached = self._get_cached_metadata(pdf_path)
-        if cached:
-            return cached
+        with self._in_memory(pdf_path, data):
+            timings = self._new_timings()
+            # Check cache first
+            cached = self._cache_lookup(timings, self._get_cached_metadata, pdf_path)
+            if cached:
+                return self._with_timings(cached, timings)
+            
+            with self._open_document(pdf_path, timings) as doc:
+                return self._with_timings(self._extract_from_document(doc, fast_mode), timings)
+
+    def _new_timings(self):
+        return StageTimings() if self.collect_timings else NULL_TIMINGS
+
+    @staticmethod
+    def _cache_lookup(timings, lookup, pdf_path: str):
+        """Run a cache getter under the 'cache' stage, counting hits and misses"""
+        with timings.stage('cache'):
+            cached = lookup(pdf_path)
+        timings.count('cache_hits' if cached else 'cache_misses')
+        return cached
+
+    @staticmethod
+    def _with_timings(result, timings):
+        """Copy of a result (or of each paper of a detect result) carrying
+        timings as '_timings'; result itself when timings are off
         
+        Applied after caching, so stored results never contain timings.
+        """
+        block = timings.to_dict()
+        if block is None:
+            return result
+        if isinstance(result, list):
+            return [dict(paper, _timings=block) for paper in result]
+        return dict(result, _timings=block)
+
+    def _extract_from_document(self, doc: PDFDocument, fast_mode: bool = False,
+                               vision_metadata: Optional[Dict] = None, tier: Optional[Dict] = None) -> Dict[str, any]:
+        """Run every extraction stage against an already-open document
+        
+        Text extraction runs first; vision only runs when a required field is
+        missing or below vision_min_confidence (see _needs_vision).
+        vision_metadata and tier, if given, come from a batch that already
+        ran those tiers for this document.
+        """
+        pdf_path = doc.pdf_path
+        if doc.route in REJECTED_ROUTES:
+            return self._error_result(pdf_path, PreflightRejected(doc.route, doc.preflight['reason']))
         try:
-            # Fast mode: text-only extraction
-            if fast_mode:
-                metadata = self._extract_metadata(pdf_path)
-                content = self._extract_text(pdf_path, max_pages=3)  # Only first 3 pages
-                metadata = self._enhance_metadata(metadata, content, pdf_path)
-            else:
-                # Full extraction
-                metadata = self._extract_metadata(pdf_path)
-                content = self._extract_text(pdf_path)
-                
-                # Try to extract additional info from content first
-                if content:
-                    metadata = self._enhance_metadata(metadata, content, pdf_path)
-                
-                # Try vision-based extraction (vision takes priority over text)
-                if self.use_vision and self.client:
-                    try:
-                        vision_metadata = self._extract_with_vision(pdf_path)
-                        # Merge vision results with existing metadata (vision takes priority)
-                        for key, value in vision_metadata.items():
-                            # Accept vision results if they're not "Unknown" or "未知"
-                            if value and value not in ['Unknown', 'N/A', '', '未知', 'N/A']:
-                                metadata[key] = value
-                            # If text extraction found something but vision didn't, keep text result
-                            elif not value or value in ['Unknown', '未知']:
-                                # Keep existing metadata if it's better
-                                pass
+            if tier is None:
+                tier = self._text_tier(doc, fast_mode)
+            metadata = tier['metadata']
+            content = tier['content']
+            text_pages = tier['text_pages']
+            
+            # Try vision-based extraction (vision takes priority over text)
+            if self._wants_vision(tier, fast_mode):
+                try:
+                    if vision_metadata is None:
+                        vision_metadata = self._extract_with_vision(doc)
+                    self._apply_vision(tier, vision_metadata)
+                    if vision_metadata:
                         logger.info(f"Vision extraction successful for {pdf_path}")
-                    except Exception as e:
-                        logger.warning(f"Vision extraction failed, falling back to text: {e}")
+                except Exception as e:
+                    logger.warning(f"Vision extraction failed, falling back to text: {e}")
+            elif not fast_mode and self.use_vision and self.client:
+                logger.info(f"Skipping vision for {pdf_path}: text fields are confident")
+            
+            if tier.get('route') == ROUTE_VISION and self._missing_required(tier):
+                # Vision is off, failed or left fields missing: read the text
+                # layer preflight did not find on its sampled pages
+                tier = self._text_fallback(doc, tier, fast_mode)
+                metadata = tier['metadata']
+                content = tier['content']
+                text_pages = tier['text_pages']
+            
+            if tier.get('layout'):
+                with doc.timings.stage('layout'):
+                    self._learn_layout(doc, tier)
             
             result = {
                 'title': metadata.get('title', 'Unknown'),
@@ -292,252 +1258,849 @@ class PDFExtractor:
                 'issue': metadata.get('issue', 'N/A'),
                 'pages': metadata.get('pages', 'N/A'),
                 'content_preview': content[:500] if content else '',
-                'full_content': content,
+                'text_key': self._get_cache_key(pdf_path) if self.use_cache else None,
+                'text_pages': text_pages,
+                'page_count': doc.page_count,
+                'field_sources': tier['sources'],
+                'field_confidence': self._rounded(tier['confidence']),
                 'file_path': pdf_path
             }
             
-            # Save to cache
-            self._save_to_cache(pdf_path, result)
+            # Save to cache (text goes to its own compressed blob)
+            with doc.timings.stage('cache'):
+                self._save_text(result['text_key'], content)
+                self._save_to_cache(pdf_path, result)
             
             return result
         except Exception as e:
-            logger.error(f"Error extracting from {pdf_path}: {e}")
-            return {
-                'title': 'Error',
-                'authors': 'Unknown',
-                'year': 'Unknown',
-                'journal': 'N/A',
-                'volume': 'N/A',
-                'issue': 'N/A',
-                'pages': 'N/A',
-                'content_preview': '',
-                'full_content': '',
-                'file_path': pdf_path,
-                'error': str(e)
-            }
+            logger.error(f"Error extracting from {pdf_path}: {e}")
+            return self._error_result(pdf_path, e)
+    
+    def _text_tier(self, doc: PDFDocument, fast_mode: bool = False, fallback: bool = False) -> Dict:
+        """Text-only metadata with per-field confidence and source
+        
+        Returns a dict with metadata, confidence ({field: 0-1}), sources
+        ({field: 'pdf'|'text'|'vision'}), content and text_pages. A document
+        preflight did not route to 'normal' gets an empty tier (carrying the
+        route) unless fallback is set: a 'vision' one is read as text only
+        where vision cannot supply its fields (see _text_fallback).
+        """
+        if doc.route != ROUTE_NORMAL and not (fallback and doc.route == ROUTE_VISION):
+            return {'metadata': {}, 'confidence': {}, 'sources': {}, 'content': '', 'text_pages': 0,
+                    'route': doc.route}
+        with doc.timings.stage('pdf_metadata'):
+            metadata = self._extract_metadata(doc)
+        confidence = {}
+        for field in ('title', 'authors', 'year'):
+            if metadata.get(field):
+                confidence[field] = PDF_DATE_CONFIDENCE if field == 'year' else PDF_PROPERTY_CONFIDENCE
+        sources = dict.fromkeys(confidence, 'pdf')
+        
+        # Fast mode: only first 3 pages
+        with doc.timings.stage('text'):
+            content, text_pages = self._read_content(doc, max_pages=3 if fast_mode else 10)
+        
+        # Try to extract additional info from content first
+        if fast_mode or content:
+            scores = {}
+            with doc.timings.stage('patterns'):
+                metadata = self._enhance_metadata(metadata, content, doc, scores)
+            confidence.update(scores)
+            sources.update(dict.fromkeys(scores, 'text'))
+        
+        tier = {'metadata': metadata, 'confidence': confidence, 'sources': sources,
+                'content': content, 'text_pages': text_pages}
+        if self.layouts is not None:
+            with doc.timings.stage('layout'):
+                self._apply_layout_template(doc, tier)
+        return tier
+    
+    def _text_fallback(self, doc: PDFDocument, tier: Dict, fast_mode: bool = False) -> Dict:
+        """Text tier of a vision-routed document, with the fields vision did
+        supply kept over the text ones"""
+        text = self._text_tier(doc, fast_mode, fallback=True)
+        for field, source in tier['sources'].items():
+            if source == 'vision':
+                text['metadata'][field] = tier['metadata'][field]
+                text['confidence'][field] = tier['confidence'][field]
+                text['sources'][field] = source
+        doc.timings.count('vision_route_fallbacks')
+        return text
+    
+    def _apply_layout_template(self, doc: PDFDocument, tier: Dict):
+        """Overwrite a tier's fields with those a learned layout template reads
+        
+        Only a template that reads every vision_required_fields entry is
+        used, so vision is skipped on the template's word alone. A text value
+        scored above TEMPLATE_CONFIDENCE is kept. The template's context
+        (with every value it read, for checking against vision) is kept as
+        tier['layout'] for _learn_layout.
+        """
+        try:
+            bands = self._extract_headers_footers(doc)
+            first_page = doc.page_text(0) if doc.page_count else ''
+            context = self.layouts.match(bands['headers'], bands['footers'], first_page,
+                                         required=self.vision_required_fields)
+        except Exception as e:
+            logger.warning(f"Layout template lookup failed for {doc.pdf_path}: {e}")
+            return
+        for field, value in context['values'].items():
+            if tier['confidence'].get(field, 0.0) > TEMPLATE_CONFIDENCE:
+                continue
+            tier['metadata'][field] = value
+            tier['confidence'][field] = TEMPLATE_CONFIDENCE
+            tier['sources'][field] = 'template'
+        if context['template']:
+            doc.timings.count('template_hits')
+            if context['validate']:
+                doc.timings.count('template_checks')
+        tier['layout'] = context
+    
+    def _learn_layout(self, doc: PDFDocument, tier: Dict):
+        """Feed a finished document's fields back to the layout templates"""
+        try:
+            bands = self._extract_headers_footers(doc)
+            self.layouts.observe(tier['layout'], tier['metadata'], tier['sources'], tier['confidence'],
+                                 doc.page_text(0), bands['headers'], bands['footers'])
+        except Exception as e:
+            logger.warning(f"Layout template learning failed for {doc.pdf_path}: {e}")
+    
+    def _section_tier(self, pages: List[str], start_page: int, end_page: int) -> Dict:
+        """_text_tier for one paper of a multi-paper PDF"""
+        text = self._section_text(pages[start_page:end_page + 1])
+        scores = {}
+        metadata = self._enhance_metadata({}, text[:3000], scores=scores)
+        return {'metadata': metadata, 'confidence': scores, 'sources': dict.fromkeys(scores, 'text'),
+                'content': text, 'text_pages': end_page - start_page + 1}
+    
+    def _needs_vision(self, tier: Dict, fields: Tuple[str, ...] = None) -> bool:
+        """True if a required field is missing or below vision_min_confidence
+        
+        fields limits the check to those of vision_required_fields that a
+        tier can have (multi-paper sections have no journal).
+        """
+        if self.vision_min_confidence is None:
+            return True
+        for field in self.vision_required_fields:
+            if fields is not None and field not in fields:
+                continue
+            value = tier['metadata'].get(field)
+            if not value or value in UNKNOWN_VALUES:
+                return True
+            if tier['confidence'].get(field, 0.0) < self.vision_min_confidence:
+                return True
+        return False
+    
+    def _missing_required(self, tier: Dict) -> bool:
+        """True if a vision_required_fields entry has no value"""
+        return any(not tier['metadata'].get(field) or tier['metadata'][field] in UNKNOWN_VALUES
+                   for field in self.vision_required_fields)
+    
+    def _wants_vision(self, tier: Dict, fast_mode: bool = False, fields: Tuple[str, ...] = None) -> bool:
+        """_needs_vision (or a layout template check is due), if vision can
+        answer (API client, or a cached answer for re-derived results)"""
+        return bool(not fast_mode and self.use_vision and (self.client or self.use_cache)
+                    and tier.get('route') not in REJECTED_ROUTES
+                    and (self._needs_vision(tier, fields) or tier.get('layout', {}).get('validate')))
+    
+    def _apply_vision(self, tier: Dict, vision_metadata: Dict):
+        """Merge vision results into a tier (vision takes priority)"""
+        for key, value in vision_metadata.items():
+            # Accept vision results if they're not "Unknown" or "未知";
+            # if text extraction found something but vision didn't, keep text result
+            if value and value not in UNKNOWN_VALUES:
+                tier['metadata'][key] = value
+                tier['sources'][key] = 'vision'
+                tier['confidence'][key] = VISION_CONFIDENCE
+    
+    @staticmethod
+    def _rounded(confidence: Dict[str, float]) -> Dict[str, float]:
+        return {field: round(score, 2) for field, score in confidence.items()}
+    
+    def extract_from_pdfs_batch(self, pdf_paths: List[str], max_workers: int = 4, fast_mode: bool = False,
+                                executor: str = 'thread', chunk_size: int = None) -> List[Dict]:
+        """Extract metadata from multiple PDFs in parallel
+        
+        Args:
+            pdf_paths: List of PDF file paths
+            max_workers: Number of parallel workers (default: 4)
+            fast_mode: If True, use faster text-only extraction
+            executor: 'thread' (shares this extractor) or 'process' (persistent
+                worker processes, one PDFExtractor each; use for CPU-bound jobs)
+            chunk_size: PDFs per task (at least vision_batch_size when vision
+                requests are batched)
+        
+        Returns:
+            List of metadata dictionaries, in the order of pdf_paths
+        """
+        return [result for _, result in self.iter_batch(pdf_paths, max_workers=max_workers, fast_mode=fast_mode,
+                                                        executor=executor, chunk_size=chunk_size)]
+    
+    def iter_batch(self, pdf_paths: List[str], mode: str = 'extract', max_workers: int = 4,
+                   fast_mode: bool = False, executor: str = 'thread', chunk_size: int = None):
+        """Process PDFs in parallel, yielding (pdf_path, result) in input order
+        
+        mode is 'extract' (result is a metadata dict) or 'detect' (result is
+        the list of papers from detect_multiple_papers). A file that fails, or
+        whose worker process dies, yields an error result instead of stopping
+        the batch. Closing the generator early (e.g. a cancelled job) cancels
+        the tasks that have not started yet.
+        
+        With executor='process', mode 'detect' and parallel_page_threshold,
+        a worker that opens a document of that many pages or more hands it
+        back before reading its pages (see _finish_split): its page ranges
+        are queued on the pool, so one long file is not a serial tail, and a
+        worker then finishes it from those pages under its own budget.
+        """
+        if mode not in ('extract', 'detect'):
+            raise ValueError(f"Unknown batch mode: {mode}")
+        # Chunks of vision_batch_size let each task share vision requests
+        min_chunk = self.vision_batch_size if self._batch_vision(fast_mode) else 1
+        if executor == 'process':
+            chunk_size = chunk_size or max(min_chunk, min(8, len(pdf_paths) // (max_workers * 4)))
+            # Looked up per submit so a pool reset mid-batch is picked up
+            submit = lambda chunk: self._submit_chunk(self._get_process_pool(max_workers), mode, chunk, fast_mode)
+        elif executor == 'thread':
+            if self.doc_timeout or self.doc_memory_mb:
+                logger.warning("doc_timeout/doc_memory_mb are only enforced with executor='process'")
+            chunk_size = chunk_size or min_chunk
+            pool = ThreadPoolExecutor(max_workers=max_workers)
+            submit = lambda chunk: pool.submit(self._process_chunk, mode, chunk, fast_mode)
+        else:
+            raise ValueError(f"Unknown executor: {executor}")
+        
+        chunks = [pdf_paths[i:i + chunk_size] for i in range(0, len(pdf_paths), chunk_size)]
+        pending = deque()
+        next_chunk = 0
+        try:
+            while pending or next_chunk < len(chunks):
+                # Keep a bounded number of chunks in flight so cancellation is prompt
+                while next_chunk < len(chunks) and len(pending) < max_workers * 2:
+                    pending.append((chunks[next_chunk], submit(chunks[next_chunk])))
+                    next_chunk += 1
+                
+                chunk, future = pending.popleft()
+                try:
+                    results = future.result()
+                    if executor == 'process':
+                        # The worker's content hashes: papers_result_id() etc. need not hash again
+                        results, hashes = results
+                        self._learn_hashes(hashes)
+                        results = [self._finish_split(max_workers, mode, result, fast_mode)
+                                   if isinstance(result, SplitRequest) else result for result in results]
+                except BudgetExceeded as e:
+                    if len(chunk) > 1:
+                        # Retry the files one by one so only the one over budget fails
+                        logger.warning(f"Chunk of {len(chunk)} PDFs stopped ({e}); retrying them one at a time")
+                        pending.extendleft(reversed([([path], submit([path])) for path in chunk]))
+                        continue
+                    logger.error(f"{os.path.basename(chunk[0])} failed: {e}")
+                    results = [self._error_result(chunk[0], e, mode)]
+                except Exception as e:
+                    # The worker died (crash, OOM kill); fail this chunk only
+                    logger.error(f"Worker failed on {len(chunk)} PDF(s): {e}")
+                    if isinstance(e, BrokenProcessPool):
+                        self._reset_process_pool()
+                        pending = deque((c, f if _succeeded(f) else submit(c)) for c, f in pending)
+                    results = [self._error_result(path, e, mode) for path in chunk]
+                
+                for pdf_path, result in zip(chunk, results):
+                    logger.info(f"Completed: {os.path.basename(pdf_path)}")
+                    yield pdf_path, result
+        finally:
+            for _, future in pending:
+                future.cancel()
+            if executor == 'thread':
+                pool.shutdown(wait=False)
+    
+    def _process_chunk(self, mode: str, pdf_paths: List[str], fast_mode: bool = False) -> List:
+        """Run one batch task, isolating failures per file"""
+        try:
+            if len(pdf_paths) > 1 and self._batch_vision(fast_mode):
+                return self._process_chunk_batched_vision(mode, pdf_paths, fast_mode)
+            
+            results = []
+            for pdf_path in pdf_paths:
+                try:
+                    if mode == 'detect':
+                        results.append(self.detect_multiple_papers(pdf_path))
+                    else:
+                        results.append(self.extract_from_pdf(pdf_path, fast_mode))
+                except SplitRequest as e:
+                    # Handed back to the batch as the file's result (see iter_batch)
+                    results.append(e)
+                except Exception as e:
+                    logger.error(f"Failed to process {pdf_path}: {e}")
+                    results.append(self._error_result(pdf_path, e, mode))
+            return results
+        finally:
+            self.flush_hash_index()
+    
+    def _batch_vision(self, fast_mode: bool = False) -> bool:
+        """Whether batches should pack vision pages into shared requests"""
+        return bool(not fast_mode and self.use_vision and self.client and self.vision_batch_size > 1)
+    
+    def _process_chunk_batched_vision(self, mode: str, pdf_paths: List[str], fast_mode: bool = False) -> List:
+        """_process_chunk with one round of vision requests for the whole chunk
+        
+        Opens every document and runs the text tier, collects the pages whose
+        text results still need vision, sends them together (vision_batch_size
+        images per request), then finishes each document with its own answer.
+        """
+        results = [None] * len(pdf_paths)
+        plans = []  # (index, doc, boundaries, tiers, wanted vision items, first item)
+        items = []
+        
+        with ExitStack() as stack:
+            for i, pdf_path in enumerate(pdf_paths):
+                try:
+                    timings = self._new_timings()
+                    if mode == 'detect':
+                        cached_papers = self._cache_lookup(timings, self._get_cached_papers, pdf_path)
+                        if cached_papers:
+                            results[i] = self._with_timings(cached_papers, timings)
+                            continue
+                    cached = self._cache_lookup(timings, self._get_cached_metadata, pdf_path)
+                    if cached and mode == 'extract':
+                        results[i] = self._with_timings(cached, timings)
+                        continue
+                    doc = stack.enter_context(self._open_document(pdf_path, timings))
+                    boundaries, tiers, wanted = self._prepare_document(mode, doc, fast_mode, cached)
+                    plans.append((i, doc, boundaries, tiers, wanted, len(items)))
+                    items.extend(item for _, item in wanted)
+                except SplitRequest as e:
+                    results[i] = e
+                except Exception as e:
+                    logger.warning(f"Batched extraction could not prepare {pdf_path}: {e}")
+            
+            answers = self._extract_with_vision_batch(items)
+            
+            for i, doc, boundaries, tiers, wanted, first in plans:
+                try:
+                    vision = self._vision_answers(tiers, wanted, answers[first:first + len(wanted)])
+                    results[i] = self._finish_document(mode, doc, boundaries, tiers, vision, fast_mode)
+                except Exception as e:
+                    logger.warning(f"Batched extraction failed for {doc.pdf_path}: {e}")
+        
+        # Anything that failed above goes through the regular per-file path
+        # (which has its own fallbacks and error results)
+        for i, pdf_path in enumerate(pdf_paths):
+            if results[i] is None:
+                results[i] = self._process_chunk(mode, [pdf_path], fast_mode)[0]
+        return results
+    
+    def _prepare_document(self, mode: str, doc: PDFDocument, fast_mode: bool = False,
+                          cached: Optional[Dict] = None):
+        """Text stages of an open document, ahead of its vision requests
+        
+        Returns (boundaries, tiers, wanted vision items); tiers is None when a
+        detect run finds a single paper whose metadata is already cached.
+        """
+        boundaries = None
+        if mode == 'detect':
+            boundaries = self._scan_paper_boundaries(doc)
+            if cached and len(boundaries) <= 1:
+                return boundaries, None, []
+        tiers = self._document_tiers(doc, boundaries, fast_mode)
+        return boundaries, tiers, self._vision_items(doc, boundaries, tiers, fast_mode)
+    
+    @staticmethod
+    def _vision_answers(tiers: Optional[List[Dict]], wanted: List, answers: List[Dict]) -> Optional[List[Dict]]:
+        """One vision answer (or None) per tier from the answers to wanted"""
+        if tiers is None:
+            return None
+        vision = [None] * len(tiers)
+        for (index, _), answer in zip(wanted, answers):
+            vision[index] = answer
+        return vision
+    
+    def _finish_document(self, mode: str, doc: PDFDocument, boundaries: Optional[List[Dict]],
+                         tiers: Optional[List[Dict]], vision: Optional[List[Dict]], fast_mode: bool = False):
+        """Result of a prepared document given its vision answers"""
+        if mode == 'detect':
+            papers = self._detect_papers_in_document(doc, boundaries, tiers, vision)
+            with doc.timings.stage('cache'):
+                self._save_papers(doc.pdf_path, papers)
+            return self._with_timings(papers, doc.timings)
+        result = self._extract_from_document(doc, fast_mode, vision[0], tiers[0])
+        return self._with_timings(result, doc.timings)
+    
+    def _document_tiers(self, doc: PDFDocument, paper_boundaries: Optional[List[Dict]],
+                        fast_mode: bool = False) -> List[Dict]:
+        """Text tier of the whole document, or of each paper if it holds several"""
+        if not paper_boundaries or len(paper_boundaries) <= 1:
+            return [self._text_tier(doc, fast_mode)]
+        pages = self._extract_all_pages(doc)
+        with doc.timings.stage('patterns'):
+            return [self._section_tier(pages, boundary['start_page'], boundary['end_page'])
+                    for boundary in paper_boundaries]
+    
+    def _vision_items(self, doc: PDFDocument, paper_boundaries: Optional[List[Dict]], tiers: List[Dict],
+                      fast_mode: bool = False) -> List[Tuple[int, Tuple[PDFDocument, int, str]]]:
+        """(tier index, vision item) for each tier whose text result needs vision"""
+        if not paper_boundaries or len(paper_boundaries) <= 1:
+            return [(0, (doc, 0, ''))] if self._wants_vision(tiers[0], fast_mode) else []
+        if not self.vision_sections:
+            return []
+        return [(index, (doc, boundary['start_page'],
+                         f"_p{boundary['start_page'] + 1}-{boundary['end_page'] + 1}"))
+                for index, (boundary, tier) in enumerate(zip(paper_boundaries, tiers))
+                if self._wants_vision(tier, fast_mode, fields=SECTION_FIELDS)]
+    
+    @staticmethod
+    def _error_result(pdf_path: str, error: Exception, mode: str = 'extract'):
+        """Placeholder result for a PDF that could not be processed"""
+        result = {
+            'title': 'Error',
+            'authors': 'Unknown',
+            'year': 'Unknown',
+            'journal': 'N/A',
+            'volume': 'N/A',
+            'issue': 'N/A',
+            'pages': 'N/A',
+            'content_preview': '',
+            'text_key': None,
+            'file_path': pdf_path,
+            'error': str(error)
+        }
+        if isinstance(error, (BudgetExceeded, PreflightRejected)):
+            result['failure'] = error.reason
+        return [result] if mode == 'detect' else result
+    
+    def _get_process_pool(self, max_workers: int):
+        """Persistent worker processes, each holding its own PDFExtractor
+        
+        A BudgetedProcessPool when doc_timeout or doc_memory_mb is set,
+        otherwise a plain ProcessPoolExecutor. A running pool with at least
+        max_workers workers is reused; a smaller one is replaced, and keeps
+        running the tasks already queued on it (e.g. another caller's page
+        ranges) until they finish.
+        """
+        with self._pool_lock:
+            if self._process_pool is not None and self._process_pool_workers < max_workers:
+                self._process_pool.shutdown(wait=False)
+                self._process_pool = None
+            if self._process_pool is None:
+                # spawn: forking a process that runs Flask/worker threads is unsafe
+                options = dict(max_workers=max_workers,
+                               mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_worker,
+                               initargs=(self._worker_config,))
+                if self.doc_timeout or self.doc_memory_mb:
+                    self._process_pool = BudgetedProcessPool(
+                        timeout=self.doc_timeout, memory_mb=self.doc_memory_mb, **options)
+                else:
+                    self._process_pool = ProcessPoolExecutor(**options)
+                self._process_pool_workers = max_workers
+                logger.info(f"Started {max_workers} extraction worker processes")
+            return self._process_pool
+    
+    @staticmethod
+    def _submit_chunk(pool, mode: str, chunk: List[str], fast_mode: bool,
+                      page_texts: Optional[Dict[str, Dict[int, str]]] = None):
+        """Submit a chunk to a worker pool; a budgeted pool allows one budget per file"""
+        if isinstance(pool, BudgetedProcessPool):
+            return pool.submit_budgeted(len(chunk), _process_chunk, mode, chunk, fast_mode, page_texts)
+        return pool.submit(_process_chunk, mode, chunk, fast_mode, page_texts)
+    
+    def _finish_split(self, max_workers: int, mode: str, request: SplitRequest, fast_mode: bool = False):
+        """Result of a long document a batch worker handed back
+        
+        Its missing pages are parsed as ranges across the pool, then one
+        worker finishes the document from them, under the same budget as any
+        file. A range or finishing task that fails fails the document.
+        """
+        pdf_path = request.pdf_path
+        try:
+            pool = self._get_process_pool(max_workers)
+            texts = self._parse_page_ranges(pool, pdf_path, None, request.preflight, request.pages)
+            results, hashes = self._submit_chunk(pool, mode, [pdf_path], fast_mode, {pdf_path: texts}).result()
+            self._learn_hashes(hashes)
+            return results[0]
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._reset_process_pool()
+            logger.error(f"{os.path.basename(pdf_path)} failed: {e}")
+            return self._error_result(pdf_path, e, mode)
     
-    def extract_from_pdfs_batch(self, pdf_paths: List[str], max_workers: int = 4, fast_mode: bool = False) -> List[Dict]:
-        """Extract metadata from multiple PDFs in parallel
+    def _reset_process_pool(self):
+        with self._pool_lock:
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=False, cancel_futures=True)
+                self._process_pool = None
+    
+    def shutdown(self, wait: bool = True):
+        """Stop worker processes started by process-mode batches
         
-        Args:
-            pdf_paths: List of PDF file paths
-            max_workers: Number of parallel workers (default: 4)
-            fast_mode: If True, use faster text-only extraction
+        Tasks already submitted still finish; a later batch starts a new pool.
+        """
+        self.flush_hash_index()
+        with self._pool_lock:
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=wait)
+                self._process_pool = None
+    
+    async def extract_from_pdf_async(self, pdf_path: str, fast_mode: bool = False, data=None) -> Dict[str, any]:
+        """extract_from_pdf for asyncio callers
+        
+        Parsing, pattern matching and rendering run in async_executor; vision
+        requests go through the async OpenAI client, so the event loop keeps
+        serving other work (downloads, requests) meanwhile. Cancelling the
+        task stops it after the blocking step in progress; the document is
+        still closed and its parsed pages stored.
+        """
+        data, content_hash = await self._buffer_async(data)
+        with self._in_memory(pdf_path, data, content_hash):
+            return await self._process_async('extract', pdf_path, fast_mode)
+    
+    async def detect_multiple_papers_async(self, pdf_path: str, data=None) -> List[Dict]:
+        """detect_multiple_papers for asyncio callers (see extract_from_pdf_async)"""
+        data, content_hash = await self._buffer_async(data)
+        with self._in_memory(pdf_path, data, content_hash):
+            try:
+                return await self._process_async('detect', pdf_path)
+            except Exception as e:
+                logger.error(f"Error detecting multiple papers in {pdf_path}: {e}")
+                return [await self._process_async('extract', pdf_path)]
+    
+    async def extract_many_async(self, pdf_paths: List[str], mode: str = 'extract', fast_mode: bool = False,
+                                 max_concurrency: int = 4) -> List:
+        """Process PDFs concurrently, at most max_concurrency at a time
         
-        Returns:
-            List of metadata dictionaries
+        Returns results in the order of pdf_paths; mode is 'extract' or
+        'detect' as in iter_batch. A file that fails gets an error result;
+        cancelling the call cancels every file still in progress.
         """
-        results = []
+        if mode not in ('extract', 'detect'):
+            raise ValueError(f"Unknown batch mode: {mode}")
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all tasks
-            future_to_path = {
-                executor.submit(self.extract_from_pdf, path, fast_mode): path 
-                for path in pdf_paths
-            }
-            
-            # Collect results as they complete
-            for future in as_completed(future_to_path):
-                pdf_path = future_to_path[future]
+        async def process(pdf_path: str):
+            async with semaphore:
                 try:
-                    result = future.result()
-                    results.append(result)
-                    logger.info(f"Completed: {os.path.basename(pdf_path)}")
+                    if mode == 'detect':
+                        return await self.detect_multiple_papers_async(pdf_path)
+                    return await self.extract_from_pdf_async(pdf_path, fast_mode)
                 except Exception as e:
                     logger.error(f"Failed to process {pdf_path}: {e}")
-                    results.append({
-                        'title': 'Error',
-                        'authors': 'Unknown',
-                        'year': 'Unknown',
-                        'journal': 'N/A',
-                        'volume': 'N/A',
-                        'issue': 'N/A',
-                        'pages': 'N/A',
-                        'content_preview': '',
-                        'full_content': '',
-                        'file_path': pdf_path,
-                        'error': str(e)
-                    })
+                    return self._error_result(pdf_path, e, mode)
         
-        return results
+        try:
+            return list(await asyncio.gather(*(process(pdf_path) for pdf_path in pdf_paths)))
+        finally:
+            self.flush_hash_index()
+    
+    async def _buffer_async(self, data) -> Tuple[Optional[bytes], Optional[str]]:
+        """An in-memory PDF as bytes plus its SHA-256, hashed off the event loop"""
+        if data is None:
+            return None, None
+        data = pdf_buffer(data)
+        return data, await self._run_async(lambda: hashlib.sha256(data).hexdigest())
+    
+    def _run_async(self, func, *args) -> asyncio.Future:
+        return asyncio.get_running_loop().run_in_executor(self.async_executor, partial(func, *args))
+    
+    async def _process_async(self, mode: str, pdf_path: str, fast_mode: bool = False):
+        """Async counterpart of one _process_chunk_batched_vision document"""
+        timings = self._new_timings()
+        if mode == 'detect':
+            cached_papers = await self._run_async(self._cache_lookup, timings, self._get_cached_papers, pdf_path)
+            if cached_papers:
+                return self._with_timings(cached_papers, timings)
+        cached = await self._run_async(self._cache_lookup, timings, self._get_cached_metadata, pdf_path)
+        if cached and mode == 'extract':
+            return self._with_timings(cached, timings)
+        
+        opened = self._open_document(pdf_path, timings)
+        # Executor steps cannot be interrupted, so each is shielded; on
+        # cancellation the document is closed once the running step returns
+        entered = step = self._run_async(opened.__enter__)
+        try:
+            doc = await asyncio.shield(step)
+            step = self._run_async(self._prepare_document, mode, doc, fast_mode, cached)
+            boundaries, tiers, wanted = await asyncio.shield(step)
+            
+            items = [item for _, item in wanted]
+            answers = [{} for _ in items]
+            if items and self.use_vision:
+                step = self._run_async(self._vision_pending, items, answers)
+                pending = await asyncio.shield(step)
+                await self._send_vision_async(items, pending, answers)
+            vision = self._vision_answers(tiers, wanted, answers)
+            
+            step = self._run_async(self._finish_document, mode, doc, boundaries, tiers, vision, fast_mode)
+            result = await asyncio.shield(step)
+        except asyncio.CancelledError:
+            step.add_done_callback(lambda _: self._close_entered(entered, opened))
+            raise
+        except Exception:
+            if not entered.exception():
+                await self._run_async(opened.__exit__, None, None, None)
+            raise
+        await self._run_async(opened.__exit__, None, None, None)
+        return result
+    
+    def _close_entered(self, entered: asyncio.Future, opened):
+        """Close a document session after a cancelled _process_async"""
+        if entered.cancelled() or entered.exception() is not None:
+            return
+        try:
+            entered.get_loop().run_in_executor(self.async_executor, opened.__exit__, None, None, None)
+        except RuntimeError:
+            # Executor already shut down (the loop is closing)
+            opened.__exit__(None, None, None)
+    
+    async def _send_vision_async(self, items: List[Tuple[PDFDocument, int, str]], pending: List[Tuple[int, str]],
+                                 results: List[Dict]):
+        """_extract_with_vision_batch's requests, sent concurrently through
+        the async client"""
+        async def send(group):
+            request_start = time.perf_counter()
+            try:
+                metadatas = await self._vision_request_async([image_data for _, image_data in group])
+            except Exception as e:
+                logger.error(f"Vision extraction error: {e}")
+                if len(group) == 1:
+                    metadatas = [{}]
+                else:
+                    answers = await asyncio.gather(*(self._vision_request_async([image_data])
+                                                     for _, image_data in group), return_exceptions=True)
+                    metadatas = []
+                    for answer in answers:
+                        if isinstance(answer, Exception):
+                            logger.error(f"Vision extraction error: {answer}")
+                            answer = [{}]
+                        metadatas.extend(answer)
+            await self._run_async(self._store_vision_answers, items, group, metadatas, results,
+                                  time.perf_counter() - request_start)
+        
+        await asyncio.gather(*(send(group) for group in self._vision_groups(pending)))
+    
+    async def _vision_request_async(self, images: List[str]) -> List[Dict[str, str]]:
+        """_vision_request awaiting the async client (or run in async_executor without one)"""
+        client = self._get_async_client()
+        if client is None:
+            return await self._run_async(self._vision_request, images)
+        response = await client.chat.completions.create(**self._vision_payload(images))
+        return self._parse_vision_response(response, len(images))
+    
+    def _get_async_client(self):
+        """AsyncOpenAI client for the running event loop
+        
+        Its connection pool belongs to the loop that first used it, so a new
+        client is made when called from another loop (e.g. a later asyncio.run).
+        """
+        if AsyncOpenAI is None or not self.client:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = AsyncOpenAI(api_key=self.api_key)
+            self._async_client_loop = loop
+        return self._async_client
     
-    def _extract_metadata(self, pdf_path: str) -> Dict[str, str]:
+    def _extract_metadata(self, doc: PDFDocument) -> Dict[str, str]:
         """Extract metadata from PDF properties"""
         metadata = {}
         
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                pdf_info = pdf_reader.metadata
-                
-                if pdf_info:
-                    metadata['title'] = pdf_info.get('/Title', '')
-                    metadata['authors'] = pdf_info.get('/Author', '')
-                    metadata['subject'] = pdf_info.get('/Subject', '')
-                    
-                    # Try to extract year from creation date
-                    creation_date = pdf_info.get('/CreationDate', '')
-                    if creation_date:
-                        year_match = re.search(r'(19|20)\d{2}', creation_date)
-                        if year_match:
-                            metadata['year'] = year_match.group(0)
+            pdf_info = doc.metadata
+            
+            if pdf_info:
+                metadata['title'] = pdf_info.get('Title', '')
+                metadata['authors'] = pdf_info.get('Author', '')
+                metadata['subject'] = pdf_info.get('Subject', '')
                 
-                # Get page count
-                metadata['page_count'] = len(pdf_reader.pages)
+                # Try to extract year from creation date
+                creation_date = pdf_info.get('CreationDate', '')
+                if creation_date:
+                    year_match = re.search(r'(19|20)\d{2}', creation_date)
+                    if year_match:
+                        metadata['year'] = year_match.group(0)
+            
+            # Get page count
+            metadata['page_count'] = doc.page_count
         
         except Exception as e:
             logger.warning(f"Could not extract PDF metadata: {e}")
         
         return metadata
     
-    def _extract_headers_footers(self, pdf_path: str, max_pages: int = 3) -> Dict[str, List[str]]:
-        """Extract headers and footers from multiple pages to find consistent journal info
+    def _extract_headers_footers(self, doc: PDFDocument, max_pages: int = None) -> Dict[str, List[str]]:
+        """Extract headers and footers from sampled pages to find consistent journal info
         
-        Optimized: Only checks first 3 pages (reduced from 5) for speed
+        Reads only the top/bottom bands (header_bands) of header_sample_pages
+        pages (max_pages overrides): the first three, then pages spread over
+        the whole document, so long issues cost a few cropped regions rather
+        than full-page layout passes.
         """
         headers = []
         footers = []
+        top, bottom = self.header_bands
         
         try:
-            # Use PyPDF2 first (faster than pdfplumber)
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for i in range(min(max_pages, len(pdf_reader.pages))):
-                    text = pdf_reader.pages[i].extract_text() or ""
-                    lines = text.split('\n')
-                    if len(lines) > 0:
-                        # First line only (faster)
-                        headers.append(lines[0])
-                        # Last line only (faster)
-                        if len(lines) > 1:
-                            footers.append(lines[-1])
+            for page_num in self._sample_pages(doc.page_count, max_pages or self.header_sample_pages):
+                header, footer = doc.page_bands(page_num, top, bottom)
+                if header:
+                    headers.append(header)
+                if footer:
+                    footers.append(footer)
         except Exception as e:
             logger.warning(f"Header/footer extraction failed: {e}")
         
         return {'headers': headers, 'footers': footers}
     
-    def _extract_text(self, pdf_path: str, max_pages: int = 10) -> str:
+    @staticmethod
+    def _sample_pages(page_count: int, samples: int) -> List[int]:
+        """The first pages (up to 3), then pages spread evenly over the rest"""
+        pages = list(range(min(3, samples, page_count)))
+        remaining = samples - len(pages)
+        span = page_count - len(pages)
+        if remaining > 0 and span > 0:
+            step = span / remaining
+            pages.extend(sorted({len(pages) + int(i * step + step / 2) for i in range(min(remaining, span))}))
+        return pages
+    
+    def _extract_text(self, doc: PDFDocument, max_pages: int = 10) -> str:
         """Extract text content from PDF (first few pages for metadata)"""
-        text = ""
+        return "\n\n".join(doc.page_texts(0, max_pages)).strip()
+    
+    def _read_content(self, doc: PDFDocument, max_pages: int = 10) -> Tuple[str, int]:
+        """Pull pages lazily until the metadata is settled
         
+        Returns (content, pages_read). Stops before max_pages once the text
+        covers every metadata window, or once each EARLY_STOP_FIELDS entry
+        scores at or above early_stop_confidence. get_text()
+        fetches the remaining pages if a consumer needs them.
+        """
+        pages = []
+        content = ""
+        for text in doc.iter_page_texts(0, max_pages):
+            pages.append(text)
+            content = "\n\n".join(pages).strip()
+            if self._content_settled(content, doc):
+                break
+        return content, len(pages)
+    
+    def _content_settled(self, content: str, doc: PDFDocument = None) -> bool:
+        """True if reading further pages cannot (or is unlikely to) change metadata"""
+        if len(content) >= self.METADATA_WINDOW and content.count('\n') >= self.METADATA_LINES:
+            return True
+        if self.early_stop_confidence is None:
+            return False
+        header_footer_text = None  # read once a band-based field is reached
+        for field, window in self.EARLY_STOP_FIELDS:
+            # The scorers' own checks (title length, author name shape, year
+            # range) apply: a bare pattern hit such as "20" is no answer
+            text = content[:window]
+            if field == 'year':
+                _, confidence = self._score_year(text)
+            elif field in ('title', 'authors'):
+                score = self._score_title if field == 'title' else self._score_authors
+                _, confidence = score(text, text.split('\n'))
+            elif field == 'pages':
+                _, confidence = self._score_pages(text)
+            else:
+                if header_footer_text is None:
+                    header_footer_text = self._header_footer_text(doc)
+                if field == 'journal':
+                    _, confidence = self._score_journal(header_footer_text, text)
+                else:
+                    _, confidence = self._score_numbering(field, header_footer_text, text)
+            if confidence < self.early_stop_confidence:
+                return False
+        return True
+    
+    def _header_footer_text(self, doc: Optional[PDFDocument]) -> str:
+        """Header/footer bands of doc's sampled pages as one text ('' without doc)"""
+        if doc is None:
+            return ""
         try:
-            # Try pdfplumber first (better text extraction)
-            with pdfplumber.open(pdf_path) as pdf:
-                for i, page in enumerate(pdf.pages[:max_pages]):
-                    text += page.extract_text() or ""
-                    if i < len(pdf.pages) - 1:
-                        text += "\n\n"
+            with doc.timings.stage('headers_footers'):
+                hf_data = self._extract_headers_footers(doc)
+            return '\n'.join(hf_data['headers'] + hf_data['footers'])
         except Exception as e:
-            logger.warning(f"pdfplumber failed, trying PyPDF2: {e}")
-            
-            # Fallback to PyPDF2
-            try:
-                with open(pdf_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    for i in range(min(max_pages, len(pdf_reader.pages))):
-                        text += pdf_reader.pages[i].extract_text() or ""
-            except Exception as e2:
-                logger.error(f"Text extraction failed: {e2}")
-        
-        return text.strip()
+            logger.warning(f"Could not extract headers/footers: {e}")
+            return ""
     
-    def _enhance_metadata(self, metadata: Dict, content: str, pdf_path: str = None) -> Dict:
-        """Extract additional metadata from content using patterns"""
+    def _enhance_metadata(self, metadata: Dict, content: str, doc: PDFDocument = None,
+                          scores: Dict[str, float] = None) -> Dict:
+        """Extract additional metadata from content using patterns
+        
+        If scores is given, the confidence (0-1) of every field set here is
+        recorded in it.
+        """
+        if scores is None:
+            scores = {}
         
         # Clean content for better matching
         content_lines = content.split('\n')
         
         # Extract headers/footers for journal, volume, issue detection
-        header_footer_text = ""
-        if pdf_path:
-            try:
-                hf_data = self._extract_headers_footers(pdf_path)
-                header_footer_text = '\n'.join(hf_data['headers'] + hf_data['footers'])
-            except Exception as e:
-                logger.warning(f"Could not extract headers/footers: {e}")
+        header_footer_text = self._header_footer_text(doc)
         
         # Extract journal name from headers/footers (most reliable)
         if not metadata.get('journal') or metadata.get('journal') == '':
-            journal = self._extract_journal(header_footer_text, content)
+            journal, scores['journal'] = self._score_journal(header_footer_text, content)
             if journal:
                 metadata['journal'] = journal
         
         # Extract title if not present
         if not metadata.get('title') or metadata.get('title') == '':
-            title = self._extract_title(content, content_lines)
+            title, scores['title'] = self._score_title(content, content_lines)
             if title:
                 metadata['title'] = title
         
         # Extract authors if not present
         if not metadata.get('authors') or metadata.get('authors') == '':
-            authors = self._extract_authors(content, content_lines)
+            authors, scores['authors'] = self._score_authors(content, content_lines)
             if authors:
                 metadata['authors'] = authors
         
         # Extract year from content (always prefer content over PDF metadata)
-        year = self._extract_year(content)
+        year, confidence = self._score_year(content)
         if year:
             metadata['year'] = year
+            scores['year'] = confidence
         elif not metadata.get('year') or metadata.get('year') == '':
             # Only use PDF metadata year as last resort
             pass
         
-        # Extract volume from headers/footers first, then content
-        if not metadata.get('volume') or metadata.get('volume') == '':
-            # Try headers/footers first (more reliable for periodicals)
-            for pattern in self.metadata_patterns['volume']:
-                match = re.search(pattern, header_footer_text, re.IGNORECASE)
-                if match:
-                    metadata['volume'] = match.group(1)
-                    break
-            # Fallback to content
-            if not metadata.get('volume'):
-                for pattern in self.metadata_patterns['volume']:
-                    match = re.search(pattern, content[:2000], re.IGNORECASE)
-                    if match:
-                        metadata['volume'] = match.group(1)
-                        break
-        
-        # Extract issue from headers/footers first, then content
-        if not metadata.get('issue') or metadata.get('issue') == '':
-            # Try headers/footers first (more reliable for periodicals)
-            for pattern in self.metadata_patterns['issue']:
-                match = re.search(pattern, header_footer_text, re.IGNORECASE)
-                if match:
-                    metadata['issue'] = match.group(1)
-                    break
-            # Fallback to content
-            if not metadata.get('issue'):
-                for pattern in self.metadata_patterns['issue']:
-                    match = re.search(pattern, content[:2000], re.IGNORECASE)
-                    if match:
-                        metadata['issue'] = match.group(1)
-                        break
+        # Extract volume and issue
+        for field in ('volume', 'issue'):
+            if not metadata.get(field) or metadata.get(field) == '':
+                value, confidence = self._score_numbering(field, header_footer_text, content)
+                if value:
+                    metadata[field] = value
+                    scores[field] = confidence
         
         # Extract page range
         if not metadata.get('pages') or metadata.get('pages') == '':
-            for pattern in self.metadata_patterns['pages']:
-                match = re.search(pattern, content[:2000], re.IGNORECASE)
-                if match:
-                    if len(match.groups()) >= 2:
-                        metadata['pages'] = f"{match.group(1)}-{match.group(2)}"
-                    break
+            pages, confidence = self._score_pages(content)
+            if pages:
+                metadata['pages'] = pages
+                scores['pages'] = confidence
+        
+        # Only fields that were actually found keep a score
+        for field in [field for field, score in scores.items() if not score]:
+            del scores[field]
         
         return metadata
     
     def _extract_title(self, content: str, lines: List[str]) -> Optional[str]:
         """Enhanced title extraction"""
+        return self._score_title(content, lines)[0]
+    
+    def _score_title(self, content: str, lines: List[str]) -> Tuple[Optional[str], float]:
+        """Title and its confidence"""
         # Try each pattern
-        for pattern in self.metadata_patterns['title']:
-            match = re.search(pattern, content[:1500], re.MULTILINE)
-            if match:
-                title = match.group(1).strip()
-                # Validate title (not too short, not too long, not all caps unless reasonable)
-                if 10 <= len(title) <= 300:
-                    # Clean up title
-                    title = re.sub(r'\s+', ' ', title)  # Normalize whitespace
-                    title = title.strip('.,;:')
-                    return title
+        for candidate in self.pattern_engine.candidates('title', content[:1500], re.MULTILINE):
+            title = candidate.value.strip()
+            # Validate title (not too short, not too long, not all caps unless reasonable)
+            if 10 <= len(title) <= 300:
+                # Clean up title
+                title = WHITESPACE_RE.sub(' ', title)  # Normalize whitespace
+                title = title.strip('.,;:')
+                return title, self.pattern_engine.confidence(candidate)
         
         # Fallback: First substantial line that looks like a title
         for i, line in enumerate(lines[:10]):
@@ -545,27 +2108,32 @@ class PDFExtractor:
             # Skip very short lines, page numbers, headers
             if len(line) < 10 or len(line) > 300:
                 continue
-            if re.match(r'^\d+$', line):  # Skip page numbers
+            if PAGE_NUMBER_RE.match(line):  # Skip page numbers
                 continue
             if line.lower() in ['abstract', 'introduction', 'keywords']:
                 continue
             # Check if it looks like a title
-            if re.match(r'^[A-Z]', line) and not line.endswith(':'):
-                return line
+            if CAPITALIZED_RE.match(line) and not line.endswith(':'):
+                return line, HEURISTIC_CONFIDENCE
         
-        return None
+        return None, 0.0
     
     def _extract_authors(self, content: str, lines: List[str]) -> Optional[str]:
         """Enhanced author extraction"""
+        return self._score_authors(content, lines)[0]
+    
+    def _score_authors(self, content: str, lines: List[str]) -> Tuple[Optional[str], float]:
+        """Authors and their confidence"""
         # Try explicit author patterns first
-        for pattern in self.metadata_patterns['author'][:3]:
-            match = re.search(pattern, content[:2000], re.MULTILINE | re.IGNORECASE)
-            if match:
-                authors = match.group(1).strip()
-                # Clean up
-                authors = re.sub(r'\s+', ' ', authors)
-                if len(authors) > 3 and len(authors) < 500:
-                    return authors
+        for candidate in self.pattern_engine.candidates('author', content[:2000],
+                                                        re.MULTILINE | re.IGNORECASE, limit=3):
+            authors = candidate.value.strip()
+            # Clean up
+            authors = WHITESPACE_RE.sub(' ', authors)
+            # Only an "Author:" label is taken as is; "By ..." and the name
+            # shapes also match ordinary prose case-insensitively
+            if len(authors) > 3 and len(authors) < 500 and (candidate.priority == 0 or plausible_authors(authors)):
+                return authors, self.pattern_engine.confidence(candidate)
         
         # Look for author-like patterns in first 20 lines
         potential_authors = []
@@ -577,7 +2145,7 @@ class PDFExtractor:
             
             # Check for name patterns
             # Pattern: First Last, First Last
-            if re.search(r'[A-Z][a-z]+\s+[A-Z][a-z]+', line):
+            if NAME_RE.search(line):
                 # Check if line has email or affiliation indicators
                 next_lines = ' '.join(lines[i:i+3]).lower()
                 if any(indicator in next_lines for indicator in ['@', 'university', 'department', 'institute', 'college']):
@@ -585,9 +2153,9 @@ class PDFExtractor:
                     break
         
         if potential_authors:
-            return potential_authors[0][:200]  # Limit length
+            return potential_authors[0][:200], HEURISTIC_CONFIDENCE  # Limit length
         
-        return None
+        return None, 0.0
     
     def _chinese_year_to_arabic(self, chinese_year: str) -> Optional[str]:
         """Convert Chinese traditional year format to Arabic numerals"""
@@ -605,47 +2173,24 @@ class PDFExtractor:
         return None
     
     def _extract_year(self, content: str) -> Optional[str]:
-        """Enhanced year extraction with validation"""
+        """Enhanced year extraction with validation
+        
+        Years in the first 500 chars (header area) win; the first 3000 chars
+        are only scanned when the header area has none.
+        """
+        return self._score_year(content)[0]
+    
+    def _score_year(self, content: str) -> Tuple[Optional[str], float]:
+        """Year and its confidence (higher when found in the header area)"""
         import datetime
         current_year = datetime.datetime.now().year
         
-        # Try to find year in first 500 chars (header area) first
-        early_years = []
-        for pattern in self.metadata_patterns['year']:
-            matches = re.findall(pattern, content[:500], re.IGNORECASE)
-            for match in matches:
-                year_str = match if isinstance(match, str) else match[0]
-                
-                # Check if it's Chinese traditional format
-                if re.match(r'[二三四五六七八九○〇零一]{4}', year_str):
-                    arabic_year = self._chinese_year_to_arabic(year_str)
-                    if arabic_year:
-                        year_str = arabic_year
-                
-                # Validate year is reasonable
-                try:
-                    year = int(year_str)
-                    if 1900 <= year <= current_year + 1:
-                        early_years.append(year_str)
-                except ValueError:
-                    continue
-        
-        # If found in header, return the most recent one from header
-        if early_years:
-            valid_years = [y for y in early_years if int(y) <= current_year]
-            if valid_years:
-                return max(valid_years)
-            return max(early_years)
-        
-        # Fallback: search in full content (first 3000 chars)
-        all_years = []
-        for pattern in self.metadata_patterns['year']:
-            matches = re.findall(pattern, content[:3000], re.IGNORECASE)
-            for match in matches:
-                year_str = match if isinstance(match, str) else match[0]
+        for window, matches in self.pattern_engine.scan_widening('year', content, re.IGNORECASE, (500, 3000)):
+            years = []
+            for year_str in matches:
                 
                 # Check if it's Chinese traditional format
-                if re.match(r'[二三四五六七八九○〇零一]{4}', year_str):
+                if CHINESE_YEAR_RE.match(year_str):
                     arabic_year = self._chinese_year_to_arabic(year_str)
                     if arabic_year:
                         year_str = arabic_year
@@ -654,294 +2199,454 @@ class PDFExtractor:
                 try:
                     year = int(year_str)
                     if 1900 <= year <= current_year + 1:
-                        all_years.append(year_str)
+                        years.append(year_str)
                 except ValueError:
                     continue
-        
-        if all_years:
-            valid_years = [y for y in all_years if int(y) <= current_year]
-            if valid_years:
-                return max(valid_years)
-            return max(all_years)
-        
-        return None
+            
+            # Return the most recent one from the narrowest window with a match
+            if years:
+                confidence = HEADER_YEAR_CONFIDENCE if window <= 500 else BODY_YEAR_CONFIDENCE
+                valid_years = [y for y in years if int(y) <= current_year]
+                if valid_years:
+                    return max(valid_years), confidence
+                return max(years), confidence
+        
+        return None, 0.0
     
     def _extract_journal(self, header_footer_text: str, content: str) -> Optional[str]:
         """Extract journal/periodical name from headers/footers"""
-        # Try headers/footers first (most reliable for consistent periodical names)
-        if header_footer_text:
-            for pattern in self.metadata_patterns['journal']:
-                match = re.search(pattern, header_footer_text, re.MULTILINE)
-                if match:
-                    journal = match.group(1).strip()
-                    # Clean up whitespace
-                    journal = re.sub(r'\s+', ' ', journal)
-                    # Validate length (relaxed for Chinese journals)
-                    if 3 <= len(journal) <= 100:
-                        return journal
-        
-        # Fallback to content (first 500 chars for better accuracy)
-        for pattern in self.metadata_patterns['journal']:
-            match = re.search(pattern, content[:500], re.MULTILINE)
-            if match:
-                journal = match.group(1).strip()
-                journal = re.sub(r'\s+', ' ', journal)
-                # Relaxed validation for Chinese journals (can be shorter)
+        return self._score_journal(header_footer_text, content)[0]
+    
+    def _score_journal(self, header_footer_text: str, content: str) -> Tuple[Optional[str], float]:
+        """Journal name and its confidence"""
+        # Try headers/footers first (most reliable for consistent periodical
+        # names), then content (first 500 chars for better accuracy)
+        for text, weight in ((header_footer_text, 1.0), (content[:500], CONTENT_MATCH_WEIGHT)):
+            for candidate in self.pattern_engine.candidates('journal', text, re.MULTILINE):
+                journal = candidate.value.strip()
+                # Clean up whitespace
+                journal = WHITESPACE_RE.sub(' ', journal)
+                # Validate length (relaxed for Chinese journals)
                 if 3 <= len(journal) <= 100:
-                    return journal
+                    return journal, weight * self.pattern_engine.confidence(candidate)
         
-        return None
+        return None, 0.0
     
-    def _extract_with_vision(self, pdf_path: str) -> Dict[str, str]:
+    def _score_numbering(self, field: str, header_footer_text: str, content: str) -> Tuple[Optional[str], float]:
+        """Volume or issue and its confidence"""
+        # Headers/footers first (more reliable for periodicals), then content
+        candidate = self.pattern_engine.first(field, header_footer_text, re.IGNORECASE)
+        if candidate:
+            return candidate.value, self.pattern_engine.confidence(candidate)
+        candidate = self.pattern_engine.first(field, content[:2000], re.IGNORECASE)
+        if candidate:
+            return candidate.value, CONTENT_MATCH_WEIGHT * self.pattern_engine.confidence(candidate)
+        return None, 0.0
+    
+    def _score_pages(self, content: str) -> Tuple[Optional[str], float]:
+        """Page range and its confidence"""
+        candidate = self.pattern_engine.first('pages', content[:2000], re.IGNORECASE)
+        if candidate and len(candidate.groups) >= 2:
+            return (f"{candidate.groups[0]}-{candidate.groups[1]}",
+                    CONTENT_MATCH_WEIGHT * self.pattern_engine.confidence(candidate))
+        return None, 0.0
+    
+    def _extract_with_vision(self, doc: PDFDocument) -> Dict[str, str]:
         """Extract metadata using GPT-4 Vision (optimized for speed)"""
-        if not self.client or not VISION_AVAILABLE:
-            return {}
+        return self._extract_with_vision_batch([(doc, 0, '')])[0]
+    
+    def _extract_with_vision_batch(self, items: List[Tuple[PDFDocument, int, str]]) -> List[Dict[str, str]]:
+        """Vision metadata for several pages, packing up to vision_batch_size
+        images into each request
         
-        # Check vision cache first
-        vision_cache = self._get_vision_cache(pdf_path)
-        if vision_cache:
-            logger.info(f"Using cached vision results for {os.path.basename(pdf_path)}")
-            return vision_cache
+        Args:
+            items: (doc, page_num, cache_suffix) per page; the suffix tells
+                multi-paper sections of one file apart in the vision cache
         
-        try:
-            # Convert first page of PDF to image (optimized: smaller size, lower quality)
-            image_data = self._pdf_page_to_image(pdf_path, page_num=0, dpi=150, quality=75)
-            if not image_data:
-                return {}
-            
-            # Prepare the prompt
-            prompt = """Analyze this academic paper's first page and extract the following metadata:
-
-1. Title: The main title of the paper (Chinese or English)
-2. Authors: All author names (comma-separated, Chinese or English)
-3. Year: Publication year (look for formats like 2009, 2009年, or 二○○九年)
-4. Journal: Journal or periodical name
-   - For Chinese journals, look for 《journal name》 format (e.g., 《二十一世紀》)
-   - Extract ONLY the text between 《 and 》, do NOT include 網絡版, 網路版, or other suffixes
-   - Also check headers/footers for consistent journal names
-5. Volume: Journal volume number (look for 卷, Vol, Volume)
-6. Issue: Journal issue number (look for 期, 總第X期, 第X期, No., Issue)
-7. Pages: Page range (e.g., "123-145" or "71-79")
-
-IMPORTANT for Chinese journals:
-- If you see 《二十一世紀》網絡版, extract journal as "二十一世紀" (NOT "二十一世紀網絡版")
-- If you see 總第84期, extract issue as "84"
-- If you see 第12期, extract issue as "12"
-
-Return ONLY a JSON object with these exact keys: title, authors, year, journal, volume, issue, pages
-If any field is not found, use "Unknown" for text fields or "N/A" for numeric fields.
-
-Example format:
-{
-  "title": "Machine Learning in Healthcare",
-  "authors": "John Doe, Jane Smith",
-  "year": "2024",
-  "journal": "Journal of AI Research",
-  "volume": "15",
-  "issue": "3",
-  "pages": "123-145"
-}"""
-            
-            # Call GPT-4 Vision (optimized settings)
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",  # Faster and cheaper than gpt-4-vision-preview
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_data}",
-                                    "detail": "low"  # Low detail mode = faster + cheaper
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=300,  # Reduced from 500 (faster response)
-                temperature=0.0  # Deterministic (slightly faster)
-            )
-            
-            # Parse response
-            result_text = response.choices[0].message.content.strip()
-            
-            # Extract JSON from response (might have markdown code blocks)
-            import json
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0].strip()
+        Returns:
+            One metadata dict per item ({} where vision found nothing)
+        
+        Without an API client only cached answers are returned.
+        """
+        results = [{} for _ in items]
+        if not self.use_vision:
+            return results
+        
+        for group in self._vision_groups(self._vision_pending(items, results)):
+            request_start = time.perf_counter()
+            try:
+                metadatas = self._vision_request([image_data for _, image_data in group])
+            except Exception as e:
+                logger.error(f"Vision extraction error: {e}")
+                if len(group) == 1:
+                    metadatas = [{}]
+                else:
+                    # A malformed batch answer should not cost every document its
+                    # vision result; retry the group one image at a time
+                    metadatas = []
+                    for _, image_data in group:
+                        try:
+                            metadatas.extend(self._vision_request([image_data]))
+                        except Exception as e:
+                            logger.error(f"Vision extraction error: {e}")
+                            metadatas.append({})
+            self._store_vision_answers(items, group, metadatas, results, time.perf_counter() - request_start)
+        
+        return results
+    
+    def _vision_pending(self, items: List[Tuple[PDFDocument, int, str]], results: List[Dict]) -> List[Tuple[int, str]]:
+        """Fill results from the vision cache; (item index, image) for the rest"""
+        pending = []
+        for i, (doc, page_num, suffix) in enumerate(items):
+            # Check vision cache first
+            with doc.timings.stage('cache'):
+                vision_cache = self._get_vision_cache(doc.pdf_path, suffix)
+            if vision_cache:
+                doc.timings.count('vision_cache_hits')
+                logger.info(f"Using cached vision results for {os.path.basename(doc.pdf_path)}{suffix}")
+                results[i] = vision_cache
+                continue
+            if not self.client:
+                continue
             
-            metadata = json.loads(result_text)
+            # Convert page to image (optimized: smaller size, lower quality)
+            image_data = self._pdf_page_to_image(doc, page_num=page_num, dpi=150, quality=75)
+            if image_data:
+                pending.append((i, image_data))
+        return pending
+    
+    def _vision_groups(self, pending: List[Tuple[int, str]]) -> List[List[Tuple[int, str]]]:
+        batch_size = max(1, self.vision_batch_size)
+        return [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+    
+    def _store_vision_answers(self, items: List[Tuple[PDFDocument, int, str]], group: List[Tuple[int, str]],
+                              metadatas: List[Dict], results: List[Dict], elapsed: float):
+        """Record one request's answers (results, vision cache, timings)"""
+        # Every document in the request waited for the whole request
+        for doc in {id(items[i][0]): items[i][0] for i, _ in group}.values():
+            doc.timings.add('vision_api', elapsed)
+            doc.timings.count('vision_calls')
+        
+        for (i, _), metadata in zip(group, metadatas):
+            if not metadata:
+                continue
+            doc, _, suffix = items[i]
             logger.info(f"Vision extracted: {metadata}")
-            
-            # Save to vision cache
-            self._save_vision_cache(pdf_path, metadata)
-            
-            return metadata
-            
-        except Exception as e:
-            logger.error(f"Vision extraction error: {e}")
-            return {}
+            results[i] = metadata
+            # Save to vision cache, per document as before
+            self._save_vision_cache(doc.pdf_path, metadata, suffix)
+    
+    def _vision_request(self, images: List[str]) -> List[Dict[str, str]]:
+        """One chat completion over one or more base64 JPEG page images"""
+        response = self.client.chat.completions.create(**self._vision_payload(images))
+        return self._parse_vision_response(response, len(images))
+    
+    def _vision_payload(self, images: List[str]) -> Dict:
+        """Chat completion arguments for one or more page images"""
+        if len(images) == 1:
+            content = [{"type": "text", "text": VISION_PROMPT}]
+        else:
+            content = [{"type": "text", "text": VISION_BATCH_PROMPT.format(count=len(images))}]
+        
+        for index, image_data in enumerate(images, 1):
+            if len(images) > 1:
+                content.append({"type": "text", "text": f"Image {index}:"})
+            content.append({
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:image/jpeg;base64,{image_data}",
+                    "detail": "low"  # Low detail mode = faster + cheaper
+                }
+            })
+        
+        # GPT-4 Vision (optimized settings)
+        return {
+            'model': VISION_MODEL,
+            'messages': [{"role": "user", "content": content}],
+            'max_tokens': VISION_TOKENS_PER_IMAGE * len(images),
+            'temperature': 0.0  # Deterministic (slightly faster)
+        }
+    
+    @staticmethod
+    def _parse_vision_response(response, count: int) -> List[Dict[str, str]]:
+        """One metadata dict per image from a chat completion"""
+        result_text = response.choices[0].message.content.strip()
+        
+        # Extract JSON from response (might have markdown code blocks)
+        if "```json" in result_text:
+            result_text = result_text.split("```json")[1].split("```")[0].strip()
+        elif "```" in result_text:
+            result_text = result_text.split("```")[1].split("```")[0].strip()
+        
+        parsed = json.loads(result_text)
+        if count == 1:
+            return [parsed[0] if isinstance(parsed, list) and parsed else parsed]
+        
+        if not isinstance(parsed, list):
+            raise ValueError(f"Expected a JSON array for {count} images")
+        # Map answers back by their image index, falling back to position
+        metadatas = [{} for _ in range(count)]
+        for position, item in enumerate(parsed):
+            if not isinstance(item, dict):
+                continue
+            item = dict(item)
+            try:
+                index = int(item.pop('index', position + 1)) - 1
+            except (TypeError, ValueError):
+                index = position
+            if 0 <= index < count:
+                metadatas[index] = item
+        return metadatas
     
-    def _pdf_page_to_image(self, pdf_path: str, page_num: int = 0, dpi: int = 150, quality: int = 75) -> Optional[str]:
+    def _pdf_page_to_image(self, doc: PDFDocument, page_num: int = 0, dpi: int = 150, quality: int = 75) -> Optional[str]:
         """Convert PDF page to base64-encoded image (optimized for speed)
         
+        Renders are memoized on the document session.
+        
         Args:
-            pdf_path: Path to PDF file
+            doc: Open document session
             page_num: Page number to convert (0-indexed)
             dpi: DPI for image conversion (default: 150, lower = faster)
             quality: JPEG quality 0-100 (default: 75, lower = faster)
         """
+        render_key = (page_num, dpi, quality, self.vision_grayscale)
+        if render_key not in doc._images:
+            with doc.timings.stage('render'):
+                doc._images[render_key] = self._render_page_image(doc, page_num, dpi, quality, self.vision_grayscale)
+            doc.timings.count('images_rendered')
+        return doc._images[render_key]
+    
+    def _render_page_image(self, doc: PDFDocument, page_num: int, dpi: int, quality: int,
+                           grayscale: bool = False) -> Optional[str]:
+        """Render a PDF page to a base64-encoded JPEG, at most VISION_MAX_SIZE px"""
         try:
+            if PYMUPDF_AVAILABLE:
+                # In-process render straight at the target size: no poppler
+                # subprocess, temp files or second resampling pass
+                page = doc.fitz_doc[page_num]
+                zoom = dpi / 72
+                longest = max(page.rect.width, page.rect.height) * zoom
+                if longest > VISION_MAX_SIZE:
+                    zoom *= VISION_MAX_SIZE / longest
+                pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom),
+                                      colorspace=fitz.csGRAY if grayscale else fitz.csRGB,
+                                      alpha=False)
+                return base64.b64encode(pix.tobytes("jpeg", jpg_quality=quality)).decode()
+            
             if PDF2IMAGE_AVAILABLE:
-                # Use pdf2image (optimized settings)
-                images = convert_from_path(
-                    pdf_path,
-                    first_page=page_num + 1,
-                    last_page=page_num + 1,
-                    dpi=dpi  # Lower DPI = faster conversion
-                )
+                # Fallback: pdf2image (poppler)
+                options = dict(first_page=page_num + 1, last_page=page_num + 1,
+                               dpi=dpi,  # Lower DPI = faster conversion
+                               grayscale=grayscale)
+                if doc.data is not None:
+                    images = convert_from_bytes(doc.data, **options)
+                else:
+                    images = convert_from_path(doc.pdf_path, **options)
                 if images:
                     img = images[0]
-                    # Resize to smaller size for faster upload (max 1536px for low detail)
-                    max_size = 1536  # Reduced from 2048
-                    if img.width > max_size or img.height > max_size:
-                        ratio = min(max_size / img.width, max_size / img.height)
+                    # Resize to smaller size for faster upload
+                    if img.width > VISION_MAX_SIZE or img.height > VISION_MAX_SIZE:
+                        ratio = min(VISION_MAX_SIZE / img.width, VISION_MAX_SIZE / img.height)
                         new_size = (int(img.width * ratio), int(img.height * ratio))
                         img = img.resize(new_size, Image.Resampling.BILINEAR)  # BILINEAR faster than LANCZOS
                     
                     # Convert to base64 with lower quality
                     buffered = io.BytesIO()
                     img.save(buffered, format="JPEG", quality=quality, optimize=False)  # optimize=False = faster
-                    img_str = base64.b64encode(buffered.getvalue()).decode()
-                    return img_str
-            else:
-                # Fallback: Use PyMuPDF if available
-                try:
-                    import fitz  # PyMuPDF
-                    doc = fitz.open(pdf_path)
-                    page = doc[page_num]
-                    # Render page to image
-                    pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x zoom
-                    img_data = pix.tobytes("jpeg")
-                    img_str = base64.b64encode(img_data).decode()
-                    doc.close()
-                    return img_str
-                except ImportError:
-                    logger.warning("Neither pdf2image nor PyMuPDF available for image conversion")
-                    return None
+                    return base64.b64encode(buffered.getvalue()).decode()
+                return None
+            
+            logger.warning("Neither PyMuPDF nor pdf2image available for image conversion")
+            return None
                     
         except Exception as e:
             logger.error(f"Error converting PDF to image: {e}")
             return None
     
-    def detect_multiple_papers(self, pdf_path: str) -> List[Dict]:
-        """Detect if PDF contains multiple papers and split them"""
-        try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                total_pages = len(pdf_reader.pages)
-            
-            # Extract full text to analyze structure
-            full_text = self._extract_full_text(pdf_path)
-            
-            # Detect paper boundaries
-            paper_boundaries = self._find_paper_boundaries(full_text, total_pages)
-            
-            if len(paper_boundaries) <= 1:
-                # Single paper - process normally
-                logger.info(f"{pdf_path}: Single paper detected")
+    def detect_multiple_papers(self, pdf_path: str, data=None) -> List[Dict]:
+        """Detect if PDF contains multiple papers and split them
+        
+        The split (one result per paper) is cached by content hash, so an
+        unchanged file skips the full-text pass entirely. data is the PDF
+        itself if already in memory (see extract_from_pdf).
+        """
+        with self._in_memory(pdf_path, data):
+            timings = self._new_timings()
+            cached = self._cache_lookup(timings, self._get_cached_papers, pdf_path)
+            if cached:
+                return self._with_timings(cached, timings)
+            try:
+                with self._open_document(pdf_path, timings) as doc:
+                    papers = self._detect_papers_in_document(doc)
+                with timings.stage('cache'):
+                    self._save_papers(pdf_path, papers)
+                return self._with_timings(papers, timings)
+            except SplitRequest:
+                raise
+            except BudgetExceeded as e:
+                # Page ranges failed in the workers; not re-read here
+                logger.error(f"Error detecting multiple papers in {pdf_path}: {e}")
+                return self._error_result(pdf_path, e, 'detect')
+            except Exception as e:
+                logger.error(f"Error detecting multiple papers in {pdf_path}: {e}")
+                # Fallback to single paper
                 return [self.extract_from_pdf(pdf_path)]
+    
+    def _detect_papers_in_document(self, doc: PDFDocument, paper_boundaries: List[Dict] = None,
+                                   tiers: List[Dict] = None, vision: List[Optional[Dict]] = None) -> List[Dict]:
+        """Split an open document into papers, reusing its parsed pages
+        
+        paper_boundaries, tiers (see _document_tiers) and vision (one answer
+        or None per paper) are passed in when a batch has already computed them.
+        """
+        pdf_path = doc.pdf_path
+        
+        # Detect paper boundaries (pages stay memoized for the sections)
+        if paper_boundaries is None:
+            paper_boundaries = self._scan_paper_boundaries(doc)
+        
+        if len(paper_boundaries) <= 1:
+            # Single paper - process normally
+            logger.info(f"{pdf_path}: Single paper detected")
+            cached = self._cache_lookup(doc.timings, self._get_cached_metadata, pdf_path)
+            return [cached or self._extract_from_document(doc, vision_metadata=vision[0] if vision else None,
+                                                          tier=tiers[0] if tiers else None)]
+        
+        # Multiple papers detected
+        logger.info(f"{pdf_path}: {len(paper_boundaries)} papers detected")
+        pages = self._extract_all_pages(doc)
+        papers = []
+        
+        if tiers is None:
+            tiers = self._document_tiers(doc, paper_boundaries)
+        if vision is None:
+            # Start pages of the sections that need vision, in shared requests
+            vision = [None] * len(tiers)
+            wanted = self._vision_items(doc, paper_boundaries, tiers)
+            answers = self._extract_with_vision_batch([item for _, item in wanted])
+            for (index, _), answer in zip(wanted, answers):
+                vision[index] = answer
+        
+        for i, boundary in enumerate(paper_boundaries, 1):
+            start_page = boundary['start_page']
+            end_page = boundary['end_page']
             
-            # Multiple papers detected
-            logger.info(f"{pdf_path}: {len(paper_boundaries)} papers detected")
-            papers = []
-            
-            for i, boundary in enumerate(paper_boundaries, 1):
-                start_page = boundary['start_page']
-                end_page = boundary['end_page']
-                
-                # Extract metadata for this paper section
-                paper_data = self._extract_paper_section(
-                    pdf_path, 
-                    start_page, 
-                    end_page,
-                    paper_number=i,
-                    total_papers=len(paper_boundaries)
-                )
-                papers.append(paper_data)
-            
-            return papers
-            
-        except Exception as e:
-            logger.error(f"Error detecting multiple papers in {pdf_path}: {e}")
-            # Fallback to single paper
-            return [self.extract_from_pdf(pdf_path)]
+            # Extract metadata for this paper section
+            paper_data = self._extract_paper_section(
+                pdf_path,
+                pages,
+                start_page, 
+                end_page,
+                paper_number=i,
+                total_papers=len(paper_boundaries),
+                tier=tiers[i - 1],
+                vision_metadata=vision[i - 1]
+            )
+            papers.append(paper_data)
+        
+        return papers
     
-    def _extract_full_text(self, pdf_path: str) -> str:
-        """Extract all text from PDF for analysis"""
-        text = ""
+    def _extract_all_pages(self, doc: PDFDocument) -> List[str]:
+        """Text of every page, extracted once, for structure analysis"""
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    text += page.extract_text() or ""
-                    text += "\n\n--- PAGE BREAK ---\n\n"
+            return doc.page_texts()
         except Exception as e:
             logger.warning(f"Full text extraction failed: {e}")
-        return text
+            return []
     
-    def _find_paper_boundaries(self, full_text: str, total_pages: int) -> List[Dict]:
-        """Find boundaries between multiple papers in the text"""
-        boundaries = []
-        
-        # Split by page breaks
-        pages = full_text.split("--- PAGE BREAK ---")
-        
-        # Patterns that indicate a new paper starting
-        new_paper_patterns = [
-            r'^[A-Z][A-Za-z\s:]{10,100}$',  # Title-like line (all caps or title case)
-            r'^\s*Abstract[\s:]*',  # Abstract section
-            r'^\s*ABSTRACT[\s:]*',
-            r'^\s*Introduction[\s:]*',  # Introduction section
-            r'^\s*INTRODUCTION[\s:]*',
-            r'^\s*1\.?\s+Introduction',  # Numbered introduction
-            r'^\s*I\.?\s+INTRODUCTION',
-            r'^\s*Keywords?[\s:]*',  # Keywords
-            r'^\s*KEYWORDS?[\s:]*',
-        ]
-        
-        current_paper_start = 0
-        potential_starts = []
+    def _scan_paper_boundaries(self, doc: PDFDocument) -> List[Dict]:
+        """Paper boundaries from one pass over the document's pages
         
-        for page_num, page_text in enumerate(pages):
-            lines = page_text.strip().split('\n')
-            
-            # Check first few lines of each page
-            for line_num, line in enumerate(lines[:10]):
-                line = line.strip()
-                
-                # Skip very short lines
-                if len(line) < 10:
-                    continue
-                
-                # Check if line matches new paper pattern
-                for pattern in new_paper_patterns:
-                    if re.match(pattern, line, re.MULTILINE):
-                        # Check if this looks like a genuine new paper start
-                        # (not just a section in the middle of a paper)
-                        if self._is_likely_paper_start(lines, line_num, page_num):
-                            potential_starts.append({
-                                'page': page_num,
-                                'line': line,
-                                'confidence': self._calculate_start_confidence(lines, line_num)
-                            })
-                        break
-        
-        # Filter and consolidate potential starts
-        if not potential_starts:
+        Pages are read one at a time; only each page's paper-start candidate
+        is kept for the boundary decision.
+        """
+        if doc.route in REJECTED_ROUTES:
+            # Nothing readable to split on
+            return self._find_paper_boundaries([], doc.page_count)
+        if self._parallel_pages(doc):
+            self._extract_pages_parallel(doc)
+        with doc.timings.stage('boundaries'):
+            try:
+                return self._find_paper_boundaries(doc.iter_page_texts(), doc.page_count)
+            except Exception as e:
+                logger.warning(f"Full text extraction failed: {e}")
+                return self._find_paper_boundaries([], doc.page_count)
+    
+    def _parallel_pages(self, doc: PDFDocument) -> bool:
+        """Whether doc's full-text pass should be split over worker processes
+        
+        In a batch worker (which cannot start workers of its own) a document
+        to split raises SplitRequest instead, with the worker's preflight
+        verdict and the pages still missing.
+        """
+        if not self.parallel_page_threshold or doc.page_count < self.parallel_page_threshold:
+            return False
+        if self._hand_back_pages:
+            missing = doc.missing_pages()
+            if len(missing) >= self.parallel_page_threshold:
+                raise SplitRequest(doc.pdf_path, doc.preflight, missing)
+            return False
+        return multiprocessing.parent_process() is None
+    
+    def _extract_pages_parallel(self, doc: PDFDocument):
+        """Extract doc's missing pages as page ranges in the worker processes
+        
+        Uses the process pool of process-mode batches (started with one worker
+        per core if there is none).
+        """
+        missing = doc.missing_pages()
+        if len(missing) < self.parallel_page_threshold:
+            return
+        with self._pool_lock:
+            pool = self._process_pool
+        if pool is None:
+            pool = self._get_process_pool(self.parallel_workers or os.cpu_count() or 1)
+        with doc.timings.stage('parallel_parse'):
+            doc.add_page_texts(self._parse_page_ranges(pool, doc.pdf_path, doc.data, doc.preflight, missing))
+        doc.timings.count('pages_parsed_parallel', len(missing))
+    
+    def _parse_page_ranges(self, pool, pdf_path: str, data: Optional[bytes], preflight: Dict,
+                           pages: List[int]) -> Dict[int, str]:
+        """Texts of a document's pages, parsed as ranges in the pool's workers
+        
+        A range that fails (or runs over a doc_timeout budget) raises
+        BudgetExceeded for the whole document: its pages are not re-read
+        serially, where they would hang or fail the same way.
+        """
+        # Two ranges per worker: a slow range does not hold up the rest
+        size = max(PARALLEL_MIN_RANGE, -(-len(pages) // (max(1, self._process_pool_workers) * 2)))
+        ranges = [pages[i:i + size] for i in range(0, len(pages), size)]
+        texts = {}
+        futures = []
+        current = ranges[0]  # the range being submitted or awaited
+        try:
+            for current in ranges:
+                futures.append(pool.submit(_extract_page_range, pdf_path, data, preflight, self.text_backend,
+                                           self.memory_ceiling_mb, current))
+            for current, future in zip(ranges, futures):
+                texts.update(zip(current, future.result()))
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._reset_process_pool()
+            raise BudgetExceeded(getattr(e, 'reason', 'crashed'),
+                                 f"pages {current[0] + 1}-{current[-1] + 1} failed: {e}") from e
+        finally:
+            for future in futures:
+                future.cancel()
+        logger.info(f"{os.path.basename(pdf_path)}: {len(pages)} pages extracted in {len(ranges)} parallel ranges")
+        return texts
+    
+    def _find_paper_boundaries(self, pages: Iterable[str], total_pages: int) -> List[Dict]:
+        """Find boundaries between multiple papers from per-page text
+        
+        pages may be a list or an iterator; only the first lines of each page
+        are kept (see _page_features). Every page's best start line is scored
+        at once, then the starts become papers in one pass: a paper runs to
+        the page before the next start, and one shorter than two pages is
+        dropped.
+        """
+        starts = self._page_starts(self._page_features(pages))
+        if not starts:
             # No clear boundaries found - treat as single paper
             return [{
                 'start_page': 0,
@@ -949,28 +2654,13 @@ Example format:
                 'title': 'Unknown'
             }]
         
-        # Sort by confidence and page number
-        potential_starts.sort(key=lambda x: (x['page'], -x['confidence']))
-        
-        # Remove duplicates (multiple matches on same page)
-        filtered_starts = []
-        last_page = -1
-        for start in potential_starts:
-            if start['page'] != last_page:
-                filtered_starts.append(start)
-                last_page = start['page']
-        
-        # Create boundaries
-        for i, start in enumerate(filtered_starts):
-            end_page = filtered_starts[i + 1]['page'] - 1 if i + 1 < len(filtered_starts) else total_pages - 1
-            
-            # Only include if paper has at least 2 pages
-            if end_page - start['page'] >= 1:
-                boundaries.append({
-                    'start_page': start['page'],
-                    'end_page': end_page,
-                    'title': start['line'][:100]
-                })
+        start_pages = np.array([page_num for page_num, _ in starts])
+        end_pages = np.append(start_pages[1:] - 1, total_pages - 1)
+        boundaries = [{
+            'start_page': int(start_pages[i]),
+            'end_page': int(end_pages[i]),
+            'title': starts[i][1][:100]
+        } for i in np.flatnonzero(end_pages - start_pages >= 1)]
         
         # If we found boundaries but they don't cover the whole document, add first section
         if boundaries and boundaries[0]['start_page'] > 0:
@@ -986,61 +2676,105 @@ Example format:
             'title': 'Unknown'
         }]
     
-    def _is_likely_paper_start(self, lines: List[str], line_num: int, page_num: int) -> bool:
-        """Determine if a line is likely the start of a new paper"""
-        # First page is always a potential start
-        if page_num == 0:
-            return True
-        
-        # Check if followed by author names or abstract
-        next_lines = ' '.join(lines[line_num + 1:line_num + 5]).lower()
-        
-        indicators = [
-            'abstract', 'author', 'university', 'department',
-            'email', '@', 'keywords', 'introduction'
-        ]
-        
-        return any(indicator in next_lines for indicator in indicators)
+    def _page_features(self, pages: Iterable[str]) -> Dict:
+        """Paper-start feature matrix of a document, in one pass over its pages
+        
+        Only pages with a candidate line (MIN_START_LENGTH characters or more,
+        matching NEW_PAPER_RES, among the first START_LINES) get a row:
+            pages:   (rows,) page numbers
+            lines:   each row's first START_LINES lines, stripped
+            pattern: (rows, START_LINES) candidate lines
+            terms:   (rows, FEATURE_LINES, len(START_TERMS)) term in the
+                     lowercased line; each term is searched once over the
+                     lines of every row
+        """
+        page_nums = []
+        lines = []
+        pattern = []
+        heads = []  # FEATURE_LINES lines per row, joined
+        for page_num, page_text in enumerate(pages):
+            page_lines = page_text.strip().split('\n', FEATURE_LINES)[:FEATURE_LINES]
+            stripped = [line.strip() for line in page_lines[:START_LINES]]
+            matched = [len(line) >= MIN_START_LENGTH and NEW_PAPER_RE.match(line) is not None for line in stripped]
+            if not any(matched):
+                continue
+            page_nums.append(page_num)
+            lines.append(stripped)
+            pattern.append(matched + [False] * (START_LINES - len(matched)))
+            heads.append('\n'.join(page_lines) + '\n' * (FEATURE_LINES - len(page_lines)))
+        
+        rows = len(page_nums)
+        terms = np.zeros((rows * FEATURE_LINES, len(START_TERMS)), dtype=bool)
+        if rows:
+            text = '\n'.join(heads).lower()
+            # Line of each character position: lowercasing can change lengths, so
+            # the line starts are read off the lowercased text
+            codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+            line_starts = np.concatenate(([0], np.flatnonzero(codes == 10) + 1))
+            for index, term_re in enumerate(START_TERM_RES):
+                found = [match.start() for match in term_re.finditer(text)]
+                if found:
+                    terms[np.searchsorted(line_starts, found, side='right') - 1, index] = True
+        return {
+            'pages': np.array(page_nums, dtype=np.int64),
+            'lines': lines,
+            'pattern': np.array(pattern, dtype=bool).reshape(rows, START_LINES),
+            'terms': terms.reshape(rows, FEATURE_LINES, len(START_TERMS)),
+        }
     
-    def _calculate_start_confidence(self, lines: List[str], line_num: int) -> float:
-        """Calculate confidence that this is a paper start"""
-        confidence = 0.5
+    def _page_starts(self, features: Dict) -> List[Tuple[int, str]]:
+        """(page, line) of each page's most confident paper-start line, if any
         
-        # Check surrounding context
-        context = ' '.join(lines[max(0, line_num - 2):min(len(lines), line_num + 5)]).lower()
-        
-        # Positive indicators
-        if 'abstract' in context:
-            confidence += 0.3
-        if 'author' in context or 'university' in context:
-            confidence += 0.2
-        if 'keywords' in context:
-            confidence += 0.1
-        if '@' in context or 'email' in context:
-            confidence += 0.1
-        
-        # Negative indicators (likely just a section header)
-        if 'conclusion' in context or 'references' in context:
-            confidence -= 0.3
-        if 'section' in context or 'chapter' in context:
-            confidence -= 0.2
-        
-        return max(0.0, min(1.0, confidence))
+        A candidate line starts a paper when it sits on the first page or has
+        a LIKELY_TERMS term in the four lines after it; the first line with
+        the highest confidence wins.
+        """
+        rows = len(features['pages'])
+        if not rows:
+            return []
+        # Term counts over line windows from prefix sums along each row
+        counts = np.concatenate([np.zeros((rows, 1, len(START_TERMS)), dtype=np.int32),
+                                 np.cumsum(features['terms'], axis=1, dtype=np.int32)], axis=1)
+        line_nums = np.arange(START_LINES)
+        after = counts[:, line_nums + 5] - counts[:, line_nums + 1]  # lines line_num+1 .. line_num+4
+        context = counts[:, line_nums + 5] - counts[:, np.maximum(line_nums - 2, 0)]  # line_num-2 .. line_num+4
+        
+        likely = (after[:, :, [START_TERMS.index(term) for term in LIKELY_TERMS]] > 0).any(axis=2)
+        likely |= (features['pages'] == 0)[:, None]  # the first page is always a potential start
+        candidate = features['pattern'] & likely
+        
+        confidence = np.full((rows, START_LINES), 0.5)
+        for terms, weight in START_WEIGHTS:
+            present = (context[:, :, [START_TERMS.index(term) for term in terms]] > 0).any(axis=2)
+            confidence += weight * present
+        confidence = np.clip(confidence, 0.0, 1.0)
+        
+        best = np.where(candidate, confidence, -np.inf).argmax(axis=1)
+        return [(int(features['pages'][row]), features['lines'][row][best[row]])
+                for row in np.flatnonzero(candidate.any(axis=1))]
     
-    def _extract_paper_section(self, pdf_path: str, start_page: int, end_page: int, 
-                               paper_number: int, total_papers: int) -> Dict:
-        """Extract metadata from a specific page range"""
+    def _section_text(self, page_texts: List[str]) -> str:
+        """Join the pages of one paper section"""
+        return "".join(page_text + "\n\n" for page_text in page_texts)
+    
+    def _extract_paper_section(self, pdf_path: str, pages: List[str], start_page: int, end_page: int, 
+                               paper_number: int, total_papers: int, tier: Dict = None,
+                               vision_metadata: Dict = None) -> Dict:
+        """Extract metadata from a specific page range of the shared page texts"""
         try:
-            # Extract text from the specified page range
-            text = ""
-            with pdfplumber.open(pdf_path) as pdf:
-                for i in range(start_page, min(end_page + 1, len(pdf.pages))):
-                    if i < len(pdf.pages):
-                        text += pdf.pages[i].extract_text() or ""
-                        text += "\n\n"
+            # Slice the page range from the already-extracted pages
+            if tier is None:
+                tier = self._section_tier(pages, start_page, end_page)
+            text = tier['content']
+            text_key = None
+            if self.use_cache:
+                text_key = f"{self._get_cache_key(pdf_path)}_p{start_page + 1}-{end_page + 1}"
+                self._save_text(text_key, text)
             
-            # Extract metadata from this section
-            metadata = self._enhance_metadata({}, text[:3000])
+            # Metadata from this section's text, then its vision answer if any
+            if vision_metadata:
+                self._apply_vision(tier, vision_metadata)
+            metadata = dict(tier['metadata'])
             
             # Add section information
             metadata['paper_number'] = paper_number
@@ -1056,7 +2790,9 @@ Example format:
                 'issue': metadata.get('issue', 'N/A'),
                 'pages': metadata['page_range'],
                 'content_preview': text[:500] if text else '',
-                'full_content': text,
+                'text_key': text_key,
+                'field_sources': tier['sources'],
+                'field_confidence': self._rounded(tier['confidence']),
                 'file_path': pdf_path,
                 'is_multi_paper': True,
                 'paper_number': paper_number,
@@ -1065,18 +2801,54 @@ Example format:
             
         except Exception as e:
             logger.error(f"Error extracting paper section: {e}")
-            return {
-                'title': f'Paper {paper_number} (Error)',
-                'authors': 'Unknown',
-                'year': 'Unknown',
-                'volume': 'N/A',
-                'issue': 'N/A',
-                'pages': f"{start_page + 1}-{end_page + 1}",
-                'content_preview': '',
-                'full_content': '',
-                'file_path': pdf_path,
-                'error': str(e),
-                'is_multi_paper': True,
-                'paper_number': paper_number,
-                'total_papers': total_papers
-            }
+            return dict(self._error_result(pdf_path, e),
+                        title=f'Paper {paper_number} (Error)',
+                        pages=f"{start_page + 1}-{end_page + 1}",
+                        is_multi_paper=True,
+                        paper_number=paper_number,
+                        total_papers=total_papers)
+
+
+# Per-process extractor for process-mode batches (see PDFExtractor.iter_batch)
+_worker_extractor = None
+
+
+def _flush_at_exit(extractor_ref):
+    extractor = extractor_ref()
+    if extractor is not None:
+        extractor.flush_hash_index()
+
+
+def _init_worker(config: Dict):
+    global _worker_extractor
+    _worker_extractor = PDFExtractor(**config)
+    _worker_extractor._hand_back_pages = True
+
+
+def _succeeded(future) -> bool:
+    return future.done() and not future.cancelled() and future.exception() is None
+
+
+def _process_chunk(mode: str, pdf_paths: List[str], fast_mode: bool = False,
+                   page_texts: Optional[Dict[str, Dict[int, str]]] = None) -> Tuple[List, Dict[str, Dict]]:
+    """A chunk's results plus the worker's path index entries for its files
+    
+    A result may be a SplitRequest (see PDFExtractor.iter_batch); page_texts
+    are the pages the batch then parsed for such a document.
+    """
+    _worker_extractor._page_seeds = dict(page_texts or {})
+    try:
+        results = _worker_extractor._process_chunk(mode, pdf_paths, fast_mode)
+    finally:
+        _worker_extractor._page_seeds = {}
+    return results, _worker_extractor._hash_entries(pdf_paths)
+
+
+def _extract_page_range(pdf_path: str, data: Optional[bytes], preflight: Dict, text_backend: str,
+                        memory_ceiling_mb: Optional[float], pages: List[int]) -> List[str]:
+    """Texts of some pages of a document, for PDFExtractor._parse_page_ranges"""
+    # The preflight verdict is passed in, so the file is only opened to parse
+    stored = {'page_count': preflight.get('pages'), 'preflight': preflight}
+    with PDFDocument(pdf_path, stored=stored, data=data, memory_ceiling_mb=memory_ceiling_mb,
+                     text_backend=text_backend) as doc:
+        return [doc.page_text(page_num) for page_num in pages]
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Cheap preflight checks that route a PDF before full extraction
+
+Crawls of institutional sites bring in HTML error pages saved as .pdf,
+truncated downloads, password-protected files and scans without a text
+layer. Each used to go through a failed pdfplumber parse, the PyPDF2
+fallback and vision before giving up. preflight_pdf() reads the first and
+last bytes, then opens the file once with PyMuPDF (PyPDF2 without it) for
+the page count, encryption, the document info dictionary and the text
+layer of a few sampled pages (the first ones, then pages spread over the
+rest), and returns a route:
+
+- normal: full text extraction (vision only where fields stay uncertain)
+- vision: no text layer on the sampled pages; vision first (the text tier
+  still runs where vision is off or leaves fields missing)
+- quarantine: a PDF that cannot be read (damaged, password-protected, no pages)
+- skip: not a PDF at all (empty file, HTML page)
+"""
+
+import io
+import logging
+from typing import Dict, Optional
+
+import PyPDF2
+
+from text_backends import PYMUPDF_INFO_KEYS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Try to import PyMuPDF (fast page count and text layer check)
+try:
+    import pymupdf as fitz
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    try:
+        import fitz  # PyMuPDF < 1.24
+        PYMUPDF_AVAILABLE = True
+    except ImportError:
+        PYMUPDF_AVAILABLE = False
+
+ROUTE_NORMAL = 'normal'
+ROUTE_VISION = 'vision'
+ROUTE_QUARANTINE = 'quarantine'
+ROUTE_SKIP = 'skip'
+REJECTED_ROUTES = (ROUTE_QUARANTINE, ROUTE_SKIP)
+
+HEAD_BYTES = 1024  # the %PDF- header may follow a little junk
+TAIL_BYTES = 2048  # startxref and %%EOF sit at the end
+TEXT_LAYER_PAGES = 2  # first pages checked for extractable text
+TEXT_LAYER_SAMPLES = 6  # pages checked in all: the first ones, then spread over the rest
+MIN_TEXT_CHARS = 20  # characters over the sampled pages that count as a text layer
+
+
+class PreflightRejected(Exception):
+    """A file routed to quarantine or skip: reason is the route"""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+    def __reduce__(self):
+        return self.__class__, (self.reason, str(self))
+
+
+def _verdict(route: str, reason: str, **details) -> Dict:
+    verdict = {'route': route, 'reason': reason, 'pages': None, 'encrypted': False,
+               'damaged': False, 'text_layer': None}
+    verdict.update(details)
+    return verdict
+
+
+def _head_and_tail(pdf_path: str, data: Optional[bytes]):
+    if data is not None:
+        return bytes(data[:HEAD_BYTES]), bytes(data[-TAIL_BYTES:]), len(data)
+    with open(pdf_path, 'rb') as f:
+        head = f.read(HEAD_BYTES)
+        f.seek(0, io.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - TAIL_BYTES))
+        return head, f.read(), size
+
+
+def _sample_pages(pages: int):
+    """Page numbers checked for a text layer: the first TEXT_LAYER_PAGES,
+    then pages spread evenly over the rest (image-only covers and
+    front matter are common ahead of a text layer)"""
+    head = list(range(min(TEXT_LAYER_PAGES, pages)))
+    rest = pages - len(head)
+    spread = min(TEXT_LAYER_SAMPLES - len(head), rest)
+    if spread <= 0:
+        return head
+    step = rest / spread
+    return head + sorted({len(head) + int(step * (i + 0.5)) for i in range(spread)})
+
+
+def preflight_pdf(pdf_path: str, data: Optional[bytes] = None) -> Dict:
+    """Route a PDF before extraction
+
+    Args:
+        pdf_path: Path to the PDF (only names it if data is given)
+        data: The PDF's bytes, if already in memory
+
+    Returns:
+        {'route', 'reason', 'pages', 'encrypted', 'damaged', 'text_layer'},
+        plus 'info' (the document info dictionary, keys without the leading
+        slash) for a file that could be read; reason is a short
+        human-readable explanation of the route.
+    """
+    try:
+        head, tail, size = _head_and_tail(pdf_path, data)
+    except OSError as e:
+        return _verdict(ROUTE_SKIP, f"unreadable file: {e}")
+    if size == 0:
+        return _verdict(ROUTE_SKIP, 'empty file')
+    if b'%PDF-' not in head:
+        kind = 'an HTML page' if head.lstrip()[:1] == b'<' else 'not a PDF'
+        return _verdict(ROUTE_SKIP, f"{kind} (no %PDF- header)")
+    # A truncated download loses its trailer; parsers may still repair it
+    damaged = b'%%EOF' not in tail or b'startxref' not in tail
+
+    if PYMUPDF_AVAILABLE:
+        verdict = _inspect_pymupdf(pdf_path, data)
+    else:
+        verdict = _inspect_pypdf2(pdf_path, data)
+    verdict['damaged'] = damaged
+    if damaged and verdict['route'] == ROUTE_QUARANTINE:
+        verdict['reason'] = f"damaged ({verdict['reason']})"
+    return verdict
+
+
+def _inspect_pymupdf(pdf_path: str, data: Optional[bytes]) -> Dict:
+    try:
+        doc = fitz.open(stream=data, filetype='pdf') if data is not None else fitz.open(pdf_path)
+    except Exception as e:
+        return _verdict(ROUTE_QUARANTINE, f"cannot be opened: {e}")
+    try:
+        if doc.needs_pass:
+            return _verdict(ROUTE_QUARANTINE, 'encrypted (password required)', encrypted=True)
+        pages = doc.page_count
+        if pages == 0:
+            return _verdict(ROUTE_QUARANTINE, 'no pages', pages=0)
+        chars = 0
+        for page_num in _sample_pages(pages):
+            try:
+                chars += len(doc[page_num].get_text().strip())
+            except Exception as e:
+                logger.warning(f"Preflight could not read page {page_num + 1} of {pdf_path}: {e}")
+            if chars >= MIN_TEXT_CHARS:
+                break
+        info = _info(lambda: {PYMUPDF_INFO_KEYS[key]: value for key, value in (doc.metadata or {}).items()
+                              if key in PYMUPDF_INFO_KEYS and value}, pdf_path)
+        return _classified(pages, chars, bool(doc.is_encrypted), info)
+    finally:
+        doc.close()
+
+
+def _inspect_pypdf2(pdf_path: str, data: Optional[bytes]) -> Dict:
+    try:
+        with (io.BytesIO(data) if data is not None else open(pdf_path, 'rb')) as f:
+            reader = PyPDF2.PdfReader(f)
+            encrypted = reader.is_encrypted
+            if encrypted and not reader.decrypt(''):
+                return _verdict(ROUTE_QUARANTINE, 'encrypted (password required)', encrypted=True)
+            pages = len(reader.pages)
+            if pages == 0:
+                return _verdict(ROUTE_QUARANTINE, 'no pages', pages=0)
+            chars = 0
+            for page_num in _sample_pages(pages):
+                chars += len((reader.pages[page_num].extract_text() or '').strip())
+                if chars >= MIN_TEXT_CHARS:
+                    break
+            info = _info(lambda: {str(key).lstrip('/'): str(value) for key, value in (reader.metadata or {}).items()
+                                  if value is not None}, pdf_path)
+            return _classified(pages, chars, encrypted, info)
+    except Exception as e:
+        return _verdict(ROUTE_QUARANTINE, f"cannot be opened: {e}")
+
+
+def _info(read, pdf_path: str) -> Dict[str, str]:
+    # A broken info dictionary does not make the file unreadable
+    try:
+        return read()
+    except Exception as e:
+        logger.warning(f"Preflight could not read the info dictionary of {pdf_path}: {e}")
+        return {}
+
+
+def _classified(pages: int, chars: int, encrypted: bool, info: Dict[str, str]) -> Dict:
+    if chars < MIN_TEXT_CHARS:
+        return _verdict(ROUTE_VISION, 'no text layer on the sampled pages', pages=pages,
+                        encrypted=encrypted, text_layer=False, info=info)
+    return _verdict(ROUTE_NORMAL, 'text layer present', pages=pages, encrypted=encrypted, text_layer=True,
+                    info=info)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Per-stage timing and counters for PDF extraction
+
+StageTimings records wall and CPU time per extraction stage for one document
+(nested stages are exclusive: time spent in 'parse' while 'headers_footers'
+runs is only counted under 'parse') plus counters such as pages parsed and
+cache hits. The extractor attaches it to each result as '_timings'.
+TimingAggregate sums those blocks over a job, with the slowest files and a
+per-journal breakdown.
+"""
+
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional
+
+
+class StageTimings:
+    """Wall/CPU milliseconds per stage and counters for one document"""
+
+    enabled = True
+
+    def __init__(self):
+        self.stages = {}  # name -> [wall_s, cpu_s, calls]
+        self.counters = {}
+        self._stack = []  # [name, wall_start, cpu_start, child_wall, child_cpu]
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block under name, excluding nested stages"""
+        frame = [name, time.perf_counter(), time.thread_time(), 0.0, 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            wall = time.perf_counter() - frame[1]
+            cpu = time.thread_time() - frame[2]
+            if self._stack:
+                self._stack[-1][3] += wall
+                self._stack[-1][4] += cpu
+            self.add(name, wall - frame[3], cpu - frame[4])
+
+    def add(self, name: str, wall: float, cpu: float = 0.0):
+        """Record time measured elsewhere (e.g. a vision request shared by several documents)"""
+        entry = self.stages.setdefault(name, [0.0, 0.0, 0])
+        entry[0] += wall
+        entry[1] += cpu
+        entry[2] += 1
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def to_dict(self) -> Dict:
+        stages = {
+            name: {'wall_ms': round(wall * 1000, 3), 'cpu_ms': round(cpu * 1000, 3), 'calls': calls}
+            for name, (wall, cpu, calls) in self.stages.items()
+        }
+        return {
+            'wall_ms': round(sum(entry[0] for entry in self.stages.values()) * 1000, 3),
+            'cpu_ms': round(sum(entry[1] for entry in self.stages.values()) * 1000, 3),
+            'stages': stages,
+            'counters': dict(self.counters)
+        }
+
+
+class NullTimings:
+    """Stand-in when instrumentation is off; every call is a no-op"""
+
+    enabled = False
+
+    def stage(self, name: str):
+        return nullcontext()
+
+    def add(self, name: str, wall: float, cpu: float = 0.0):
+        pass
+
+    def count(self, name: str, amount: int = 1):
+        pass
+
+    def to_dict(self) -> Optional[Dict]:
+        return None
+
+
+NULL_TIMINGS = NullTimings()
+
+
+class TimingAggregate:
+    """Job-level sums of result '_timings' blocks, one block per file"""
+
+    def __init__(self, slowest: int = 10):
+        self.max_slowest = slowest
+        self.files = 0
+        self.wall_ms = 0.0
+        self.cpu_ms = 0.0
+        self.stages = {}  # name -> {wall_ms, cpu_ms, calls}
+        self.counters = {}
+        self.journals = {}  # journal -> {files, wall_ms}
+        self.slowest = []  # [{file, journal, wall_ms, top_stage}], slowest first
+
+    def add(self, timings: Optional[Dict], file_path: str = None, journal: str = None):
+        if not timings:
+            return
+        self.files += 1
+        self.wall_ms += timings.get('wall_ms', 0.0)
+        self.cpu_ms += timings.get('cpu_ms', 0.0)
+        for name, entry in timings.get('stages', {}).items():
+            total = self.stages.setdefault(name, {'wall_ms': 0.0, 'cpu_ms': 0.0, 'calls': 0})
+            for key in total:
+                total[key] += entry.get(key, 0)
+        for name, value in timings.get('counters', {}).items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+        journal = journal or 'Unknown'
+        per_journal = self.journals.setdefault(journal, {'files': 0, 'wall_ms': 0.0})
+        per_journal['files'] += 1
+        per_journal['wall_ms'] += timings.get('wall_ms', 0.0)
+
+        stages = timings.get('stages', {})
+        top_stage = max(stages, key=lambda name: stages[name]['wall_ms']) if stages else None
+        self.slowest.append({'file': file_path, 'journal': journal,
+                             'wall_ms': timings.get('wall_ms', 0.0), 'top_stage': top_stage})
+        self.slowest.sort(key=lambda item: item['wall_ms'], reverse=True)
+        del self.slowest[self.max_slowest:]
+
+    def to_dict(self) -> Dict:
+        journals = sorted(self.journals.items(), key=lambda item: item[1]['wall_ms'], reverse=True)
+        return {
+            'files': self.files,
+            'wall_ms': round(self.wall_ms, 3),
+            'cpu_ms': round(self.cpu_ms, 3),
+            'mean_wall_ms': round(self.wall_ms / self.files, 3) if self.files else None,
+            'stages': {name: {key: round(value, 3) for key, value in entry.items()}
+                       for name, entry in self.stages.items()},
+            'counters': dict(self.counters),
+            'journals': {journal: {'files': entry['files'], 'wall_ms': round(entry['wall_ms'], 3)}
+                         for journal, entry in journals},
+            'slowest': list(self.slowest)
+        }
+
+    @staticmethod
+    def from_dict(data: Optional[Dict]) -> 'TimingAggregate':
+        aggregate = TimingAggregate()
+        if not data:
+            return aggregate
+        aggregate.files = data.get('files', 0)
+        aggregate.wall_ms = data.get('wall_ms', 0.0)
+        aggregate.cpu_ms = data.get('cpu_ms', 0.0)
+        aggregate.stages = {name: dict(entry) for name, entry in data.get('stages', {}).items()}
+        aggregate.counters = dict(data.get('counters', {}))
+        aggregate.journals = {journal: dict(entry) for journal, entry in data.get('journals', {}).items()}
+        aggregate.slowest = list(data.get('slowest', []))
+        return aggregate
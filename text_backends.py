@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Text extraction backends: one PDF opened with one parsing library
+
+PDFDocument reads page text and header/footer bands through these, so the
+library is a setting instead of being hard-wired:
+
+- pdfplumber: layout-aware text, the most faithful line order, and slow
+- pypdf2: pure Python, no geometry (header/footer bands are the first and
+  last lines of the page), poor on CJK fonts without a ToUnicode map
+- pymupdf: MuPDF's text extraction, an order of magnitude faster than
+  pdfplumber, and the only one that repairs truncated files
+- auto: PyMuPDF where installed, with pages whose text comes out garbled
+  (unmapped glyphs) re-read by the next backend
+
+Each backend opens the file (or its bytes) on construction and raises if it
+cannot; PDFDocument then falls back to the next backend in its chain.
+"""
+
+import io
+import re
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import PyPDF2
+import pdfplumber
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Try to import PyMuPDF (fast backend)
+try:
+    import pymupdf as fitz
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    try:
+        import fitz  # PyMuPDF < 1.24
+        PYMUPDF_AVAILABLE = True
+    except ImportError:
+        PYMUPDF_AVAILABLE = False
+
+AUTO_BACKEND = 'auto'
+FALLBACK_ORDER = ('pdfplumber', 'pypdf2', 'pymupdf')  # after the chosen backend
+GARBLED_RATIO = 0.1  # share of unreadable characters that makes 'auto' try the next backend
+UNREADABLE_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f\ue000-\uf8ff\ufffd]|\(cid:\d+\)')
+
+# PyMuPDF's metadata keys -> PDF info dictionary keys (as pdfplumber/PyPDF2 report them)
+PYMUPDF_INFO_KEYS = {
+    'title': 'Title', 'author': 'Author', 'subject': 'Subject', 'keywords': 'Keywords',
+    'creator': 'Creator', 'producer': 'Producer', 'creationDate': 'CreationDate', 'modDate': 'ModDate',
+}
+
+
+def _release_page(page):
+    """Drop a pdfplumber page's parsed layout (chars, objects)
+
+    pdfplumber keeps it on the page for the life of the document, several MB
+    per page; releasing it bounds a full pass over a long PDF.
+    """
+    release = getattr(page, 'close', None) or getattr(page, 'flush_cache', None)
+    if release is not None:
+        release()
+
+
+def garbled_ratio(text: str) -> float:
+    """Share of characters that are no readable text: control and
+    private-use characters, U+FFFD, and pdfplumber's "(cid:N)" glyphs"""
+    if not text:
+        return 0.0
+    bad = sum(len(match) for match in UNREADABLE_RE.findall(text))
+    return min(1.0, bad / len(text))
+
+
+class TextBackend:
+    """Page text and header/footer bands of one PDF from one library
+
+    Args:
+        pdf_path: Path to the PDF (only names it if data is given)
+        data: The PDF's bytes, if already in memory
+    """
+
+    name = ''
+
+    def __init__(self, pdf_path: str, data: Optional[bytes] = None):
+        self.pdf_path = pdf_path
+        self.data = data
+
+    @property
+    def page_count(self) -> int:
+        raise NotImplementedError
+
+    def metadata(self) -> Dict:
+        """Raw document info dictionary"""
+        raise NotImplementedError
+
+    def page_text(self, page_num: int) -> str:
+        """Text of a page (0-indexed)"""
+        raise NotImplementedError
+
+    def page_bands(self, page_num: int, top: float, bottom: float) -> Optional[Tuple[str, str]]:
+        """(header, footer) text of the top/bottom fractions of a page, or
+        None if the library cannot read page regions"""
+        return None
+
+    def close(self):
+        pass
+
+
+class PdfplumberBackend(TextBackend):
+    name = 'pdfplumber'
+
+    def __init__(self, pdf_path: str, data: Optional[bytes] = None):
+        super().__init__(pdf_path, data)
+        self._pdf = pdfplumber.open(pdf_path if data is None else io.BytesIO(data))
+
+    @property
+    def page_count(self) -> int:
+        return len(self._pdf.pages)
+
+    def metadata(self) -> Dict:
+        return self._pdf.metadata or {}
+
+    def page_text(self, page_num: int) -> str:
+        page = self._pdf.pages[page_num]
+        try:
+            return page.extract_text() or ""
+        finally:
+            _release_page(page)
+
+    def page_bands(self, page_num: int, top: float, bottom: float) -> Optional[Tuple[str, str]]:
+        page = self._pdf.pages[page_num]
+        x0, y0, x1, y1 = page.bbox
+        height = y1 - y0
+        try:
+            header = page.crop((x0, y0, x1, y0 + height * top)).extract_text() or ""
+            footer = page.crop((x0, y1 - height * bottom, x1, y1)).extract_text() or ""
+        finally:
+            _release_page(page)
+        return header.strip(), footer.strip()
+
+    def close(self):
+        self._pdf.close()
+
+
+class PyPDF2Backend(TextBackend):
+    name = 'pypdf2'
+
+    def __init__(self, pdf_path: str, data: Optional[bytes] = None):
+        super().__init__(pdf_path, data)
+        # A BytesIO over bytes shares their memory rather than copying
+        self._file = io.BytesIO(data) if data is not None else open(pdf_path, 'rb')
+        try:
+            self._reader = PyPDF2.PdfReader(self._file)
+        except Exception:
+            self._file.close()
+            raise
+
+    @property
+    def page_count(self) -> int:
+        return len(self._reader.pages)
+
+    def metadata(self) -> Dict:
+        return self._reader.metadata or {}
+
+    def page_text(self, page_num: int) -> str:
+        return self._reader.pages[page_num].extract_text() or ""
+
+    def close(self):
+        self._file.close()
+        self._reader = None
+
+
+class PyMuPDFBackend(TextBackend):
+    name = 'pymupdf'
+
+    def __init__(self, pdf_path: str, data: Optional[bytes] = None):
+        super().__init__(pdf_path, data)
+        self.doc = fitz.open(stream=data, filetype='pdf') if data is not None else fitz.open(pdf_path)
+
+    @property
+    def page_count(self) -> int:
+        return self.doc.page_count
+
+    def metadata(self) -> Dict:
+        return {PYMUPDF_INFO_KEYS[key]: value for key, value in (self.doc.metadata or {}).items()
+                if key in PYMUPDF_INFO_KEYS and value}
+
+    @staticmethod
+    def _lines(text: str) -> str:
+        # pdfplumber's shape: no trailing blanks on lines, no trailing newline
+        return '\n'.join(line.rstrip() for line in text.split('\n')).strip('\n')
+
+    def page_text(self, page_num: int) -> str:
+        # sort: reading order by position, not content-stream order
+        return self._lines(self.doc[page_num].get_text(sort=True))
+
+    def page_bands(self, page_num: int, top: float, bottom: float) -> Optional[Tuple[str, str]]:
+        # Clip rectangles: no full-page text pass
+        page = self.doc[page_num]
+        rect = page.rect
+        header = page.get_text(clip=fitz.Rect(rect.x0, rect.y0, rect.x1, rect.y0 + rect.height * top))
+        footer = page.get_text(clip=fitz.Rect(rect.x0, rect.y1 - rect.height * bottom, rect.x1, rect.y1))
+        return header.strip(), footer.strip()
+
+    def close(self):
+        self.doc.close()
+
+
+BACKENDS = {backend.name: backend for backend in (PdfplumberBackend, PyPDF2Backend, PyMuPDFBackend)}
+
+
+def available_backends() -> List[str]:
+    """Backend names usable here ('auto' included)"""
+    return [name for name in BACKENDS if name != 'pymupdf' or PYMUPDF_AVAILABLE] + [AUTO_BACKEND]
+
+
+def backend_chain(name: str) -> List[str]:
+    """Backends tried in order for a setting: the chosen one, then the
+    others (FALLBACK_ORDER) for files or pages it cannot read"""
+    if name == AUTO_BACKEND:
+        name = 'pymupdf' if PYMUPDF_AVAILABLE else 'pdfplumber'
+    elif name not in BACKENDS:
+        raise ValueError(f"Unknown text backend: {name} (choose from {', '.join(available_backends())})")
+    elif name == 'pymupdf' and not PYMUPDF_AVAILABLE:
+        logger.warning("PyMuPDF not available; using the pdfplumber text backend")
+        name = 'pdfplumber'
+    chain = [name] + [other for other in FALLBACK_ORDER if other != name]
+    return [other for other in chain if other != 'pymupdf' or PYMUPDF_AVAILABLE]
+
+
+def open_backend(name: str, pdf_path: str, data: Optional[bytes] = None) -> TextBackend:
+    """Open a PDF with the named backend (raises if it cannot)"""
+    return BACKENDS[name](pdf_path, data)
@@ -23,9 +23,18 @@ except ImportError:
 class AcademicCrawler:
     """Crawl academic websites and download PDFs"""
     
-    def __init__(self, max_concurrent: int = 5, timeout: int = 30):
+    def __init__(self, max_concurrent: int = 5, timeout: int = 30, keep_pdfs: bool = True):
+        """
+        Args:
+            max_concurrent: Parallel downloads
+            timeout: Per-request timeout in seconds
+            keep_pdfs: Write downloaded PDFs to output_dir. When False nothing
+                is written: each result carries the PDF bytes as 'content'
+                (and 'filepath' is None) for extraction from memory
+        """
         self.max_concurrent = max_concurrent
         self.timeout = timeout
+        self.keep_pdfs = keep_pdfs
         self.session = None
         self.downloaded_urls = set()
         self.html_metadata = {}  # Store metadata extracted from HTML pages
@@ -104,7 +113,8 @@ class AcademicCrawler:
     async def crawl_website(self, base_url: str, output_dir: str = 'pdfs', 
                            max_depth: int = 2, use_js_rendering: bool = False) -> List[Dict]:
         """Crawl a website and download all PDFs"""
-        os.makedirs(output_dir, exist_ok=True)
+        if self.keep_pdfs:
+            os.makedirs(output_dir, exist_ok=True)
         
         logger.info(f"Starting crawl of {base_url} (max depth: {max_depth}, JS rendering: {use_js_rendering})")
         
@@ -139,6 +149,9 @@ class AcademicCrawler:
         for coro in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Downloading PDFs"):
             result = await coro
             if result:
+                if self.keep_pdfs:
+                    # On disk already; don't hold every download in memory
+                    result.pop('content', None)
                 results.append(result)
         
         logger.info(f"Successfully downloaded {len(results)} PDFs out of {len(pdf_links)} links")
@@ -377,7 +390,13 @@ class AcademicCrawler:
             return await self._download_pdf(url, output_dir)
     
     async def _download_pdf(self, url: str, output_dir: str) -> Dict:
-        """Download a single PDF file"""
+        """Download a single PDF file
+        
+        The result carries the downloaded bytes as 'content' so extraction can
+        parse them without reading the file back; callers holding many
+        results should drop it once used. The file is only written when
+        keep_pdfs is set ('filepath' is None otherwise).
+        """
         if url in self.downloaded_urls:
             return None
         
@@ -400,11 +419,14 @@ class AcademicCrawler:
                 
                 # Generate filename
                 filename = self._generate_filename(url)
-                filepath = os.path.join(output_dir, filename)
+                filepath = None
                 
                 # Save PDF
-                with open(filepath, 'wb') as f:
-                    f.write(content)
+                if self.keep_pdfs:
+                    os.makedirs(output_dir, exist_ok=True)
+                    filepath = os.path.join(output_dir, filename)
+                    with open(filepath, 'wb') as f:
+                        f.write(content)
                 
                 self.downloaded_urls.add(url)
                 logger.info(f"Downloaded: {filename} ({len(content)} bytes)")
@@ -413,7 +435,8 @@ class AcademicCrawler:
                     'url': url,
                     'filepath': filepath,
                     'filename': filename,
-                    'size': len(content)
+                    'size': len(content),
+                    'content': content
                 }
         
         except Exception as e:
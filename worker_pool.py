@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Extraction worker processes with a per-task time and memory budget
+
+concurrent.futures.ProcessPoolExecutor cannot stop a single task: a PDF
+that hangs pdfplumber or PyPDF2 keeps its worker busy for as long as it
+likes. BudgetedProcessPool talks to each worker over its own pipe, so a
+task that runs past its wall-time budget, or whose worker grows past the
+memory budget, is stopped by killing that one worker. The task's future
+fails with BudgetExceeded and a fresh worker takes the next task.
+"""
+
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+from typing import Callable, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Optional: psutil reads process memory portably (/proc is used without it)
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+READY = 'ready'  # a new worker's first message, once its initializer has run
+STARTUP_GRACE = 120.0  # seconds a new worker may take to start before its first task's budget runs out
+
+
+class BudgetExceeded(Exception):
+    """A task was stopped: reason is 'timeout', 'memory' or 'crashed'"""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+    def __reduce__(self):
+        return self.__class__, (self.reason, str(self))
+
+
+def process_rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of a process in MB (None where it cannot be read)"""
+    if PSUTIL_AVAILABLE:
+        try:
+            return psutil.Process(pid).memory_info().rss / 2 ** 20
+        except psutil.Error:
+            return None
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _worker_main(conn, initializer: Optional[Callable], initargs: tuple):
+    """Run (fn, args) tasks from conn until it closes or sends None"""
+    if initializer is not None:
+        initializer(*initargs)
+    conn.send(READY)
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        fn, args = task
+        try:
+            reply = (True, fn(*args))
+        except BaseException as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # Result or exception could not be pickled
+            conn.send((False, RuntimeError(f"Could not return task result: {e}")))
+
+
+class _Worker:
+    def __init__(self, ctx, initializer: Optional[Callable], initargs: tuple):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, initializer, initargs), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.future = None
+        self.units = 0
+        self.deadline = None
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class BudgetedProcessPool:
+    """Process pool whose tasks run under a wall-time and memory budget
+
+    Args:
+        max_workers: Worker processes (started on demand)
+        mp_context: multiprocessing context (default: spawn)
+        initializer, initargs: Run once in each new worker
+        timeout: Wall seconds per budget unit (see submit_budgeted), counted
+            from when the worker is ready (start-up and initializer are not
+            charged); None for no time limit
+        memory_mb: Worker RSS ceiling in MB, checked every poll_interval;
+            None for no memory limit
+    """
+
+    def __init__(self, max_workers: int, mp_context=None, initializer: Optional[Callable] = None,
+                 initargs: tuple = (), timeout: Optional[float] = None, memory_mb: Optional[float] = None,
+                 poll_interval: float = 0.25):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.poll_interval = poll_interval
+        self._ctx = mp_context or multiprocessing.get_context('spawn')
+        self._initializer = initializer
+        self._initargs = initargs
+        self._workers = []
+        self._queue = deque()  # (future, fn, args, units)
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._wake_recv, self._wake_send = multiprocessing.Pipe(duplex=False)
+        self._thread = threading.Thread(target=self._run, name='BudgetedProcessPool', daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable, *args) -> Future:
+        return self.submit_budgeted(1, fn, *args)
+
+    def submit_budgeted(self, units: float, fn: Callable, *args) -> Future:
+        """Run fn(*args) in a worker with units times the time budget
+
+        fn and args must be picklable (module-level function).
+        """
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('cannot schedule new futures after shutdown')
+            self._queue.append((future, fn, args, units))
+        self._wake()
+        return future
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        """Stop the workers once queued tasks are done (or cancelled)"""
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while self._queue:
+                    self._queue.popleft()[0].cancel()
+        self._wake()
+        if wait:
+            self._thread.join()
+
+    def _wake(self):
+        try:
+            self._wake_send.send_bytes(b'')
+        except OSError:
+            pass
+
+    def _run(self):
+        try:
+            while True:
+                with self._lock:
+                    self._dispatch()
+                    busy = [worker for worker in self._workers if worker.future is not None]
+                    if self._shutdown and not self._queue and not busy:
+                        break
+                ready = wait([worker.conn for worker in busy] + [self._wake_recv], timeout=self.poll_interval)
+                if self._wake_recv in ready:
+                    while self._wake_recv.poll():
+                        self._wake_recv.recv_bytes()
+                for worker in busy:
+                    if worker.conn in ready:
+                        self._collect(worker)
+                self._enforce_budgets(busy)
+        finally:
+            for worker in self._workers:
+                try:
+                    worker.conn.send(None)
+                except OSError:
+                    pass
+            for worker in self._workers:
+                worker.process.join(timeout=5)
+                if worker.process.is_alive():
+                    worker.process.kill()
+                worker.conn.close()
+            self._workers = []
+            self._wake_recv.close()
+            self._wake_send.close()
+
+    def _dispatch(self):
+        """Hand queued tasks to idle workers, starting workers as needed"""
+        while self._queue:
+            worker = next((w for w in self._workers if w.future is None), None)
+            if worker is None:
+                if len(self._workers) >= self.max_workers:
+                    return
+                worker = _Worker(self._ctx, self._initializer, self._initargs)
+                self._workers.append(worker)
+            future, fn, args, units = self._queue.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                worker.conn.send((fn, args))
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            worker.future = future
+            worker.units = units
+            # A worker still starting (interpreter, imports, initializer) is
+            # not charged for it: its budget starts once it is ready
+            worker.deadline = self._deadline(units, 0.0 if worker.ready else STARTUP_GRACE)
+
+    def _deadline(self, units: float, grace: float = 0.0) -> Optional[float]:
+        return time.monotonic() + grace + self.timeout * units if self.timeout else None
+
+    def _collect(self, worker: _Worker):
+        future = worker.future
+        try:
+            message = worker.conn.recv()
+        except (EOFError, OSError):
+            # The worker died mid-task (segfault, OOM kill)
+            worker.process.join(timeout=1)
+            self._replace(worker, BudgetExceeded(
+                'crashed', f"Worker process exited with code {worker.process.exitcode}"))
+            return
+        if not worker.ready:
+            # Start-up finished; the task sent meanwhile starts its budget now
+            worker.ready = True
+            worker.deadline = self._deadline(worker.units)
+            return
+        ok, value = message
+        worker.future = worker.deadline = None
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+    def _enforce_budgets(self, busy):
+        now = time.monotonic()
+        for worker in busy:
+            if worker.future is None or not worker.process.is_alive():
+                continue
+            if worker.deadline is not None and now > worker.deadline:
+                self._replace(worker, BudgetExceeded(
+                    'timeout', f"Exceeded the time budget ({self.timeout:g}s per document)"))
+            elif self.memory_mb:
+                rss = process_rss_mb(worker.process.pid)
+                if rss is not None and rss > self.memory_mb:
+                    self._replace(worker, BudgetExceeded(
+                        'memory', f"Exceeded the memory budget ({rss:.0f} MB > {self.memory_mb:g} MB)"))
+
+    def _replace(self, worker: _Worker, error: BudgetExceeded):
+        """Kill a worker, failing its task with error; the next dispatch starts a new one"""
+        logger.warning(f"Stopping worker {worker.process.pid}: {error}")
+        future = worker.future
+        worker.kill()
+        with self._lock:
+            self._workers.remove(worker)
+        future.set_exception(error)